@@ -0,0 +1,51 @@
+import os
+
+# Seconds between refreshes of each source in daemon mode. Micro Bird only
+# publishes PDF spec sheets that rarely change, so it is refreshed weekly.
+# Override with REFRESH_<SOURCE>, e.g. REFRESH_DAIMLER=1800.
+REFRESH_INTERVALS = {
+    'daimler': int(os.getenv('REFRESH_DAIMLER', 60 * 60)),
+    'ross': int(os.getenv('REFRESH_ROSS', 24 * 60 * 60)),
+    'microbird': int(os.getenv('REFRESH_MICROBIRD', 7 * 24 * 60 * 60))
+}
+
+# Every delay is stretched or shrunk by up to this fraction so that
+# refreshes of several daemons do not line up
+SCHEDULER_JITTER = float(os.getenv('SCHEDULER_JITTER', 0.1))
+
+# First runs after start-up are spread over this many seconds
+SCHEDULER_STARTUP_SPREAD = float(os.getenv('SCHEDULER_STARTUP_SPREAD', 30))
+
+# Delay before retrying a refresh that failed (capped at the source interval)
+SCHEDULER_RETRY_DELAY = float(os.getenv('SCHEDULER_RETRY_DELAY', 10 * 60))
+
+# Work queue used to spread listing fetches over worker processes. A SQLite
+# file serves the workers of one machine; point it at the shared MySQL
+# database (a mysql+pymysql:// URL) to let several hosts work on it.
+QUEUE_URL = os.getenv('QUEUE_URL', 'sqlite:///scrape_queue.db')
+
+# Seconds a worker may hold a task before another worker can claim it
+QUEUE_LEASE_SECONDS = int(os.getenv('QUEUE_LEASE_SECONDS', 5 * 60))
+
+# Attempts per task before it is moved to the dead letters
+QUEUE_MAX_ATTEMPTS = int(os.getenv('QUEUE_MAX_ATTEMPTS', 3))
+
+# Delay before the first retry of a failed task, doubled on every attempt
+QUEUE_BACKOFF_SECONDS = int(os.getenv('QUEUE_BACKOFF_SECONDS', 30))
+
+# Read-only inventory HTTP API (python main.py serve)
+API_HOST = os.getenv('API_HOST', '127.0.0.1')
+API_PORT = int(os.getenv('API_PORT', 8080))
+
+# Responses kept in memory: at most this many, each for at most this many
+# seconds. Commits in the API process drop the affected entries at once.
+API_CACHE_SIZE = int(os.getenv('API_CACHE_SIZE', 2048))
+API_CACHE_TTL = float(os.getenv('API_CACHE_TTL', 300))
+
+# How often the API checks whether another process (the daemon, a load)
+# committed changes, in which case the whole cache is dropped
+API_REVISION_POLL_SECONDS = float(os.getenv('API_REVISION_POLL_SECONDS', 2))
+
+# Default and maximum page size of /buses
+API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', 50))
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', 500))
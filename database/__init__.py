@@ -1,17 +1,50 @@
-from .models import Bus, BusOverview, BusImage, AirConditioningType, USRegion
-from .db_connector import db, DatabaseConnector
+from .enums import AirConditioningType, USRegion
 
 __all__ = [
     'Bus',
     'BusOverview',
     'BusImage',
+    'ScrapeTask',
+    'InventoryRollup',
+    'BusSignature',
+    'BusLSHBucket',
+    'BusEntity',
+    'BusHistory',
+    'OutboxEvent',
+    'OutboxCursor',
+    'IngestRun',
     'AirConditioningType',
     'USRegion',
     'db',
-    'DatabaseConnector'
+    'DatabaseConnector',
+    'async_db',
+    'AsyncDatabaseConnector'
 ]
 
+# Models are imported on first use like the connector: the scrapers only
+# need the enums and should not load SQLAlchemy.
+_MODELS = {
+    'Bus', 'BusOverview', 'BusImage', 'ScrapeTask', 'InventoryRollup', 'BusSignature', 'BusLSHBucket', 'BusEntity',
+    'BusHistory', 'OutboxEvent', 'OutboxCursor', 'IngestRun'
+}
+
+def __getattr__(name):
+    # The connector is imported on first use so that code which only needs the
+    # enums (the scrapers) never loads dotenv or a database driver. Session
+    # listeners are registered by the connectors (db_connector.register_listeners).
+    if name in _MODELS:
+        from . import models
+        return getattr(models, name)
+    if name in ('db', 'DatabaseConnector'):
+        from . import db_connector
+        return getattr(db_connector, name)
+    if name in ('async_db', 'AsyncDatabaseConnector'):
+        from . import async_connector
+        return getattr(async_connector, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 # Exponer create_tables como una función conveniente
 def create_tables():
     """Create all tables in the database."""
+    from .db_connector import db
     db.create_tables()
@@ -0,0 +1,78 @@
+from contextlib import asynccontextmanager
+from typing import Optional
+from dotenv import load_dotenv
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from .db_connector import database_url, engine_options, configure_engine, register_listeners
+
+class AsyncDatabaseConnector:
+    """asyncio counterpart of DatabaseConnector, over aiomysql (or aiosqlite).
+
+    Uses the same DATABASE_URL, DB_* and DB_POOL_* settings. Writes awaited
+    on this connector leave the event loop free to run scraper fetches
+    meanwhile.
+    """
+
+    def __init__(self, url: Optional[str] = None, **options):
+        self._url = url
+        self._options = options
+        self._engine = None
+        self._Session = None
+
+    def _initialize_connection(self):
+        """Initialize the async engine using environment variables."""
+        try:
+            load_dotenv()
+
+            DATABASE_URL = self._url or database_url(asynchronous=True)
+            register_listeners()
+
+            self._engine = create_async_engine(DATABASE_URL, **{**engine_options(DATABASE_URL), **self._options})
+            configure_engine(self._engine.sync_engine)
+            self._Session = async_sessionmaker(bind=self._engine, expire_on_commit=False)
+
+        except Exception as e:
+            raise Exception(f"Failed to initialize async database connection: {str(e)}")
+
+    @property
+    def engine(self):
+        """Async engine, created on first use."""
+        if self._engine is None:
+            self._initialize_connection()
+        return self._engine
+
+    @property
+    def Session(self):
+        """AsyncSession factory bound to the engine."""
+        if self._Session is None:
+            self._initialize_connection()
+        return self._Session
+
+    @asynccontextmanager
+    async def unit_of_work(self):
+        """One AsyncSession for a whole batch of writes, committed at the end."""
+        session = self.Session()
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+    async def create_tables(self):
+        """Create all tables in the database."""
+        from .models import Base
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def close(self):
+        """Dispose of the engine and its connection pool."""
+        if self._engine is not None:
+            await self._engine.dispose()
+            self._engine = None
+            self._Session = None
+
+# Created lazily like the sync connector; nothing connects until first use
+async_db = AsyncDatabaseConnector()
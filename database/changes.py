@@ -0,0 +1,89 @@
+from typing import Callable, List, Set
+import logging
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from .models import Bus, BusOverview, BusImage, InventoryRollup
+from .rollups import REVISION
+from .upsert import upsert
+
+logger = logging.getLogger(__name__)
+
+# Callbacks run after every commit that changed buses, their overview or
+# their images, with the ids of the buses affected. Only sees commits made in
+# this process; other processes compare revision() instead.
+_subscribers: List[Callable[[Set[int]], None]] = []
+
+def subscribe(callback: Callable[[Set[int]], None]) -> Callable[[Set[int]], None]:
+    """Call ``callback(bus_ids)`` after each commit that changed buses. Usable as a decorator."""
+    _subscribers.append(callback)
+    return callback
+
+def unsubscribe(callback: Callable[[Set[int]], None]) -> None:
+    if callback in _subscribers:
+        _subscribers.remove(callback)
+
+def changed_bus_ids(session) -> Set[int]:
+    """Ids of the buses changed in the session's current transaction so far."""
+    return session.info.setdefault('changed_buses', set())
+
+def revision(connection) -> int:
+    """Number of commits that changed buses so far, in any process.
+
+    One primary key lookup, cheap enough to poll.
+    """
+    statement = select(InventoryRollup.count).where(
+        InventoryRollup.dimension == REVISION, InventoryRollup.value == ''
+    )
+    return connection.execute(statement).scalar() or 0
+
+def bump_revision(connection) -> None:
+    """Count a change made outside the ORM (e.g. a set-based UPDATE) in revision()."""
+    upsert(connection, InventoryRollup.__table__,
+           [{'dimension': REVISION, 'value': '', 'count': 1}], ['dimension', 'value'],
+           update_columns=[], increment_columns=['count'])
+
+def flushed_bus_ids(session) -> Set[int]:
+    """Ids of the buses whose rows, overview or images a flush writes (call from after_flush)."""
+    flushed = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Bus):
+            flushed.add(obj.id)
+        elif isinstance(obj, (BusOverview, BusImage)) and obj.bus_id is not None:
+            flushed.add(obj.bus_id)
+    return flushed
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_buses(session, flush_context):
+    changed_bus_ids(session).update(flushed_bus_ids(session))
+
+@event.listens_for(Session, 'before_commit')
+def _bump_revision(session):
+    # Savepoint commits fire this too; the revision row is shared by every
+    # writer, so it is only bumped when the whole transaction commits
+    if session.in_nested_transaction():
+        return
+    session.flush()
+    if session.info.get('changed_buses'):
+        bump_revision(session.connection())
+
+@event.listens_for(Session, 'after_commit')
+def _notify(session):
+    # Subscribers hear about a batch once it is committed, not per savepoint
+    if session.in_nested_transaction():
+        return
+    changed = session.info.pop('changed_buses', None)
+    if not changed:
+        return
+    for callback in list(_subscribers):
+        try:
+            callback(set(changed))
+        except Exception as e:
+            logger.error(f"Change subscriber {callback!r} failed: {str(e)}")
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard(session, previous_transaction):
+    # Rolling back a savepoint (one bad record of a batch) keeps the changes
+    # of the enclosing transaction
+    if previous_transaction.parent is None:
+        session.info.pop('changed_buses', None)
@@ -1,42 +1,139 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 from contextlib import contextmanager
+from typing import Optional
 import os
 from dotenv import load_dotenv
 
-load_dotenv()
+# Driver used by AsyncDatabaseConnector for each backend
+ASYNC_DRIVERS = {'mysql': 'aiomysql', 'sqlite': 'aiosqlite'}
+
+# Applied to every new SQLite connection: WAL lets readers run while a
+# writer commits, NORMAL sync is durable enough with WAL, and the cache and
+# temp tables stay in memory. Each value can be overridden with
+# SQLITE_<PRAGMA>, e.g. SQLITE_SYNCHRONOUS=FULL.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'foreign_keys': 'ON',
+    'busy_timeout': '30000',
+    'cache_size': '-64000',
+    'temp_store': 'MEMORY'
+}
+
+def database_url(asynchronous: bool = False) -> str:
+    """URL of the bus database: DATABASE_URL if set, else MySQL from the DB_* variables.
+
+    With ``asynchronous`` the driver is swapped for the async one of the
+    same backend (e.g. sqlite:///buses.db -> sqlite+aiosqlite:///buses.db).
+    """
+    url = os.getenv('DATABASE_URL') or _mysql_url()
+    if not asynchronous:
+        return url
+    url = make_url(url)
+    backend = url.get_backend_name()
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+def _mysql_url() -> str:
+    DB_USER = os.getenv('DB_USER', 'root')
+    DB_PASSWORD = os.getenv('DB_PASSWORD', '')
+    DB_HOST = os.getenv('DB_HOST', 'localhost')
+    DB_PORT = os.getenv('DB_PORT', '3306')
+    DB_NAME = os.getenv('DB_NAME', 'buses_db')
+
+    return f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+def engine_options(url: Optional[str] = None) -> dict:
+    """Connection pool settings from the environment (see README, Configuration).
+
+    Read after load_dotenv() so that values from .env are picked up.
+    """
+    options = {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'false').lower() in ('1', 'true', 'yes')
+    }
+    if os.getenv('DB_ISOLATION_LEVEL'):
+        options['isolation_level'] = os.getenv('DB_ISOLATION_LEVEL')
+    if url and url.startswith('sqlite'):
+        # SQLite has no server side pool to size
+        for key in ('pool_size', 'max_overflow', 'pool_timeout'):
+            options.pop(key, None)
+    return options
+
+def sqlite_pragmas(dbapi_connection, connection_record=None):
+    """Connect event listener applying SQLITE_PRAGMAS to a new SQLite connection."""
+    cursor = dbapi_connection.cursor()
+    for pragma, default in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {pragma}={os.getenv(f'SQLITE_{pragma.upper()}', default)}")
+    cursor.close()
+
+def register_listeners() -> None:
+    """Register the session listeners that keep derived tables in step with bus writes.
+
+    Called by the connectors when they build their engine, so that merely
+    importing ``database`` (e.g. for the enums) stays cheap.
+    """
+    from . import rollups  # noqa: F401 keeps inventory_rollups in step with every commit of buses
+    from . import changes  # noqa: F401 tells subscribers which buses each commit changed
+    from . import search  # noqa: F401 keeps the full-text index in step with every commit of buses
+    from . import near_duplicates  # noqa: F401 keeps MinHash signatures in step with every commit of buses
+    from . import history  # noqa: F401 appends the changed bus fields of every commit to bus_history
+    from . import outbox  # noqa: F401 writes a change event for every flushed bus, overview and image
+
+def configure_engine(engine):
+    """Backend specific set-up of a new engine (sync, or the sync_engine of an async one)."""
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine, 'connect', sqlite_pragmas)
+    return engine
 
 class DatabaseConnector:
-    def __init__(self):
-        self.engine = None
-        self.Session = None
-        self._initialize_connection()
+    def __init__(self, url: Optional[str] = None, **options):
+        """Connector for ``url`` (default: DATABASE_URL, or MySQL from the DB_* variables).
+
+        ``options`` are passed to create_engine and override the DB_POOL_*
+        and DB_ISOLATION_LEVEL settings.
+        """
+        self._url = url
+        self._options = options
+        self._engine = None
+        self._Session = None
 
     def _initialize_connection(self):
         """Initialize database connection using environment variables."""
         try:
-            DB_USER = os.getenv('DB_USER', 'root')
-            DB_PASSWORD = os.getenv('DB_PASSWORD', '')
-            DB_HOST = os.getenv('DB_HOST', 'localhost')
-            DB_PORT = os.getenv('DB_PORT', '3306')
-            DB_NAME = os.getenv('DB_NAME', 'buses_db')
-
-            DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-
-            self.engine = create_engine(
-                DATABASE_URL,
-                pool_size=5,
-                max_overflow=10,
-                pool_timeout=30,
-                pool_recycle=1800
+            load_dotenv()
+
+            DATABASE_URL = self._url or database_url()
+            register_listeners()
+
+            self._engine = configure_engine(
+                create_engine(DATABASE_URL, **{**engine_options(DATABASE_URL), **self._options})
             )
 
-            self.Session = sessionmaker(bind=self.engine)
+            self._Session = sessionmaker(bind=self._engine)
 
         except Exception as e:
             raise Exception(f"Failed to initialize database connection: {str(e)}")
 
+    @property
+    def engine(self):
+        """Engine, created on first use so importing the connector stays cheap."""
+        if self._engine is None:
+            self._initialize_connection()
+        return self._engine
+
+    @property
+    def Session(self):
+        """Session factory bound to the engine."""
+        if self._Session is None:
+            self._initialize_connection()
+        return self._Session
+
     @property
     def session(self):
         """Get a new session."""
@@ -55,11 +152,43 @@ class DatabaseConnector:
         finally:
             session.close()
 
+    @contextmanager
+    def unit_of_work(self):
+        """One session, and one pooled connection, for a whole batch of writes.
+
+        The session is committed once at the end. Objects stay usable after
+        the commit, so callers can still read e.g. the ids of saved rows.
+        Wrap each record in ``session.begin_nested()`` to isolate failures.
+        """
+        session = self.Session(expire_on_commit=False)
+        try:
+            if self.engine.dialect.name == 'sqlite':
+                # Take the write lock up front: a transaction that has read
+                # cannot start writing once another writer (e.g. a parallel
+                # loader) has committed, it fails instead of waiting
+                session.connection().exec_driver_sql('BEGIN IMMEDIATE')
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def close(self):
+        """Dispose of the engine and its connection pool."""
+        if self._engine is not None:
+            self._engine.dispose()
+            self._engine = None
+            self._Session = None
+
     def create_tables(self):
         """Create all tables in the database."""
         from .models import Base
+        from .search import create_search_index
         try:
             Base.metadata.create_all(self.engine)
+            create_search_index(self.engine)
             print("All tables created successfully")
         except Exception as e:
             raise Exception(f"Failed to create tables: {str(e)}")
@@ -67,11 +196,13 @@ class DatabaseConnector:
     def drop_tables(self):
         """Drop all tables in the database."""
         from .models import Base
+        from .search import drop_search_index
         try:
+            drop_search_index(self.engine)
             Base.metadata.drop_all(self.engine)
             print("All tables dropped successfully")
         except Exception as e:
             raise Exception(f"Failed to drop tables: {str(e)}")
 
-# Create a singleton instance
+# Create a singleton instance, the engine is only built on first use
 db = DatabaseConnector()
@@ -0,0 +1,228 @@
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from collections import defaultdict
+import logging
+import os
+import re
+
+from sqlalchemy import select, delete
+from .models import Bus, BusEntity
+from .facets import passenger_band, UNKNOWN
+from .near_duplicates import load_signatures, signatures_enabled, similarity
+from .repository import BusRepository
+from .upsert import upsert
+
+logger = logging.getLogger(__name__)
+
+# Score above which two listings are taken to be the same physical bus
+MATCH_THRESHOLD = float(os.getenv('ENTITY_MATCH_THRESHOLD', 0.75))
+
+# Blocks larger than this are skipped (e.g. a make/year/band every dealer
+# stocks dozens of); their buses still meet in their other blocks
+MAX_BLOCK_SIZE = int(os.getenv('ENTITY_MAX_BLOCK_SIZE', 300))
+
+# Columns read per bus
+COLUMNS = ['id', 'source', 'vin', 'year', 'make', 'model', 'passengers', 'mileage']
+
+# Evidence used to score a pair, and how much each counts. Only evidence
+# present on both sides is weighed, and at least MIN_EVIDENCE of it is needed.
+WEIGHTS = {'make': 0.2, 'model': 0.25, 'passengers': 0.15, 'mileage': 0.2, 'text': 0.2}
+MIN_EVIDENCE = 0.5
+
+# VIN characters 1-11: manufacturer, vehicle attributes, check digit, model year and plant
+VIN_PREFIX_LENGTH = 11
+
+MAKE_ALIASES = {
+    'bluebird': 'blue bird',
+    'motor coach industries': 'mci',
+    'motorcoach industries': 'mci',
+    'prevost car': 'prevost',
+    'thomas built': 'thomas',
+    'thomas built buses': 'thomas',
+    'microbird': 'micro bird',
+    'van hool nv': 'van hool'
+}
+
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+DIGITS_PATTERN = re.compile(r'\d+')
+
+def normalize_make(make: Optional[str]) -> str:
+    make = ' '.join(WORD_PATTERN.findall((make or '').lower()))
+    return MAKE_ALIASES.get(make, make)
+
+def _number(value: Optional[str]) -> Optional[int]:
+    """First number in a free text field such as '123,456 miles'."""
+    match = DIGITS_PATTERN.search((value or '').replace(',', ''))
+    return int(match.group()) if match else None
+
+def _vin(value: Optional[str]) -> str:
+    return re.sub(r'[^A-Z0-9]', '', (value or '').upper())
+
+def blocking_keys(row: Dict[str, Any]) -> List[Tuple[str, ...]]:
+    """Blocks a bus is compared within: VIN prefix, year + make, and year + passenger band."""
+    keys = []
+    vin = _vin(row['vin'])
+    if len(vin) >= VIN_PREFIX_LENGTH:
+        keys.append(('vin', vin[:VIN_PREFIX_LENGTH]))
+    year = (row['year'] or '').strip()
+    if year:
+        make = normalize_make(row['make'])
+        if make:
+            keys.append(('year_make', year, make))
+        band = passenger_band(row['passengers'])
+        if band != UNKNOWN:
+            keys.append(('year_passengers', year, band))
+    return keys
+
+def _token_similarity(first: Optional[str], second: Optional[str]) -> Optional[float]:
+    first, second = set(WORD_PATTERN.findall((first or '').lower())), set(WORD_PATTERN.findall((second or '').lower()))
+    if not first or not second:
+        return None
+    return len(first & second) / len(first | second)
+
+def match_score(first: Dict[str, Any], second: Dict[str, Any], text_similarity: Optional[float] = None) -> float:
+    """Likelihood (0-1) that two listings describe the same physical bus."""
+    first_vin, second_vin = _vin(first['vin']), _vin(second['vin'])
+    if first_vin and second_vin:
+        return 1.0 if first_vin == second_vin else 0.0
+    if (first['year'] or '').strip() != (second['year'] or '').strip():
+        return 0.0
+
+    evidence = {}
+    first_make, second_make = normalize_make(first['make']), normalize_make(second['make'])
+    if first_make and second_make:
+        evidence['make'] = 1.0 if first_make == second_make else 0.0
+    evidence['model'] = _token_similarity(first['model'], second['model'])
+    first_passengers, second_passengers = _number(first['passengers']), _number(second['passengers'])
+    if first_passengers and second_passengers:
+        evidence['passengers'] = 1.0 if first_passengers == second_passengers else 0.0
+    first_mileage, second_mileage = _number(first['mileage']), _number(second['mileage'])
+    if first_mileage is not None and second_mileage is not None:
+        # Listings are refreshed at different times, so allow a little driving
+        evidence['mileage'] = 1.0 if abs(first_mileage - second_mileage) <= max(1000, 0.02 * max(first_mileage, second_mileage)) else 0.0
+    evidence['text'] = text_similarity
+
+    weights = {name: WEIGHTS[name] for name, value in evidence.items() if value is not None}
+    if sum(weights.values()) < MIN_EVIDENCE:
+        return 0.0
+    return sum(evidence[name] * weight for name, weight in weights.items()) / sum(weights.values())
+
+class _Clusters:
+    """Union-find over bus ids."""
+
+    def __init__(self):
+        self.parent: Dict[int, int] = {}
+
+    def find(self, item: int) -> int:
+        root = self.parent.setdefault(item, item)
+        while root != self.parent[root]:
+            root = self.parent[root]
+        while item != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, first: int, second: int) -> None:
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            self.parent[max(first, second)] = min(first, second)
+
+def candidate_pairs(rows: Dict[int, Dict[str, Any]]) -> Iterable[Tuple[int, int]]:
+    """Pairs of buses that share a block, except pairs from the same source."""
+    blocks = defaultdict(list)
+    for bus_id, row in rows.items():
+        for key in blocking_keys(row):
+            blocks[key].append(bus_id)
+    pairs = set()
+    for key, members in blocks.items():
+        if len(members) > MAX_BLOCK_SIZE:
+            logger.warning(f"Skipping block {key} of {len(members)} buses")
+            continue
+        members.sort()
+        for i, first in enumerate(members):
+            for second in members[i + 1:]:
+                # A dealer lists each of its buses once; same-source repeats are
+                # the near-duplicate matcher's concern
+                source = rows[first]['source']
+                if not source or source != rows[second]['source']:
+                    pairs.add((first, second))
+    return pairs
+
+def _assign_ids(clusters: Dict[int, List[int]], previous: Dict[int, int]) -> Dict[int, int]:
+    """Entity id of every bus, keeping the ids clusters had before.
+
+    A cluster keeps the smallest entity id its members had that no other
+    cluster kept; new clusters take the id of one of their buses.
+    """
+    used = set()
+    next_id = max([*previous.values(), *previous.keys(), *clusters.keys(), 0]) + 1
+    assigned = {}
+    ordered = sorted(clusters.values(), key=lambda members: min(
+        [previous[bus_id] for bus_id in members if bus_id in previous] or [float('inf')]
+    ))
+    for members in ordered:
+        candidates = sorted({previous[bus_id] for bus_id in members if bus_id in previous}) + sorted(members)
+        entity_id = next((candidate for candidate in candidates if candidate not in used), None)
+        if entity_id is None:
+            entity_id, next_id = next_id, next_id + 1
+        used.add(entity_id)
+        for bus_id in members:
+            assigned[bus_id] = entity_id
+    return assigned
+
+def resolve_entities(session, threshold: float = MATCH_THRESHOLD) -> Dict[str, int]:
+    """Cluster listings of the same physical bus across sources and store their entity ids.
+
+    Buses are only compared within their blocks (blocking_keys), so the work
+    grows with the block sizes rather than with the square of the inventory.
+    Entity ids are stable: a cluster keeps its id as listings join or leave.
+    """
+    rows = {row['id']: row for row in BusRepository(session).iter_rows(COLUMNS)}
+    pairs = candidate_pairs(rows)
+
+    connection = session.connection()
+    signatures = {}
+    if pairs and signatures_enabled(connection):
+        signatures = load_signatures(connection, {bus_id for pair in pairs for bus_id in pair})
+
+    clusters = _Clusters()
+    scores: Dict[int, float] = {}
+    matched = 0
+    for first, second in pairs:
+        text = similarity(signatures[first], signatures[second]) \
+            if first in signatures and second in signatures else None
+        score = match_score(rows[first], rows[second], text)
+        if score >= threshold:
+            clusters.union(first, second)
+            scores[first] = max(scores.get(first, 0.0), score)
+            scores[second] = max(scores.get(second, 0.0), score)
+            matched += 1
+
+    members = defaultdict(list)
+    for bus_id in rows:
+        members[clusters.find(bus_id)].append(bus_id)
+
+    previous = dict(session.execute(select(BusEntity.bus_id, BusEntity.entity_id)).all())
+    assigned = _assign_ids(members, previous)
+    changed = [
+        {'bus_id': bus_id, 'entity_id': entity_id, 'score': scores.get(bus_id)}
+        for bus_id, entity_id in assigned.items() if previous.get(bus_id) != entity_id
+    ]
+    upsert(connection, BusEntity.__table__, changed, ['bus_id'], update_columns=['entity_id', 'score'])
+    gone = [bus_id for bus_id in previous if bus_id not in rows]
+    if gone:
+        session.execute(delete(BusEntity).where(BusEntity.bus_id.in_(gone)))
+
+    stats = {'buses': len(rows), 'compared': len(pairs), 'matched': matched,
+             'entities': len(members), 'changed': len(changed)}
+    logger.info(f"Resolved {stats['buses']} buses into {stats['entities']} entities "
+                f"({stats['compared']} pairs compared, {stats['changed']} assignments changed)")
+    return stats
+
+def entity_of(session, bus_id: int) -> List[Bus]:
+    """Every listing of the physical bus behind ``bus_id`` (just that bus if unresolved)."""
+    entity_id = session.scalar(select(BusEntity.entity_id).where(BusEntity.bus_id == bus_id))
+    if entity_id is None:
+        bus = session.get(Bus, bus_id)
+        return [bus] if bus else []
+    statement = select(Bus).join(BusEntity, BusEntity.bus_id == Bus.id) \
+        .where(BusEntity.entity_id == entity_id).order_by(Bus.id)
+    return list(session.scalars(statement))
@@ -0,0 +1,16 @@
+from enum import Enum
+
+class AirConditioningType(str, Enum):
+    REAR = "REAR"
+    DASH = "DASH"
+    BOTH = "BOTH"
+    OTHER = "OTHER"
+    NONE = "NONE"
+
+class USRegion(str, Enum):
+    NORTHEAST = "NORTHEAST"
+    MIDWEST = "MIDWEST"
+    WEST = "WEST"
+    SOUTHWEST = "SOUTHWEST"
+    SOUTHEAST = "SOUTHEAST"
+    OTHER = "OTHER"
@@ -0,0 +1,274 @@
+from typing import List, Dict, Any, Iterable, Optional, Set
+import logging
+import re
+import threading
+import time
+
+import numpy as np
+from .models import Bus
+from .changes import subscribe, unsubscribe, revision
+from .repository import BusRepository
+from .rollups import rollup_key
+
+logger = logging.getLogger(__name__)
+
+FACETS = ['make', 'year', 'region', 'source', 'wheelchair', 'passengers']
+
+# Bus columns read to compute the facet values of a bus
+COLUMNS = ['id', 'make', 'year', 'us_region', 'source', 'wheelchair', 'passengers']
+
+# Upper bound (inclusive) and label of each passenger band
+PASSENGER_BANDS = [(15, '1-15'), (24, '16-24'), (36, '25-36'), (None, '37+')]
+UNKNOWN = 'unknown'
+
+NUMBER_PATTERN = re.compile(r'\d+')
+NO_WHEELCHAIR = {'', 'no', 'false', 'none', '0', 'n/a', 'na'}
+
+def passenger_band(passengers: Optional[str]) -> str:
+    """Band of a passengers value such as '28', '24 + 2 WC' or 'Up to 33'."""
+    match = NUMBER_PATTERN.search(passengers or '')
+    if match is None or int(match.group()) == 0:
+        return UNKNOWN
+    count = int(match.group())
+    for upper, label in PASSENGER_BANDS:
+        if upper is None or count <= upper:
+            return label
+
+def wheelchair_value(wheelchair: Optional[str]) -> str:
+    """'yes' or 'no' for the free text wheelchair column ('True', 'Yes', '2 positions', ...)."""
+    if wheelchair is None:
+        return UNKNOWN
+    return 'no' if wheelchair.strip().lower() in NO_WHEELCHAIR else 'yes'
+
+def facet_values(row: Dict[str, Any]) -> Dict[str, str]:
+    """Facet values of a bus from its COLUMNS."""
+    return {
+        'make': rollup_key(row['make']),
+        'year': rollup_key(row['year']),
+        'region': rollup_key(row['us_region']),
+        'source': rollup_key(row['source']),
+        'wheelchair': wheelchair_value(row['wheelchair']),
+        'passengers': passenger_band(row['passengers'])
+    }
+
+def _bit(position: int):
+    return np.uint64(1) << np.uint64(position & 63)
+
+def _pack(flags: np.ndarray, words: int) -> np.ndarray:
+    """Boolean array packed into ``words`` 64-bit words, bit i of the result being flags[i]."""
+    packed = np.zeros(words * 8, dtype=np.uint8)
+    bits = np.packbits(flags, bitorder='little')
+    packed[:len(bits)] = bits
+    return packed.view(np.uint64)
+
+class FacetIndex:
+    """Facet counts of the buses table, answered from memory.
+
+    Every bus has a row position, and every facet value a bitmap over the
+    positions, packed in 64-bit words and stacked into one matrix per facet.
+    A filter is an OR/AND of a few bitmaps, and the counts of all values of
+    a facet are one ``np.bitwise_count`` over its matrix ANDed with the
+    filter, so a query costs microseconds and never touches the database.
+
+    Commits in this process update only the buses they changed (through
+    database.changes); commits in other processes are noticed by polling
+    the change revision and trigger a full rebuild.
+    """
+
+    def __init__(self, connector=None, revision_poll: float = 2, clock=time.monotonic):
+        if connector is None:
+            from .db_connector import db as connector
+        self.db = connector
+        self.revision_poll = revision_poll
+        self.clock = clock
+        self._lock = threading.RLock()
+        self._pending: Set[int] = set()
+        self._expected_revision = None
+        self._checked_at = None
+        self._reset(0)
+        subscribe(self._on_change)
+
+    def close(self):
+        unsubscribe(self._on_change)
+
+    def __len__(self) -> int:
+        return int(np.bitwise_count(self._alive).sum())
+
+    def _reset(self, capacity: int) -> None:
+        self._words = max((capacity + 63) // 64, 16)
+        self._size = 0
+        self._built = False
+        self._ids = np.zeros(self._words * 64, dtype=np.int64)
+        self._alive = np.zeros(self._words, dtype=np.uint64)
+        self._positions: Dict[int, int] = {}
+        self._codes = {facet: np.zeros(self._words * 64, dtype=np.int32) for facet in FACETS}
+        self._values: Dict[str, List[str]] = {facet: [] for facet in FACETS}
+        self._lookup: Dict[str, Dict[str, int]] = {facet: {} for facet in FACETS}
+        # One row of words per value; rows beyond len(_values) are spare
+        self._bitmaps = {facet: np.zeros((8, self._words), dtype=np.uint64) for facet in FACETS}
+
+    def _on_change(self, bus_ids: Set[int]) -> None:
+        with self._lock:
+            self._pending.update(bus_ids)
+            if self._expected_revision is not None:
+                self._expected_revision += 1
+
+    def _grow(self) -> None:
+        extra = self._words
+        self._words += extra
+        self._ids = np.concatenate([self._ids, np.zeros(extra * 64, dtype=np.int64)])
+        self._alive = np.concatenate([self._alive, np.zeros(extra, dtype=np.uint64)])
+        for facet in FACETS:
+            self._codes[facet] = np.concatenate([self._codes[facet], np.zeros(extra * 64, dtype=np.int32)])
+            bitmaps = self._bitmaps[facet]
+            self._bitmaps[facet] = np.hstack([bitmaps, np.zeros((len(bitmaps), extra), dtype=np.uint64)])
+
+    def _code(self, facet: str, value: str) -> int:
+        code = self._lookup[facet].get(value)
+        if code is None:
+            code = self._lookup[facet][value] = len(self._values[facet])
+            self._values[facet].append(value)
+            bitmaps = self._bitmaps[facet]
+            if code == len(bitmaps):
+                self._bitmaps[facet] = np.vstack([bitmaps, np.zeros_like(bitmaps)])
+        return code
+
+    def _set(self, bus_id: int, values: Dict[str, str]) -> None:
+        position = self._positions.get(bus_id)
+        if position is None:
+            if self._size == self._words * 64:
+                self._grow()
+            position = self._positions[bus_id] = self._size
+            self._ids[position] = bus_id
+            self._size += 1
+        else:
+            self._unset(position)
+        word, bit = position >> 6, _bit(position)
+        self._alive[word] |= bit
+        for facet, value in values.items():
+            code = self._code(facet, value)
+            self._codes[facet][position] = code
+            self._bitmaps[facet][code, word] |= bit
+
+    def _unset(self, position: int) -> None:
+        word, bit = position >> 6, ~_bit(position)
+        self._alive[word] &= bit
+        for facet in FACETS:
+            self._bitmaps[facet][self._codes[facet][position], word] &= bit
+
+    def _rows(self, session, where: Iterable = ()) -> Iterable[Dict[str, Any]]:
+        return BusRepository(session).iter_rows(COLUMNS, where=list(where))
+
+    def rebuild(self) -> None:
+        """Read the facet columns of every bus (one pass over the buses table)."""
+        with self._lock, self.db.Session() as session:
+            self._expected_revision = revision(session.connection())
+            self._checked_at = self.clock()
+            self._pending.clear()
+            rows = list(self._rows(session))
+            self._reset(len(rows))
+            count = self._size = len(rows)
+            self._ids[:count] = [row['id'] for row in rows]
+            self._positions = {row['id']: position for position, row in enumerate(rows)}
+            self._alive = _pack(np.ones(count, dtype=bool), self._words)
+            values = [facet_values(row) for row in rows]
+            for facet in FACETS:
+                codes = self._codes[facet]
+                codes[:count] = [self._code(facet, value[facet]) for value in values]
+                self._bitmaps[facet] = np.zeros((max(len(self._values[facet]), 8), self._words), dtype=np.uint64)
+                for code in range(len(self._values[facet])):
+                    self._bitmaps[facet][code] = _pack(codes[:count] == code, self._words)
+            self._built = True
+        logger.info(f"Built facet index over {len(rows)} buses")
+
+    def update(self, bus_ids: Iterable[int]) -> None:
+        """Re-read the given buses; ids that no longer exist leave the index."""
+        bus_ids = sorted(set(bus_ids))
+        with self._lock, self.db.Session() as session:
+            for start in range(0, len(bus_ids), 500):
+                chunk = bus_ids[start:start + 500]
+                found = set()
+                for row in self._rows(session, [Bus.id.in_(chunk)]):
+                    self._set(row['id'], facet_values(row))
+                    found.add(row['id'])
+                for bus_id in set(chunk) - found:
+                    position = self._positions.pop(bus_id, None)
+                    if position is not None:
+                        self._unset(position)
+
+    def refresh(self) -> None:
+        """Bring the index up to date with the database before a query."""
+        with self._lock:
+            if not self._built:
+                self.rebuild()
+                return
+            now = self.clock()
+            if self._checked_at is None or now - self._checked_at >= self.revision_poll:
+                self._checked_at = now
+                with self.db.engine.connect() as connection:
+                    current = revision(connection)
+                if current != self._expected_revision:
+                    logger.info("Buses changed in another process, rebuilding facet index")
+                    self.rebuild()
+                    return
+            if self._pending:
+                pending, self._pending = self._pending, set()
+                self.update(pending)
+
+    def _masks(self, filters: Dict[str, Iterable[str]], ids: Optional[Iterable[int]]):
+        """Bitmap of the live rows among ``ids``, and the bitmap of each facet filter."""
+        base = self._alive.copy()
+        if ids is not None:
+            selected = np.zeros(self._words * 64, dtype=bool)
+            selected[[self._positions[bus_id] for bus_id in ids if bus_id in self._positions]] = True
+            base &= _pack(selected, self._words)
+        masks = {}
+        for facet, wanted in filters.items():
+            if facet not in self._lookup:
+                raise ValueError(f"Unknown facet: {facet}")
+            mask = np.zeros(self._words, dtype=np.uint64)
+            for value in wanted:
+                code = self._lookup[facet].get(value)
+                if code is not None:
+                    mask |= self._bitmaps[facet][code]
+            masks[facet] = mask
+        return base, masks
+
+    def counts(self, filters: Optional[Dict[str, Iterable[str]]] = None, ids: Optional[Iterable[int]] = None,
+               facets: Optional[List[str]] = None) -> Dict[str, Dict[str, int]]:
+        """Counts per value of each facet among the buses matching ``filters`` (and ``ids``).
+
+        Several values of one facet match any of them, and a facet's own
+        filter does not narrow its counts, so e.g. ``{'make': ['Thomas']}``
+        still returns the count of every make next to the Thomas results.
+        """
+        filters = filters or {}
+        self.refresh()
+        with self._lock:
+            base, masks = self._masks(filters, ids)
+            matching = base.copy()
+            for mask in masks.values():
+                matching &= mask
+            result = {}
+            for facet in facets or FACETS:
+                mask = matching
+                if facet in masks:
+                    mask = base.copy()
+                    for other, other_mask in masks.items():
+                        if other != facet:
+                            mask &= other_mask
+                values = self._values[facet]
+                counts = np.bitwise_count(self._bitmaps[facet][:len(values)] & mask).sum(axis=1)
+                result[facet] = {values[code]: int(count) for code, count in enumerate(counts) if count}
+            return result
+
+    def matching_ids(self, filters: Optional[Dict[str, Iterable[str]]] = None,
+                     ids: Optional[Iterable[int]] = None) -> List[int]:
+        """Ids of the buses matching every filter, in id order."""
+        self.refresh()
+        with self._lock:
+            mask, masks = self._masks(filters or {}, ids)
+            for other_mask in masks.values():
+                mask &= other_mask
+            flags = np.unpackbits(mask.view(np.uint8), bitorder='little').astype(bool)
+            return sorted(self._ids[flags].tolist())
@@ -0,0 +1,190 @@
+from typing import List, Dict, Any, Iterable, Optional
+from datetime import datetime
+from enum import Enum
+import logging
+import re
+import uuid
+import weakref
+
+from sqlalchemy import event, inspect, select, func, text
+from sqlalchemy.orm import Session
+from .models import Bus, BusHistory
+
+logger = logging.getLogger(__name__)
+
+# Every Bus column is tracked except the bookkeeping ones
+UNTRACKED_FIELDS = {'id', 'created_at', 'updated_at', 'last_seen_run'}
+TRACKED_FIELDS = [column.key for column in Bus.__table__.columns if column.key not in UNTRACKED_FIELDS]
+
+NUMBER_PATTERN = re.compile(r'\d+(?:\.\d+)?')
+
+def new_run_id() -> str:
+    """Id of an ingest run: its UTC start time, so run ids sort chronologically."""
+    return f"{datetime.utcnow():%Y%m%d%H%M%S%f}-{uuid.uuid4().hex[:6]}"
+
+def month_of(moment: datetime) -> int:
+    """Partition (YYYYMM) a timestamp falls in."""
+    return moment.year * 100 + moment.month
+
+def _stored(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, Enum):
+        return value.name
+    return str(value)
+
+def _amount(value: Optional[str]) -> Optional[float]:
+    """Number in a price text such as '$55,000', None if it has none."""
+    match = NUMBER_PATTERN.search((value or '').replace(',', ''))
+    return float(match.group()) if match else None
+
+# Engine -> whether it has the bus_history table (databases created before it
+# record nothing until create_tables is run again)
+_enabled = weakref.WeakKeyDictionary()
+
+def history_enabled(connection) -> bool:
+    engine = connection.engine
+    if engine not in _enabled:
+        _enabled[engine] = inspect(connection).has_table(BusHistory.__tablename__)
+    return _enabled[engine]
+
+def _pending(session) -> List[tuple]:
+    """(transaction, row) of the changes flushed but not yet written to bus_history."""
+    return session.info.setdefault('bus_history', [])
+
+def changed_fields(obj, fields: Iterable[str] = TRACKED_FIELDS) -> Dict[str, tuple]:
+    """Field -> (old, new) stored values of a flushed-but-pending object, only the ones that changed."""
+    state = inspect(obj)
+    changes = {}
+    for name in fields:
+        history = state.attrs[name].history
+        if not history.added:
+            continue
+        old = _stored(history.deleted[0]) if history.deleted else None
+        new = _stored(history.added[0])
+        if old != new:
+            changes[name] = (old, new)
+    return changes
+
+def _row(bus_id: int, field: str, old: Optional[str], new: Optional[str], now: datetime, run_id: Optional[str]) -> Dict[str, Any]:
+    return {'bus_id': bus_id, 'field': field, 'old_value': old, 'value': new,
+            'changed_at': now, 'month': month_of(now), 'run_id': run_id}
+
+@event.listens_for(Session, 'after_flush')
+def _collect_history(session, flush_context):
+    # Attribute histories still hold the pre-flush values here
+    now = datetime.utcnow()
+    transaction = session.get_nested_transaction() or session.get_transaction()
+    run_id = session.info.get('run_id')
+    pending = _pending(session)
+    for bus in session.new:
+        if isinstance(bus, Bus):
+            # A new bus starts its history with every field it was given
+            values = inspect(bus).dict
+            pending.extend((transaction, _row(bus.id, name, None, _stored(values.get(name)), now, run_id))
+                           for name in TRACKED_FIELDS if values.get(name) not in (None, ''))
+    for bus in session.dirty:
+        if isinstance(bus, Bus) and bus not in session.deleted:
+            pending.extend((transaction, _row(bus.id, name, old, new, now, run_id))
+                           for name, (old, new) in changed_fields(bus).items())
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_rolled_back(session, previous_transaction):
+    # A rolled back savepoint (one bad record of a batch) takes its changes
+    # with it, a rolled back transaction all of them
+    pending = session.info.get('bus_history')
+    if not pending:
+        return
+
+    def rolled_back(transaction) -> bool:
+        while transaction is not None:
+            if transaction is previous_transaction:
+                return True
+            transaction = transaction.parent
+        return False
+
+    session.info['bus_history'] = [entry for entry in pending if not rolled_back(entry[0])]
+
+@event.listens_for(Session, 'before_commit')
+def _write_history(session):
+    # One bulk insert per commit, next to the bus upserts it describes
+    if session.in_nested_transaction():
+        return
+    session.flush()
+    pending = session.info.pop('bus_history', None)
+    if pending:
+        connection = session.connection()
+        if history_enabled(connection):
+            connection.execute(BusHistory.__table__.insert(), [row for _, row in pending])
+
+def bus_as_of(connection, bus_id: int, moment: datetime) -> Optional[Dict[str, Optional[str]]]:
+    """Tracked fields of a bus as they were at ``moment`` (stored as text), None if it did not exist yet.
+
+    One index range scan of the bus's own history rows.
+    """
+    statement = select(BusHistory.field, BusHistory.value) \
+        .where(BusHistory.bus_id == bus_id, BusHistory.changed_at <= moment) \
+        .order_by(BusHistory.changed_at, BusHistory.id)
+    fields = {}
+    for field, value in connection.execute(statement):
+        fields[field] = value
+    return fields or None
+
+def field_as_of(connection, field: str, moment: datetime, bus_ids: Optional[Iterable[int]] = None) -> Dict[int, Optional[str]]:
+    """Value of one field of every bus (or of ``bus_ids``) at ``moment``."""
+    latest = select(func.max(BusHistory.id).label('id')) \
+        .where(BusHistory.field == field, BusHistory.changed_at <= moment) \
+        .group_by(BusHistory.bus_id)
+    if bus_ids is not None:
+        latest = latest.where(BusHistory.bus_id.in_(list(bus_ids)))
+    statement = select(BusHistory.bus_id, BusHistory.value).where(BusHistory.id.in_(latest.scalar_subquery()))
+    return dict(connection.execute(statement).all())
+
+def price_drops(connection, since: datetime, until: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Price decreases recorded between ``since`` and ``until`` (now by default), oldest first.
+
+    Only the monthly partitions of the range are read.
+    """
+    until = until or datetime.utcnow()
+    statement = select(BusHistory.bus_id, BusHistory.old_value, BusHistory.value, BusHistory.changed_at,
+                       BusHistory.run_id) \
+        .where(BusHistory.month.between(month_of(since), month_of(until)), BusHistory.field == 'price',
+               BusHistory.changed_at >= since, BusHistory.changed_at < until) \
+        .order_by(BusHistory.changed_at, BusHistory.id)
+    drops = []
+    for bus_id, old, new, changed_at, run_id in connection.execute(statement):
+        old_amount, new_amount = _amount(old), _amount(new)
+        if old_amount is not None and new_amount is not None and new_amount < old_amount:
+            drops.append({'bus_id': bus_id, 'old_price': old, 'price': new, 'drop': old_amount - new_amount,
+                          'changed_at': changed_at, 'run_id': run_id})
+    return drops
+
+def _next_month(month: int) -> int:
+    year, month = divmod(month, 100)
+    return (year + 1) * 100 + 1 if month == 12 else year * 100 + month + 1
+
+def ensure_partitions(connection, through: datetime) -> List[str]:
+    """Split monthly partitions of bus_history off its catch-all partition up to ``through``.
+
+    MySQL only (other databases keep one table, pruned by the month index);
+    returns the names of the partitions created.
+    """
+    if connection.dialect.name != 'mysql':
+        return []
+    existing = set(connection.execute(text(
+        "SELECT partition_name FROM information_schema.partitions "
+        "WHERE table_schema = DATABASE() AND table_name = :table"
+    ), {'table': BusHistory.__tablename__}).scalars())
+    months = []
+    month = max([int(name[1:]) for name in existing if name and name[1:].isdigit()] or [month_of(datetime.utcnow()) - 1])
+    while (month := _next_month(month)) <= month_of(through):
+        months.append(month)
+    if not months:
+        return []
+    partitions = ', '.join(f"PARTITION p{month} VALUES LESS THAN ({_next_month(month)})" for month in months)
+    connection.execute(text(
+        f"ALTER TABLE {BusHistory.__tablename__} REORGANIZE PARTITION pmax INTO "
+        f"({partitions}, PARTITION pmax VALUES LESS THAN MAXVALUE)"
+    ))
+    logger.info(f"Added {len(months)} bus_history partition(s) through p{months[-1]}")
+    return [f"p{month}" for month in months]
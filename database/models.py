@@ -1,25 +1,13 @@
 from datetime import datetime
-from enum import Enum
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Enum as SQLEnum, Index
+from sqlalchemy import (
+    Column, Integer, BigInteger, Float, String, Text, Boolean, DateTime, LargeBinary, ForeignKey, Enum as SQLEnum,
+    Index
+)
 from sqlalchemy.orm import relationship, declarative_base
+from .enums import AirConditioningType, USRegion
 
 Base = declarative_base()
 
-class AirConditioningType(str, Enum):
-    REAR = "REAR"
-    DASH = "DASH"
-    BOTH = "BOTH"
-    OTHER = "OTHER"
-    NONE = "NONE"
-
-class USRegion(str, Enum):
-    NORTHEAST = "NORTHEAST"
-    MIDWEST = "MIDWEST"
-    WEST = "WEST"
-    SOUTHWEST = "SOUTHWEST"
-    SOUTHEAST = "SOUTHEAST"
-    OTHER = "OTHER"
-
 class Bus(Base):
     __tablename__ = 'buses'
 
@@ -48,7 +36,8 @@ class Bus(Base):
     price = Column(String(30))
     cprice = Column(String(30))
     vin = Column(String(60))
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Never NULL: BusRepository pages on (updated_at, id), which a NULL would drop out of
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     created_at = Column(DateTime, default=datetime.utcnow)
     gvwr = Column(String(50))
     dimensions = Column(String(300))
@@ -63,6 +52,9 @@ class Bus(Base):
     description = Column(Text)
     score = Column(Boolean, default=False)
     category_id = Column(Integer, default=0)
+    # Latest ingest run that saw the listing, and whether a sweep found it gone
+    last_seen_run = Column(String(32))
+    stale = Column(Boolean, default=False)
 
 
     __table_args__ = (
@@ -73,6 +65,8 @@ class Bus(Base):
         Index('idx_bus_mileage', 'mileage'),
         Index('idx_bus_location', 'location'),
         Index('idx_bus_us_region', 'us_region'),
+        Index('idx_bus_updated', 'updated_at', 'id'),
+        Index('idx_bus_seen', 'source', 'last_seen_run'),
     )
 
     overview = relationship("BusOverview", back_populates="bus", uselist=False)
@@ -111,3 +105,148 @@ class BusImage(Base):
 
     def __repr__(self):
         return f"<BusImage(id={self.id}, name='{self.name}', bus_id={self.bus_id})>"
+
+class InventoryRollup(Base):
+    __tablename__ = 'inventory_rollups'
+
+    dimension = Column(String(20), primary_key=True)
+    value = Column(String(300), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index('idx_rollup_count', 'dimension', 'count'),
+    )
+
+    def __repr__(self):
+        return f"<InventoryRollup(dimension='{self.dimension}', value='{self.value}', count={self.count})>"
+
+class ScrapeTask(Base):
+    __tablename__ = 'scrape_tasks'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    task_key = Column(String(64), nullable=False, unique=True)
+    source = Column(String(50), nullable=False)
+    url = Column(String(1000), nullable=False)
+    # Discovery run of its source that last listed the URL
+    generation = Column(Integer, nullable=False, default=0)
+    status = Column(String(10), nullable=False, default='pending')
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    lease_owner = Column(String(100))
+    lease_expires_at = Column(DateTime)
+    last_error = Column(Text)
+    result = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index('idx_task_claim', 'source', 'status', 'available_at'),
+        Index('idx_task_generation', 'source', 'generation', 'status', 'id'),
+    )
+
+    def __repr__(self):
+        return f"<ScrapeTask(id={self.id}, source='{self.source}', status='{self.status}', attempts={self.attempts})>"
+
+class BusSignature(Base):
+    __tablename__ = 'bus_signatures'
+
+    bus_id = Column(Integer, primary_key=True, autoincrement=False)
+    signature = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<BusSignature(bus_id={self.bus_id})>"
+
+class BusLSHBucket(Base):
+    __tablename__ = 'bus_lsh_buckets'
+
+    bucket = Column(BigInteger, primary_key=True, autoincrement=False)
+    bus_id = Column(Integer, primary_key=True, autoincrement=False)
+
+    __table_args__ = (
+        Index('idx_lsh_bus', 'bus_id'),
+    )
+
+    def __repr__(self):
+        return f"<BusLSHBucket(bucket={self.bucket}, bus_id={self.bus_id})>"
+
+class BusEntity(Base):
+    __tablename__ = 'bus_entities'
+
+    bus_id = Column(Integer, primary_key=True, autoincrement=False)
+    entity_id = Column(Integer, nullable=False)
+    score = Column(Float)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index('idx_entity', 'entity_id'),
+    )
+
+    def __repr__(self):
+        return f"<BusEntity(bus_id={self.bus_id}, entity_id={self.entity_id})>"
+
+class BusHistory(Base):
+    __tablename__ = 'bus_history'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    bus_id = Column(Integer, nullable=False)
+    field = Column(String(50), nullable=False)
+    old_value = Column(Text)
+    value = Column(Text)
+    changed_at = Column(DateTime, nullable=False)
+    # YYYYMM of changed_at, the partitioning key
+    month = Column(Integer, nullable=False)
+    run_id = Column(String(32))
+
+    __table_args__ = (
+        Index('idx_history_bus', 'bus_id', 'field', 'changed_at'),
+        Index('idx_history_month', 'month', 'field'),
+    )
+
+    def __repr__(self):
+        return f"<BusHistory(bus_id={self.bus_id}, field='{self.field}', value='{self.value}', changed_at={self.changed_at})>"
+
+class OutboxEvent(Base):
+    __tablename__ = 'outbox'
+
+    # Position in the feed; consumers checkpoint the last id they processed
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String(10), nullable=False)
+    op = Column(String(6), nullable=False)
+    bus_id = Column(Integer)
+    row_id = Column(Integer)
+    # JSON list of the changed fields of an update
+    fields = Column(Text)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    # Never reuse the ids of pruned events
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    def __repr__(self):
+        return f"<OutboxEvent(id={self.id}, entity='{self.entity}', op='{self.op}', row_id={self.row_id})>"
+
+class OutboxCursor(Base):
+    __tablename__ = 'outbox_cursors'
+
+    consumer = Column(String(100), primary_key=True)
+    position = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<OutboxCursor(consumer='{self.consumer}', position={self.position})>"
+
+class IngestRun(Base):
+    __tablename__ = 'ingest_runs'
+
+    # One row per source a run loaded completely
+    run_id = Column(String(32), primary_key=True)
+    source = Column(String(300), primary_key=True)
+    finished_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('idx_run_source', 'source', 'run_id'),
+    )
+
+    def __repr__(self):
+        return f"<IngestRun(run_id='{self.run_id}', source='{self.source}')>"
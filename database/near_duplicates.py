@@ -0,0 +1,200 @@
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from itertools import combinations
+import hashlib
+import logging
+import os
+import re
+import weakref
+import zlib
+
+import numpy as np
+from sqlalchemy import event, inspect, select, delete
+from sqlalchemy.orm import Session
+from .models import Bus, BusOverview, BusSignature, BusLSHBucket
+from .changes import flushed_bus_ids
+
+logger = logging.getLogger(__name__)
+
+# Estimated Jaccard similarity above which two listings are near duplicates
+# (the same bus reposted with small edits)
+THRESHOLD = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', 0.8))
+
+# Whether DataProcessor updates a near duplicate instead of inserting a new
+# bus when no VIN, title or URL match is found
+NEAR_DUPLICATE_MATCHING = os.getenv('NEAR_DUPLICATE_MATCHING', 'false').lower() in ('1', 'true', 'yes')
+
+# 128 MinHash values split into 16 bands of 8: two listings share a bucket
+# with probability 1 - (1 - s^8)^16, i.e. ~0.06 at s=0.5, ~0.95 at s=0.8
+# and >0.99 at s=0.9, so only likely matches are ever compared.
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# Words per shingle
+SHINGLE_SIZE = 3
+
+# Buckets shared by more buses than this (boilerplate texts) are skipped
+# when listing all pairs, to keep that pass linear
+MAX_BUCKET_SIZE = 200
+
+# Fixed so that stored signatures stay comparable between runs
+SEED = 1013
+_PRIME = np.uint64((1 << 61) - 1)
+_MASK = np.uint64(0xFFFFFFFF)
+_rng = np.random.RandomState(SEED)
+_A = _rng.randint(1, 1 << 32, NUM_PERM, dtype=np.uint64)[:, None]
+_B = _rng.randint(0, 1 << 32, NUM_PERM, dtype=np.uint64)[:, None]
+
+WORD_PATTERN = re.compile(r'\w+', re.UNICODE)
+STOP_WORDS = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'}
+
+def normalize_text(*parts: Optional[str]) -> List[str]:
+    """Lowercase words of the given texts, without punctuation and stop words."""
+    words = []
+    for part in parts:
+        words.extend(word for word in WORD_PATTERN.findall((part or '').lower()) if word not in STOP_WORDS)
+    return words
+
+def shingles(words: List[str]) -> np.ndarray:
+    """32-bit hashes of the distinct word shingles of a text."""
+    if len(words) < SHINGLE_SIZE:
+        grams = {' '.join(words)} if words else set()
+    else:
+        grams = {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    return np.fromiter((zlib.crc32(gram.encode('utf-8')) for gram in grams), dtype=np.uint64, count=len(grams))
+
+def signature(title: Optional[str], description: Optional[str] = None, specs: Optional[str] = None) -> Optional[np.ndarray]:
+    """MinHash signature (NUM_PERM uint32 values) of a listing's text, None if it has no words."""
+    hashes = shingles(normalize_text(title, description, specs))
+    if not len(hashes):
+        return None
+    # (a * x + b) mod p for every permutation and shingle; a, b and x are
+    # below 2^32, so the products fit in 64 bits
+    return (((_A * hashes + _B) % _PRIME) & _MASK).min(axis=1).astype(np.uint32)
+
+def similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the texts behind two signatures."""
+    return float(np.count_nonzero(first == second)) / NUM_PERM
+
+def buckets(signature: np.ndarray) -> List[int]:
+    """LSH bucket of each band of a signature, as signed 64-bit keys."""
+    keys = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(signature[band * ROWS:(band + 1) * ROWS].tobytes(),
+                                 digest_size=8, person=band.to_bytes(2, 'little')).digest()
+        keys.append(int.from_bytes(digest, 'little', signed=True))
+    return keys
+
+# Engine -> whether it has the signature tables (databases created before
+# them skip signing until create_tables is run again)
+_enabled = weakref.WeakKeyDictionary()
+
+def signatures_enabled(connection) -> bool:
+    engine = connection.engine
+    if engine not in _enabled:
+        _enabled[engine] = inspect(connection).has_table(BusSignature.__tablename__)
+    return _enabled[engine]
+
+def _texts(connection, bus_ids: Optional[List[int]]) -> Iterable[Tuple[int, Optional[str], Optional[str], Optional[str]]]:
+    statement = select(Bus.id, Bus.title, Bus.description, BusOverview.specs) \
+        .outerjoin(BusOverview, BusOverview.bus_id == Bus.id)
+    if bus_ids is not None:
+        statement = statement.where(Bus.id.in_(bus_ids))
+    return connection.execute(statement)
+
+def update_signatures(connection, bus_ids: Optional[Iterable[int]] = None) -> int:
+    """Recompute the signatures and buckets of ``bus_ids`` (all buses by default).
+
+    Ids of buses that no longer exist lose their signature.
+    """
+    if bus_ids is not None:
+        bus_ids = sorted(set(bus_ids))
+        if not bus_ids:
+            return 0
+        for table in (BusSignature, BusLSHBucket):
+            connection.execute(delete(table).where(table.bus_id.in_(bus_ids)))
+    else:
+        connection.execute(delete(BusLSHBucket))
+        connection.execute(delete(BusSignature))
+
+    signatures, bucket_rows = [], []
+    for bus_id, title, description, specs in _texts(connection, bus_ids):
+        values = signature(title, description, specs)
+        if values is None:
+            continue
+        signatures.append({'bus_id': bus_id, 'signature': values.tobytes()})
+        bucket_rows.extend({'bucket': bucket, 'bus_id': bus_id} for bucket in set(buckets(values)))
+    if signatures:
+        connection.execute(BusSignature.__table__.insert(), signatures)
+        connection.execute(BusLSHBucket.__table__.insert(), bucket_rows)
+    return len(signatures)
+
+def load_signatures(connection, bus_ids: Iterable[int]) -> Dict[int, np.ndarray]:
+    """Stored signatures of the given buses (buses without text have none)."""
+    statement = select(BusSignature.bus_id, BusSignature.signature).where(BusSignature.bus_id.in_(list(bus_ids)))
+    return {bus_id: np.frombuffer(value, dtype=np.uint32) for bus_id, value in connection.execute(statement)}
+
+def near_duplicate_ids(connection, values: np.ndarray, threshold: float = THRESHOLD,
+                       exclude: Iterable[int] = ()) -> List[Tuple[int, float]]:
+    """Ids and similarity of the stored buses whose text is near ``values``, most similar first.
+
+    Only buses sharing at least one LSH bucket are read and compared, so the
+    cost depends on the number of likely matches, not on the table size.
+    """
+    statement = select(BusLSHBucket.bus_id).where(BusLSHBucket.bucket.in_(buckets(values))).distinct()
+    candidates = set(connection.execute(statement).scalars()) - set(exclude)
+    if not candidates:
+        return []
+    scored = [(bus_id, similarity(values, other)) for bus_id, other in load_signatures(connection, candidates).items()]
+    return sorted([match for match in scored if match[1] >= threshold], key=lambda match: (-match[1], match[0]))
+
+def find_near_duplicates(session, data: Dict[str, Any], threshold: float = THRESHOLD) -> List[Tuple[Bus, float]]:
+    """Stored buses whose title, description and specs are near those of a listing dict."""
+    values = signature(data.get('title'), data.get('description'), data.get('specs'))
+    if values is None or not signatures_enabled(session.connection()):
+        return []
+    matches = near_duplicate_ids(session.connection(), values, threshold)
+    buses = {bus.id: bus for bus in session.scalars(select(Bus).where(Bus.id.in_([bus_id for bus_id, _ in matches])))}
+    return [(buses[bus_id], score) for bus_id, score in matches if bus_id in buses]
+
+def near_duplicate_pairs(connection, threshold: float = THRESHOLD) -> List[Tuple[int, int, float]]:
+    """Every pair of stored buses that are near duplicates, most similar first.
+
+    Candidate pairs come from buses sharing an LSH bucket (one ordered pass
+    over the bucket table), and only those are compared.
+    """
+    pairs = set()
+    members, current = [], None
+    rows = connection.execute(select(BusLSHBucket.bucket, BusLSHBucket.bus_id).order_by(BusLSHBucket.bucket))
+    for bucket, bus_id in [*rows, (None, None)]:
+        if bucket != current:
+            if 1 < len(members) <= MAX_BUCKET_SIZE:
+                pairs.update(combinations(sorted(members), 2))
+            elif len(members) > MAX_BUCKET_SIZE:
+                logger.warning(f"Skipping LSH bucket {current} shared by {len(members)} buses")
+            members, current = [], bucket
+        members.append(bus_id)
+
+    signatures = load_signatures(connection, {bus_id for pair in pairs for bus_id in pair})
+    scored = [(first, second, similarity(signatures[first], signatures[second])) for first, second in pairs]
+    return sorted([pair for pair in scored if pair[2] >= threshold], key=lambda pair: (-pair[2], pair[0], pair[1]))
+
+@event.listens_for(Session, 'after_flush')
+def _collect_unsigned(session, flush_context):
+    session.info.setdefault('unsigned_buses', set()).update(flushed_bus_ids(session))
+
+@event.listens_for(Session, 'before_commit')
+def _update_signatures(session):
+    # Signed from the stored texts at every commit, savepoints included, so
+    # a later record of the same batch can already match an earlier one
+    session.flush()
+    unsigned = session.info.pop('unsigned_buses', None)
+    if unsigned:
+        connection = session.connection()
+        if signatures_enabled(connection):
+            update_signatures(connection, unsigned)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_unsigned(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop('unsigned_buses', None)
@@ -0,0 +1,168 @@
+from typing import List, Dict, Any, Iterator, Optional
+from datetime import datetime, timedelta
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+
+from sqlalchemy import event, inspect, select, delete, func
+from sqlalchemy.orm import Session
+from .models import Bus, BusOverview, BusImage, OutboxEvent, OutboxCursor
+from .history import TRACKED_FIELDS, changed_fields
+from .upsert import upsert
+
+logger = logging.getLogger(__name__)
+
+# Entity name and changed fields reported for each mapped class
+ENTITIES = {
+    Bus: ('bus', TRACKED_FIELDS),
+    BusOverview: ('overview', ['mdesc', 'intdesc', 'extdesc', 'features', 'specs']),
+    BusImage: ('image', ['name', 'url', 'description', 'image_index'])
+}
+INSERT, UPDATE, DELETE = 'insert', 'update', 'delete'
+
+# A gap in the ids may be a transaction that has not committed yet (ids are
+# taken at flush time, and a batch stays open until its last record), so
+# readers wait this long after first seeing a gap before skipping past it
+SETTLE_SECONDS = float(os.getenv('OUTBOX_SETTLE_SECONDS', 60))
+
+# Engine -> whether it has the outbox table (databases created before it
+# write no events until create_tables is run again)
+_enabled = weakref.WeakKeyDictionary()
+
+def outbox_enabled(connection) -> bool:
+    engine = connection.engine
+    if engine not in _enabled:
+        _enabled[engine] = inspect(connection).has_table(OutboxEvent.__tablename__)
+    return _enabled[engine]
+
+def _event(obj, op: str, now: datetime, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    entity, _ = ENTITIES[type(obj)]
+    return {'entity': entity, 'op': op, 'bus_id': obj.id if isinstance(obj, Bus) else obj.bus_id,
+            'row_id': obj.id, 'fields': json.dumps(fields) if fields else None, 'created_at': now}
+
+@event.listens_for(Session, 'after_flush')
+def _write_events(session, flush_context):
+    # Written within the flush, so the events commit or roll back (savepoints
+    # included) together with the rows they describe
+    now = datetime.utcnow()
+    events = []
+    for obj in session.new:
+        if type(obj) in ENTITIES:
+            events.append(_event(obj, INSERT, now))
+    for obj in session.dirty:
+        if type(obj) in ENTITIES and obj not in session.deleted:
+            fields = sorted(changed_fields(obj, ENTITIES[type(obj)][1]))
+            if fields:
+                events.append(_event(obj, UPDATE, now, fields))
+    for obj in session.deleted:
+        if type(obj) in ENTITIES and inspect(obj).has_identity:
+            events.append(_event(obj, DELETE, now))
+    if events:
+        connection = session.connection()
+        if outbox_enabled(connection):
+            connection.execute(OutboxEvent.__table__.insert(), events)
+
+def _as_dict(row) -> Dict[str, Any]:
+    values = row._asdict()
+    values['fields'] = json.loads(values['fields']) if values['fields'] else None
+    return values
+
+class OutboxReader:
+    """Follows the outbox from a consumer's checkpoint.
+
+    Delivery is at least once: a batch is checkpointed only when the next one
+    is requested (or commit() is called), so a consumer that crashes midway
+    gets the batch again on restart.
+    """
+
+    def __init__(self, connector, consumer: str, batch_size: int = 500, settle_seconds: float = SETTLE_SECONDS,
+                 clock=time.monotonic):
+        self.connector = connector
+        self.consumer = consumer
+        self.batch_size = batch_size
+        self.settle_seconds = settle_seconds
+        self.clock = clock
+        self.position = self._load_position()
+        # First missing id of each gap -> when this reader first saw it
+        self._gaps: Dict[int, float] = {}
+
+    def _load_position(self) -> int:
+        with self.connector.engine.connect() as connection:
+            statement = select(OutboxCursor.position).where(OutboxCursor.consumer == self.consumer)
+            return connection.execute(statement).scalar() or 0
+
+    def read(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Next events after the current position, oldest first, without moving it.
+
+        Stops before a gap in the ids this reader has seen for less than
+        settle_seconds: its events may still be committed by a writer whose
+        transaction is open. How old the events around it are says nothing
+        about that, so the gap is timed from when it was first seen.
+        """
+        statement = select(OutboxEvent.__table__).where(OutboxEvent.id > self.position) \
+            .order_by(OutboxEvent.id).limit(limit or self.batch_size)
+        with self.connector.engine.connect() as connection:
+            rows = connection.execute(statement).all()
+        now = self.clock()
+        # Time every gap of the fetch from now on, not only the first one, so
+        # that several gaps settle together rather than one after the other
+        expected = self.position + 1
+        for row in rows:
+            if row.id != expected:
+                self._gaps.setdefault(expected, now)
+            expected = row.id + 1
+
+        events, expected = [], self.position + 1
+        for row in rows:
+            if row.id != expected:
+                seen = self._gaps[expected]
+                if now - seen < self.settle_seconds:
+                    break
+                logger.warning(f"{self.consumer}: skipping outbox ids {expected}-{row.id - 1}, "
+                               f"missing for {now - seen:.0f}s")
+            events.append(_as_dict(row))
+            expected = row.id + 1
+        return events
+
+    def commit(self, position: int) -> None:
+        """Checkpoint: every event up to ``position`` has been processed."""
+        with self.connector.engine.begin() as connection:
+            upsert(connection, OutboxCursor.__table__,
+                   [{'consumer': self.consumer, 'position': position, 'updated_at': datetime.utcnow()}],
+                   ['consumer'])
+        self.position = position
+        self._gaps = {start: seen for start, seen in self._gaps.items() if start > position}
+
+    def batches(self, poll_interval: float = 1.0, stop: Optional[threading.Event] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Batches of new events as they arrive, checkpointing each one once the next is requested.
+
+        Polls every ``poll_interval`` seconds while there is nothing new, until
+        ``stop`` is set (forever without one, or only once with a zero interval).
+        """
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            events = self.read()
+            if events:
+                yield events
+                self.commit(events[-1]['id'])
+                continue
+            if poll_interval <= 0:
+                return
+            stop.wait(poll_interval)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Events one at a time, from the checkpoint to the current end of the feed."""
+        for events in self.batches(poll_interval=0):
+            yield from events
+
+def prune_outbox(connection, older_than: timedelta) -> int:
+    """Delete events older than ``older_than`` that every consumer has processed."""
+    processed = connection.execute(select(func.min(OutboxCursor.position))).scalar()
+    if processed is None:
+        return 0
+    statement = delete(OutboxEvent).where(OutboxEvent.id <= processed,
+                                          OutboxEvent.created_at < datetime.utcnow() - older_than)
+    return connection.execute(statement).rowcount
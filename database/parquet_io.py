@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+from typing import List, Dict, Any, Optional, Iterator, Iterable, Union
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, Integer, Boolean, DateTime, String, Text, Enum as SQLEnum
+from database.models import Bus, BusOverview, BusImage
+
+logger = logging.getLogger(__name__)
+
+TABLE_MODELS = {
+    'buses': Bus,
+    'buses_overview': BusOverview,
+    'buses_images': BusImage
+}
+
+OVERVIEW_FIELDS = ['mdesc', 'intdesc', 'extdesc', 'features', 'specs']
+IMAGE_FIELDS = ['name', 'url', 'description']
+GENERATED_FIELDS = {'id', 'created_at', 'updated_at', 'last_seen_run', 'stale'}
+
+# Parquet filters use the pyarrow DNF format, e.g. [('source', '=', 'Daimler')]
+Filters = Optional[List[Any]]
+
+# Command line filter: column, comparison, value
+FILTER_PATTERN = re.compile(r'^\s*(\w+)\s*(!=|>=|<=|=|<|>)\s*(.*)$')
+
+def _pyarrow():
+    """Import pyarrow on demand, it is only needed for Parquet files."""
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet support requires the 'pyarrow' package") from e
+    return pyarrow
+
+def _arrow_type(column):
+    pa = _pyarrow()
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp('us')
+    if isinstance(column.type, SQLEnum):
+        return pa.dictionary(pa.int8(), pa.string())
+    return pa.string()
+
+def table_schema(model):
+    """Arrow schema matching the columns of an ORM model."""
+    pa = _pyarrow()
+    return pa.schema([pa.field(column.name, _arrow_type(column)) for column in model.__table__.columns])
+
+def _listing_columns() -> List:
+    columns = [column for column in Bus.__table__.columns if column.name not in GENERATED_FIELDS]
+    columns += [BusOverview.__table__.columns[name] for name in OVERVIEW_FIELDS]
+    return columns
+
+def listing_schema():
+    """Arrow schema of a flattened scrape snapshot."""
+    pa = _pyarrow()
+    image_type = pa.struct([pa.field(name, pa.string()) for name in IMAGE_FIELDS])
+    fields = [pa.field(column.name, _arrow_type(column)) for column in _listing_columns()]
+    fields.append(pa.field('images', pa.list_(image_type)))
+    fields.append(pa.field('extra', pa.string()))
+    return pa.schema(fields)
+
+def _coerce(value: Any, column) -> Any:
+    """Coerce a scraped value to the type of the column it is stored in."""
+    if value is None or value == '':
+        return None
+    if isinstance(column.type, Boolean):
+        if isinstance(value, str):
+            return value.strip().lower() in ('yes', 'true', '1', 'y')
+        return bool(value)
+    if isinstance(column.type, Integer):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+    if isinstance(column.type, (String, Text)):
+        return getattr(value, 'value', value) if isinstance(column.type, SQLEnum) else str(value)
+    return value
+
+def flatten_listing(listing: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a scraped listing into a row of the listing schema."""
+    if hasattr(listing, 'to_dict'):
+        listing = listing.to_dict()
+    columns = _listing_columns()
+    known = {column.name for column in columns} | {'images'}
+    row = {column.name: _coerce(listing.get(column.name), column) for column in columns}
+    row['images'] = [
+        {name: (str(img[name]) if img.get(name) is not None else None) for name in IMAGE_FIELDS}
+        for img in listing.get('images') or []
+    ]
+    extra = {key: value for key, value in listing.items() if key not in known}
+    row['extra'] = json.dumps(extra, ensure_ascii=False, default=str) if extra else None
+    return row
+
+def unflatten_listing(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a listing row back into the dict shape the ingest path expects."""
+    listing = {key: value for key, value in row.items() if value is not None and key not in ('images', 'extra')}
+    listing['images'] = [
+        {key: value for key, value in img.items() if value is not None}
+        for img in row.get('images') or []
+    ]
+    if row.get('extra'):
+        listing.update(json.loads(row['extra']))
+    return listing
+
+def _write_batches(path: Union[str, Path], schema, rows: Iterable[Dict[str, Any]], batch_size: int) -> int:
+    pa = _pyarrow()
+    count = 0
+    with pa.parquet.ParquetWriter(str(path), schema) as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
+
+def export_tables(output_dir: str, session=None, batch_size: int = 10000) -> Dict[str, str]:
+    """Export buses, buses_overview and buses_images to one Parquet file each."""
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+    if session is None:
+        from database import db
+        with db.get_session() as session:
+            return export_tables(output_dir, session, batch_size)
+
+    paths = {}
+    for table_name, model in TABLE_MODELS.items():
+        path = Path(output_dir) / f"{table_name}.parquet"
+        rows = (
+            dict(row._mapping)
+            for row in session.execute(
+                select(model.__table__).execution_options(yield_per=batch_size)
+            )
+        )
+        count = _write_batches(path, table_schema(model), rows, batch_size)
+        logger.info(f"Exported {count} rows from {table_name} to {path}")
+        paths[table_name] = str(path)
+    return paths
+
+def export_snapshot(snapshot_path: str, output_path: str, batch_size: int = 10000) -> int:
+    """Convert a scrape snapshot (JSON or JSON Lines) into a listing Parquet file."""
+    from utils.snapshot import iter_snapshot
+
+    rows = (flatten_listing(listing) for listing in iter_snapshot(snapshot_path))
+    count = _write_batches(output_path, listing_schema(), rows, batch_size)
+    logger.info(f"Exported {count} listings from {snapshot_path} to {output_path}")
+    return count
+
+def _typed_value(schema, column: str, value: Any) -> Any:
+    """Text filter value (e.g. from the command line) as the type of its Parquet column."""
+    pa = _pyarrow()
+    if isinstance(value, (list, tuple, set)):
+        return [_typed_value(schema, column, item) for item in value]
+    if not isinstance(value, str) or schema.get_field_index(column) < 0:
+        return value
+    field_type = schema.field(column).type
+    if pa.types.is_dictionary(field_type):
+        field_type = field_type.value_type
+    if pa.types.is_string(field_type) or pa.types.is_large_string(field_type):
+        return value
+    try:
+        return pa.scalar(value).cast(field_type).as_py()
+    except (ValueError, NotImplementedError) as e:
+        raise ValueError(f"Filter value {value!r} of {column} is not a valid {field_type}") from e
+
+def _typed_filters(filters: List[Any], schema) -> List[Any]:
+    """Filters with their values cast to the column types of ``schema``, so that
+    numbers and dates are compared as such rather than as text."""
+    if filters and isinstance(filters[0], list):
+        return [_typed_filters(conjunction, schema) for conjunction in filters]
+    return [(column, op, _typed_value(schema, column, value)) for column, op, value in filters]
+
+def _dataset_batches(path: Union[str, Path], filters: Filters = None, batch_size: int = 1000,
+                     expression=None) -> Iterator[List[Dict[str, Any]]]:
+    pa = _pyarrow()
+    dataset = pa.dataset.dataset(str(path), format='parquet')
+    if filters is not None:
+        expression = pa.parquet.filters_to_expression(_typed_filters(filters, dataset.schema))
+    for batch in dataset.to_batches(filter=expression, batch_size=batch_size):
+        if batch.num_rows:
+            yield batch.to_pylist()
+
+def iter_listings(path: str, filters: Filters = None, batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+    """Read a listing file or a table export back as batches of listing dicts.
+
+    ``filters`` are pushed down to the Parquet reader and apply to listing
+    columns, or to the ``buses`` table for a table export directory.
+    """
+    if not Path(path).is_dir():
+        for rows in _dataset_batches(path, filters, batch_size):
+            yield [unflatten_listing(row) for row in rows]
+        return
+
+    pa = _pyarrow()
+    for buses in _dataset_batches(Path(path) / 'buses.parquet', filters, batch_size):
+        bus_ids = [bus['id'] for bus in buses]
+        in_batch = pa.dataset.field('bus_id').isin(bus_ids)
+
+        overviews = {}
+        for rows in _dataset_batches(Path(path) / 'buses_overview.parquet', expression=in_batch):
+            overviews.update((row['bus_id'], row) for row in rows)
+
+        images = {}
+        for rows in _dataset_batches(Path(path) / 'buses_images.parquet', expression=in_batch):
+            for row in rows:
+                images.setdefault(row['bus_id'], []).append(row)
+
+        listings = []
+        for bus in buses:
+            listing = {key: value for key, value in bus.items() if key not in GENERATED_FIELDS and value is not None}
+            overview = overviews.get(bus['id'], {})
+            listing.update({key: overview[key] for key in OVERVIEW_FIELDS if overview.get(key) is not None})
+            listing['images'] = [
+                {key: img[key] for key in IMAGE_FIELDS if img.get(key) is not None}
+                for img in sorted(images.get(bus['id'], []), key=lambda img: img['image_index'] or 0)
+            ]
+            listings.append(listing)
+        yield listings
+
+def load_parquet(path: str, processor=None, filters: Filters = None, batch_size: int = 1000) -> int:
+    """Push a Parquet listing file or table export through the bulk ingest path."""
+    if processor is None:
+        from database.processor import DataProcessor
+        processor = DataProcessor()
+
+    saved = 0
+    for listings in iter_listings(path, filters, batch_size):
+        saved += len(processor.save_multiple_buses(listings))
+    logger.info(f"Loaded {saved} buses from {path}")
+    return saved
+
+def _parse_filter(expression: str):
+    """Parse a 'column<op>value' command line filter, op being one of =, !=, <, <=, >, >=.
+
+    The value is kept as text and cast to the column type once the file is opened.
+    """
+    match = FILTER_PATTERN.match(expression)
+    if match is None:
+        raise argparse.ArgumentTypeError(f"Invalid filter: {expression!r}, expected column=value")
+    return match.groups()
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Export and import bus inventory as Parquet")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help="Export the database tables")
+    export_parser.add_argument('--output-dir', default='parquet_export')
+
+    snapshot_parser = subparsers.add_parser('snapshot', help="Convert a scrape snapshot")
+    snapshot_parser.add_argument('snapshot')
+    snapshot_parser.add_argument('output')
+
+    load_parser = subparsers.add_parser('load', help="Load a listing file or table export")
+    load_parser.add_argument('path')
+    load_parser.add_argument('--filter', action='append', type=_parse_filter, default=None,
+                             help="Only load rows matching column=value, or column<value etc. (repeatable)")
+    load_parser.add_argument('--batch-size', type=int, default=1000)
+
+    args = parser.parse_args()
+    if args.command == 'export':
+        export_tables(args.output_dir)
+    elif args.command == 'snapshot':
+        export_snapshot(args.snapshot, args.output)
+    else:
+        load_parquet(args.path, filters=args.filter, batch_size=args.batch_size)
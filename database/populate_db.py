@@ -2,28 +2,45 @@
 import os
 import sys
 import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any
+from itertools import islice
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable, Tuple
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database.db_connector import DatabaseConnector
 from database.processor import DataProcessor
-from scrapers.daimler_scraper import DaimlerScraper
-from scrapers.micro_bird_scraper import MicroBirdScraper
-from scrapers.ross_scraper import RossScraper
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('database_population.log'),
-        logging.StreamHandler()
-    ]
-)
+from database.history import new_run_id
+from database.sweep import finish_run, stamp_seen
+from utils.snapshot import iter_snapshot, load_index, read_snapshot_range
+from utils.snapshot_diff import latest_snapshots
+
 logger = logging.getLogger(__name__)
 
+# Snapshot file prefixes written by run_scrapers.py and the source name they carry
+SNAPSHOT_SOURCES = {
+    'daimlerscraper': 'Daimler',
+    'microbirdscraper': 'MicroBird',
+    'rossscraper': 'Ross'
+}
+
+# (path, start, stop) of listings to load; start/stop are None for unindexed files
+LoadTask = Tuple[str, Optional[int], Optional[int]]
+
+# Listing fields DataProcessor.find_duplicates matches an existing bus on
+TITLE_KEY_FIELDS = ['title', 'year', 'make', 'model']
+
+_worker_processor = None
+
 def populate_database():
+    # Snapshot loads never scrape, so the scraper stack is only imported here
+    from scrapers.daimler_scraper import DaimlerScraper
+    from scrapers.micro_bird_scraper import MicroBirdScraper
+    from scrapers.ross_scraper import RossScraper
+
     try:
         db = DatabaseConnector()
         processor = DataProcessor()
@@ -44,20 +61,29 @@ def populate_database():
                 buses_data = scraper.scrape()
                 total_buses += len(buses_data)
                 
-                for bus_data in buses_data:
-                    try:
-                        bus_data['source'] = scraper.__class__.__name__.replace('Scraper', '')
-                        bus_data['scraped'] = True
+                # One session and connection per source, one savepoint per listing
+                source = scraper.__class__.__name__.replace('Scraper', '')
+                with processor.db.unit_of_work() as session:
+                    seen = []
+                    for bus_data in buses_data:
+                        try:
+                            bus_data.source = source
+                            bus_data.scraped = True
                         
-                        bus = processor.save_bus_data(bus_data)
-                        if bus:
-                            successful_buses += 1
-                            logger.info(f"Successfully saved bus with ID: {bus.id}")
-                        else:
-                            logger.error(f"Failed to save bus data: {bus_data.get('title', 'Unknown')}")
-                    except Exception as e:
-                        logger.error(f"Error processing bus data: {str(e)}")
-                        continue
+                            bus = processor.save_bus_data(bus_data, session)
+                            if bus:
+                                seen.append(bus.id)
+                                successful_buses += 1
+                                logger.info(f"Successfully saved bus with ID: {bus.id}")
+                            else:
+                                logger.error(f"Failed to save bus data: {bus_data.title or 'Unknown'}")
+                        except Exception as e:
+                            logger.error(f"Error processing bus data: {str(e)}")
+                            continue
+                    stamp_seen(session, processor.run_id, seen)
+                    # An empty scrape more likely means a broken scraper than an empty lot
+                    if seen:
+                        finish_run(session, processor.run_id, [source])
                 
                 logger.info(f"Completed processing for {scraper.__class__.__name__}")
                 
@@ -79,10 +105,206 @@ def populate_database():
         if 'db' in locals():
             db.close()
 
+def find_snapshots(snapshot_dir: str = 'scraped_data') -> List[str]:
+    """Latest snapshot of every source in a snapshot directory."""
+    paths = []
+    for prefix in SNAPSHOT_SOURCES:
+        paths.extend(latest_snapshots(snapshot_dir, prefix, count=1))
+    return paths
+
+def plan_load_tasks(paths: Iterable[str], chunk_size: int = 500) -> List[LoadTask]:
+    """Split snapshot files into chunks of listings for the loader workers.
+
+    Indexed JSON Lines snapshots are split into ranges of listings (read by
+    the blocks they lie in); other files are loaded by a single worker.
+    """
+    tasks = []
+    for path in paths:
+        index = load_index(path)
+        if index is None:
+            tasks.append((str(path), None, None))
+            continue
+        tasks.extend(
+            (str(path), start, min(start + chunk_size, index['count']))
+            for start in range(0, index['count'], chunk_size)
+        )
+    return tasks
+
+def _snapshot_source(path: str) -> Optional[str]:
+    prefix = Path(path).name.split('_', 1)[0]
+    return SNAPSHOT_SOURCES.get(prefix)
+
+def _read_task(task: LoadTask) -> Tuple[List[Dict[str, Any]], bool]:
+    """Listings of a task, and whether they came from a full snapshot (not a change set)."""
+    path, start, stop = task
+    if start is None:
+        records = list(iter_snapshot(path))
+    else:
+        records = read_snapshot_range(path, start, stop)
+
+    listings = []
+    full = True
+    source = _snapshot_source(path)
+    for record in records:
+        # Change sets written by utils.snapshot_diff wrap listings in events
+        if 'op' in record:
+            full = False
+            if record['op'] not in ('added', 'changed'):
+                continue
+            record = record['listing']
+        if source:
+            record.setdefault('source', source)
+        record['scraped'] = True
+        listings.append(record)
+    return listings, full
+
+def identity_keys(listing: Dict[str, Any]) -> List[str]:
+    """Keys under which DataProcessor.find_duplicates can match a listing to a stored bus."""
+    keys = []
+    if listing.get('vin'):
+        keys.append(f"vin:{listing['vin']}")
+    if all(listing.get(field) for field in TITLE_KEY_FIELDS):
+        keys.append('title:' + '|'.join(str(listing[field]) for field in TITLE_KEY_FIELDS))
+    url = listing.get('source_url') or listing.get('url')
+    if url:
+        keys.append(f"url:{url}")
+    return keys
+
+def _read_keyed_task(task: LoadTask) -> Tuple[List[Dict[str, Any]], bool, List[str]]:
+    """Listings of a task, whether they came from a full snapshot, and their identity keys."""
+    listings, full = _read_task(task)
+    return listings, full, sorted({key for listing in listings for key in identity_keys(listing)})
+
+def group_load_tasks(tasks: List[Any], keys: List[Iterable[str]]) -> List[List[Any]]:
+    """Group tasks whose listings share an identity key (``keys[i]`` are those of ``tasks[i]``),
+    each group in task order.
+
+    A group is loaded by one worker, one task after the other, so no two
+    workers look up and insert the same bus at the same time (which would
+    store it twice). Listings of different sources rarely share keys, so
+    most tasks end up in a group of their own.
+    """
+    parent = list(range(len(tasks)))
+
+    def find(item: int) -> int:
+        while item != parent[item]:
+            parent[item] = item = parent[parent[item]]
+        return item
+
+    owner = {}
+    for number, task_keys in enumerate(keys):
+        for key in task_keys:
+            first, second = find(owner.setdefault(key, number)), find(number)
+            if first != second:
+                parent[max(first, second)] = min(first, second)
+
+    groups = {}
+    for number, task in enumerate(tasks):
+        groups.setdefault(find(number), []).append(task)
+    return list(groups.values())
+
+def _init_worker(run_id: Optional[str] = None):
+    """Give every loader process its own connection pool."""
+    global _worker_processor
+    _worker_processor = DataProcessor(DatabaseConnector(), run_id=run_id)
+
+def _load_listings(task: LoadTask, listings: List[Dict[str, Any]], full: bool) -> Tuple[int, int, bool]:
+    """Saved and total listings of a task, and whether it covered its part of a full snapshot."""
+    try:
+        saved = _worker_processor.save_multiple_buses(listings, raise_on_error=True)
+    except Exception:
+        # The commit failed, so its buses were not seen; rejected listings are no failure
+        return 0, len(listings), False
+    logger.info(f"Loaded {len(saved)}/{len(listings)} buses from {task[0]} [{task[1]}:{task[2]}]")
+    return len(saved), len(listings), full
+
+def _load_task(task: LoadTask) -> Tuple[int, int, bool]:
+    return _load_listings(task, *_read_task(task))
+
+def _load_group(group: List[Tuple[LoadTask, List[Dict[str, Any]], bool]]) -> List[Tuple[int, int, bool]]:
+    return [_load_listings(task, listings, full) for task, listings, full in group]
+
+def populate_from_snapshots(paths: Iterable[str], workers: int = 4, chunk_size: int = 500) -> int:
+    """Load saved snapshot files into the database without scraping.
+
+    Files are split into chunks that a pool of loader processes ingests
+    through DataProcessor.save_multiple_buses, each with its own
+    DatabaseConnector. Chunks that share a VIN, URL or title are loaded by
+    the same worker (group_load_tasks). All workers record their changes
+    under one run id.
+    """
+    run_id = new_run_id()
+    tasks = plan_load_tasks(paths, chunk_size)
+
+    if workers <= 1:
+        logger.info(f"Loading {len(tasks)} chunks")
+        _init_worker(run_id)
+        results = [_load_task(task) for task in tasks]
+        _worker_processor.db.close()
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(run_id,)) as executor:
+            # The workers read the chunks once, in parallel, and the loaders get
+            # the parsed listings along with their group
+            read = list(executor.map(_read_keyed_task, tasks))
+            groups = group_load_tasks([(task, listings, full) for task, (listings, full, _) in zip(tasks, read)],
+                                      [keys for _, _, keys in read])
+            logger.info(f"Loading {len(tasks)} chunks in {len(groups)} group(s) with {workers} workers")
+            grouped = list(executor.map(_load_group, groups))
+        tasks = [task for group in groups for task, _, _ in group]
+        results = [result for group in grouped for result in group]
+
+    # Sources loaded completely (and not empty) end the run for the stale listing sweep
+    complete, saved_per_source = {}, {}
+    for task, (saved, _, covered) in zip(tasks, results):
+        source = _snapshot_source(task[0])
+        if source:
+            complete[source] = complete.get(source, True) and covered
+            saved_per_source[source] = saved_per_source.get(source, 0) + saved
+    connector = DatabaseConnector()
+    try:
+        with connector.engine.begin() as connection:
+            finish_run(connection, run_id, [source for source, covered in complete.items()
+                                            if covered and saved_per_source[source]])
+    finally:
+        connector.close()
+
+    successful_buses = sum(saved for saved, _, _ in results)
+    total_buses = sum(total for _, total, _ in results)
+    logger.info(f"Snapshot load completed:")
+    logger.info(f"Total buses processed: {total_buses}")
+    logger.info(f"Successfully saved: {successful_buses}")
+    logger.info(f"Failed: {total_buses - successful_buses}")
+    return successful_buses
+
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('database_population.log'),
+            logging.StreamHandler()
+        ]
+    )
+
+    parser = argparse.ArgumentParser(description="Populate the database from scrape snapshots")
+    parser.add_argument('snapshots', nargs='*',
+                        help="Snapshot or change set files (default: latest snapshot of each source)")
+    parser.add_argument('--snapshot-dir', default='scraped_data', help="Directory written by run_scrapers.py")
+    parser.add_argument('--workers', type=int, default=4, help="Number of loader processes")
+    parser.add_argument('--chunk-size', type=int, default=500, help="Listings per loader task")
+    parser.add_argument('--scrape', action='store_true', help="Scrape all sources instead of loading snapshots")
+    args = parser.parse_args()
+
     try:
-        successful_buses = populate_database()
+        if args.scrape:
+            successful_buses = populate_database()
+        else:
+            snapshots = args.snapshots or find_snapshots(args.snapshot_dir)
+            if not snapshots:
+                logger.error(f"No snapshots found in {args.snapshot_dir}, run scripts/run_scrapers.py first")
+                sys.exit(1)
+            successful_buses = populate_from_snapshots(snapshots, args.workers, args.chunk_size)
         sys.exit(0 if successful_buses > 0 else 1)
     except Exception as e:
         logger.error(f"Script failed: {str(e)}")
-        sys.exit(1) 
\ No newline at end of file
+        sys.exit(1)
@@ -1,162 +1,279 @@
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Union
 from datetime import datetime, UTC, timedelta
+import json
 import logging
 import re
-from . import db, Bus, BusOverview, BusImage
+from functools import partial
+from operator import attrgetter
+import numpy as np
+from sqlalchemy import String, Enum as SQLEnum
+from . import db, Bus, BusOverview, BusImage, USRegion
+from .near_duplicates import NEAR_DUPLICATE_MATCHING, find_near_duplicates
+from .history import new_run_id
+from .sweep import stamp_seen
+from scrapers.records import ScrapedListing, ScrapedImage
+from utils.locations import resolve_region
 
 logger = logging.getLogger(__name__)
 
+REQUIRED_FIELDS = ['title', 'year', 'make', 'model']
+
+# Bus columns kept up by the loader itself, never taken from a listing
+LOADER_FIELDS = {'last_seen_run', 'stale'}
+
+# Maximum lengths come straight from the Bus column definitions.
+FIELD_LENGTH_LIMITS = {
+    column.name: column.type.length
+    for column in Bus.__table__.columns
+    if isinstance(column.type, String) and not isinstance(column.type, SQLEnum) and column.type.length
+    and column.name not in LOADER_FIELDS
+}
+
+FORMAT_RULES = [
+    ('vin', re.compile(r'^[A-HJ-NPR-Z0-9]{17}$'), "Invalid VIN format"),
+    ('contact_email', re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'), "Invalid email format"),
+    ('contact_phone', re.compile(r'^\+?1?\d{9,15}$'), "Invalid phone format"),
+]
+
+MIN_YEAR = 1900
+
+BATCH_FIELDS = sorted(
+    set(REQUIRED_FIELDS) | set(FIELD_LENGTH_LIMITS) | {field for field, _, _ in FORMAT_RULES}
+)
+
+# Bus columns filled from a listing as text, the remaining ones are set explicitly
+TEXT_FIELDS = [
+    'title', 'year', 'make', 'model', 'body', 'chassis', 'engine', 'transmission', 'mileage',
+    'passengers', 'wheelchair', 'color', 'interior_color', 'exterior_color', 'source', 'source_url',
+    'price', 'cprice', 'vin', 'gvwr', 'dimensions', 'state_bus_standard', 'location', 'brake',
+    'contact_email', 'contact_phone', 'description'
+]
+OVERVIEW_FIELDS = ['mdesc', 'intdesc', 'extdesc', 'features', 'specs']
+# Listing fields that are never copied onto an existing Bus
+PROTECTED_FIELDS = {'id', 'created_at', 'updated_at', 'images', 'overview'} | LOADER_FIELDS
+
+_batch_row = attrgetter(*BATCH_FIELDS)
+_as_str = np.frompyfunc(str, 1, 1)
+_len = np.frompyfunc(len, 1, 1)
+
+def _matches(pattern: re.Pattern, values: np.ndarray) -> np.ndarray:
+    """Boolean mask of the values matching a precompiled pattern."""
+    return np.fromiter(map(bool, map(pattern.match, values)), dtype=bool, count=len(values))
+
+def _present(value: Any) -> bool:
+    """Whether a field counts as given; NaN (e.g. from pandas sources) means missing."""
+    return bool(value) and value == value
+
+def _year_number(value: Any) -> Optional[int]:
+    """Year of a listing as a number, None if it is not one."""
+    try:
+        return int(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+_year_numbers = np.frompyfunc(_year_number, 1, 1)
+
+def _field_getter(data: Union[ScrapedListing, Dict[str, Any]]):
+    """Field lookup for a listing record (attributes) or a plain dict (keys)."""
+    if isinstance(data, ScrapedListing):
+        return partial(getattr, data)
+    return data.get
+
+def _text(value: Any) -> str:
+    """Text stored for an optional listing field; structured specs are kept as JSON."""
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
 class DataProcessor:
-    def __init__(self):
+    def __init__(self, db_connector=None, near_duplicates: Optional[bool] = None, run_id: Optional[str] = None):
         self.logger = logging.getLogger(self.__class__.__name__)
+        self.db = db_connector or db
+        # Also match reposts with edited texts (see database.near_duplicates)
+        self.near_duplicates = NEAR_DUPLICATE_MATCHING if near_duplicates is None else near_duplicates
+        # Ingest run the changes are recorded under in bus_history
+        self.run_id = run_id or new_run_id()
 
-    def validate_bus_data(self, data: Dict[str, Any]) -> Tuple[bool, List[str]]:
+    def validate_bus_data(self, data: Union[ScrapedListing, Dict[str, Any]]) -> Tuple[bool, List[str]]:
         """Validate bus data against schema requirements."""
+        get = _field_getter(data)
         errors = []
         
         # Required fields validation
-        required_fields = ['title', 'year', 'make', 'model']
-        for field in required_fields:
-            if not data.get(field):
+        for field in REQUIRED_FIELDS:
+            if not _present(get(field)):
                 errors.append(f"Missing required field: {field}")
 
         # String length validation
-        length_limits = {
-            'title': 256,
-            'year': 10,
-            'make': 25,
-            'model': 50,
-            'body': 25,
-            'chassis': 25,
-            'engine': 60,
-            'transmission': 60,
-            'mileage': 100,
-            'passengers': 60,
-            'wheelchair': 60,
-            'color': 60,
-            'interior_color': 60,
-            'exterior_color': 60,
-            'source': 300,
-            'source_url': 1000,
-            'price': 30,
-            'cprice': 30,
-            'vin': 60,
-            'gvwr': 50,
-            'dimensions': 300,
-            'state_bus_standard': 25,
-            'location': 30,
-            'brake': 30,
-            'contact_email': 100,
-            'contact_phone': 100
-        }
-
-        for field, limit in length_limits.items():
-            if data.get(field) and len(str(data[field])) > limit:
+        for field, limit in FIELD_LENGTH_LIMITS.items():
+            value = get(field)
+            if _present(value) and len(str(value)) > limit:
                 errors.append(f"Field {field} exceeds maximum length of {limit}")
 
-        # VIN validation (if provided)
-        if data.get('vin'):
-            vin_pattern = r'^[A-HJ-NPR-Z0-9]{17}$'
-            if not re.match(vin_pattern, data['vin']):
-                errors.append("Invalid VIN format")
-
-        # Email validation (if provided)
-        if data.get('contact_email'):
-            email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-            if not re.match(email_pattern, data['contact_email']):
-                errors.append("Invalid email format")
-
-        # Phone validation (if provided)
-        if data.get('contact_phone'):
-            phone_pattern = r'^\+?1?\d{9,15}$'
-            if not re.match(phone_pattern, data['contact_phone']):
-                errors.append("Invalid phone format")
+        # Format validation (if provided)
+        for field, pattern, message in FORMAT_RULES:
+            value = get(field)
+            if _present(value) and not pattern.match(str(value)):
+                errors.append(message)
 
         # Year validation
-        if data.get('year'):
-            try:
-                year = int(data['year'])
-                if not (1900 <= year <= datetime.now().year + 1):
-                    errors.append("Invalid year")
-            except ValueError:
+        year = get('year')
+        if _present(year):
+            year = _year_number(year)
+            if year is None:
                 errors.append("Year must be a valid number")
+            elif not (MIN_YEAR <= year <= datetime.now().year + 1):
+                errors.append("Invalid year")
 
         return len(errors) == 0, errors
 
-    def find_duplicates(self, data: Dict[str, Any], session) -> List[Bus]:
-        """Find potential duplicate buses using multiple criteria."""
+    def validate_batch(self, records: List[Union[ScrapedListing, Dict[str, Any]]]) -> List[List[str]]:
+        """Validate a chunk of records column by column.
+
+        Produces the same messages as validate_bus_data, in the same order,
+        and returns one error list per record (empty when the record is valid).
+        """
+        errors = [[] for _ in records]
+        if not records:
+            return errors
+
+        # pandas is only needed here, keep it out of the import path of the loaders
+        import pandas as pd
+
+        if any(isinstance(record, ScrapedListing) for record in records):
+            records = [
+                _batch_row(record) if isinstance(record, ScrapedListing) else tuple(map(record.get, BATCH_FIELDS))
+                for record in records
+            ]
+        frame = pd.DataFrame(records, columns=BATCH_FIELDS, dtype=object)
+        present = {}
+        given = {}
+        strings = {}
+        for field in BATCH_FIELDS:
+            column = frame[field].to_numpy()
+            mask = column.astype(bool)
+            values = column[mask]
+            if pd.api.types.infer_dtype(values, skipna=False) != 'string':
+                # NaN (e.g. from pandas sources) is truthy but means missing
+                mask &= pd.notna(column)
+                values = column[mask]
+                strings[field] = _as_str(values)
+            else:
+                strings[field] = values
+            present[field] = mask
+            given[field] = values
+
+        def add_errors(mask: np.ndarray, message: str) -> None:
+            for i in np.flatnonzero(mask):
+                errors[i].append(message)
+
+        def scatter(field: str, failed: np.ndarray) -> np.ndarray:
+            """Map a mask over the present values of a field back to record positions."""
+            result = np.zeros(len(records), dtype=bool)
+            result[present[field]] = failed
+            return result
+
+        for field in REQUIRED_FIELDS:
+            add_errors(~present[field], f"Missing required field: {field}")
+
+        for field, limit in FIELD_LENGTH_LIMITS.items():
+            if len(strings[field]):
+                too_long = _len(strings[field]).astype(np.int64) > limit
+                add_errors(scatter(field, too_long), f"Field {field} exceeds maximum length of {limit}")
+
+        for field, pattern, message in FORMAT_RULES:
+            if len(strings[field]):
+                invalid = ~_matches(pattern, strings[field])
+                add_errors(scatter(field, invalid), message)
+
+        # Parsed from the values as given, like validate_bus_data (2019.0 is a
+        # year, '2019.0' is not), into Python ints so huge numbers cannot overflow
+        years = _year_numbers(given['year'])
+        if len(years):
+            numeric = np.not_equal(years, None).astype(bool)
+            values = years[numeric]
+            out_of_range = np.zeros(len(years), dtype=bool)
+            out_of_range[numeric] = ((values < MIN_YEAR) | (values > datetime.now().year + 1)).astype(bool)
+            add_errors(scatter('year', out_of_range), "Invalid year")
+            add_errors(scatter('year', ~numeric), "Year must be a valid number")
+
+        return errors
+
+    def find_duplicates(self, data: Union[ScrapedListing, Dict[str, Any]], session) -> List[Bus]:
+        """Find potential duplicate buses using multiple criteria.
+
+        A bus with a different VIN is never a duplicate, however much else of
+        the listing matches (dealers list identical buses of one fleet).
+        """
+        get = _field_getter(data)
+        vin = get('vin')
         duplicates = []
+
+        def may_be_same(bus: Bus) -> bool:
+            return not (vin and bus.vin and bus.vin != vin)
         
         # Check by VIN (most reliable)
-        if data.get('vin'):
-            vin_duplicates = session.query(Bus).filter_by(vin=data['vin']).all()
+        if vin:
+            vin_duplicates = session.query(Bus).filter_by(vin=vin).all()
             if vin_duplicates:
                 duplicates.extend(vin_duplicates)
                 return duplicates
 
         # Check by title, year, make, and model combination
-        if all(data.get(field) for field in ['title', 'year', 'make', 'model']):
+        if all(get(field) for field in ['title', 'year', 'make', 'model']):
             title_duplicates = session.query(Bus).filter(
-                Bus.title == data['title'],
-                Bus.year == data['year'],
-                Bus.make == data['make'],
-                Bus.model == data['model']
+                Bus.title == get('title'),
+                Bus.year == get('year'),
+                Bus.make == get('make'),
+                Bus.model == get('model')
             ).all()
-            if title_duplicates:
-                duplicates.extend(title_duplicates)
+            duplicates.extend(filter(may_be_same, title_duplicates))
 
         # Check by source URL (if available)
-        if data.get('source_url'):
-            url_duplicates = session.query(Bus).filter_by(source_url=data['source_url']).all()
-            if url_duplicates:
-                duplicates.extend(url_duplicates)
+        if get('source_url'):
+            url_duplicates = session.query(Bus).filter_by(source_url=get('source_url')).all()
+            duplicates.extend(filter(may_be_same, url_duplicates))
+
+        # Last resort: the same text posted again with small edits
+        if not duplicates and self.near_duplicates:
+            listing = ScrapedListing.coerce(data)
+            text = {'title': listing.title, 'description': listing.description, 'specs': _text(listing.specs)}
+            for bus, score in find_near_duplicates(session, text):
+                if may_be_same(bus):
+                    self.logger.info(f"Near duplicate of bus {bus.id} (similarity {score:.2f})")
+                    duplicates.append(bus)
 
         return duplicates
 
-    def process_bus_data(self, data: Dict[str, Any]) -> Optional[Bus]:
-        """Process raw bus data and create a Bus object."""
+    def process_bus_data(self, data: Union[ScrapedListing, Dict[str, Any]],
+                         errors: Optional[List[str]] = None) -> Optional[Bus]:
+        """Process raw bus data and create a Bus object.
+
+        ``errors`` are the validation errors of the record when the caller
+        already validated it (see validate_batch).
+        """
         try:
+            listing = ScrapedListing.coerce(data)
+
             # Validate data first
-            is_valid, errors = self.validate_bus_data(data)
-            if not is_valid:
+            if errors is None:
+                _, errors = self.validate_bus_data(listing)
+            if errors:
                 self.logger.error(f"Data validation failed: {', '.join(errors)}")
                 return None
 
-            print(f"\nProcessing bus data with VIN: {data.get('vin')}")
+            print(f"\nProcessing bus data with VIN: {listing.vin}")
             
-            bus_data = {
-                'title': str(data.get('title', '')),
-                'year': str(data.get('year', '')),
-                'make': str(data.get('make', '')),
-                'model': str(data.get('model', '')),
-                'body': str(data.get('body', '')),
-                'chassis': str(data.get('chassis', '')),
-                'engine': str(data.get('engine', '')),
-                'transmission': str(data.get('transmission', '')),
-                'mileage': str(data.get('mileage', '')),
-                'passengers': str(data.get('passengers', '')),
-                'wheelchair': str(data.get('wheelchair', '')),
-                'color': str(data.get('color', '')),
-                'interior_color': str(data.get('interior_color', '')),
-                'exterior_color': str(data.get('exterior_color', '')),
-                'source': str(data.get('source', '')),
-                'source_url': str(data.get('source_url', '')),
-                'price': str(data.get('price', '')),
-                'cprice': str(data.get('cprice', '')),
-                'vin': str(data.get('vin', '')),
-                'gvwr': str(data.get('gvwr', '')),
-                'dimensions': str(data.get('dimensions', '')),
-                'luggage': bool(data.get('luggage', False)),
-                'state_bus_standard': str(data.get('state_bus_standard', '')),
-                'airconditioning': data.get('airconditioning'),
-                'location': str(data.get('location', '')),
-                'brake': str(data.get('brake', '')),
-                'contact_email': str(data.get('contact_email', '')),
-                'contact_phone': str(data.get('contact_phone', '')),
-                'us_region': data.get('us_region'),
-                'description': str(data.get('description', '')),
-                'scraped': True
-            }
+            bus_data = {field: _text(getattr(listing, field)) for field in TEXT_FIELDS}
+            bus_data.update(
+                luggage=bool(listing.luggage),
+                airconditioning=listing.airconditioning,
+                us_region=resolve_region(listing.location) if listing.us_region in (None, USRegion.OTHER)
+                else listing.us_region,
+                scraped=True
+            )
             
             bus = Bus(**bus_data)
             print(f"Created bus object with ID: {getattr(bus, 'id', None)}")
@@ -166,21 +283,15 @@ class DataProcessor:
             print(f"Error in process_bus_data: {str(e)}")
             return None
 
-    def process_overview_data(self, bus_id: int, data: Dict[str, Any]) -> Optional[BusOverview]:
+    def process_overview_data(self, bus_id: int, data: Union[ScrapedListing, Dict[str, Any]]) -> Optional[BusOverview]:
         """Process overview data and create a BusOverview object."""
         try:
             print(f"\nProcessing overview data for bus_id: {bus_id}")
+            listing = ScrapedListing.coerce(data)
             
-            overview_data = {
-                'bus_id': bus_id,
-                'mdesc': str(data.get('mdesc', '')),
-                'intdesc': str(data.get('intdesc', '')),
-                'extdesc': str(data.get('extdesc', '')),
-                'features': str(data.get('features', '')),
-                'specs': str(data.get('specs', ''))
-            }
+            overview_data = {field: _text(getattr(listing, field)) for field in OVERVIEW_FIELDS}
             
-            overview = BusOverview(**overview_data)
+            overview = BusOverview(bus_id=bus_id, **overview_data)
             print(f"Created overview object with ID: {getattr(overview, 'id', None)}")
             return overview
         except Exception as e:
@@ -188,20 +299,20 @@ class DataProcessor:
             print(f"Error in process_overview_data: {str(e)}")
             return None
 
-    def process_image_data(self, bus_id: int, images: List[Dict[str, Any]]) -> List[BusImage]:
+    def process_image_data(self, bus_id: int, images: List[Union[ScrapedImage, Dict[str, Any]]]) -> List[BusImage]:
         """Process image data and create BusImage objects."""
         try:
             print(f"\nProcessing image data for bus_id: {bus_id}")
-            image_objects = [
-                BusImage(
+            image_objects = []
+            for i, img in enumerate(images):
+                image = ScrapedImage.from_dict(img)
+                image_objects.append(BusImage(
                     bus_id=bus_id,
-                    name=img.get('name', f'image_{i}'),
-                    url=img.get('url'),
-                    description=img.get('description'),
+                    name=image.name or f'image_{i}',
+                    url=image.url,
+                    description=image.description,
                     image_index=i
-                )
-                for i, img in enumerate(images)
-            ]
+                ))
             print(f"Created {len(image_objects)} image objects")
             return image_objects
         except Exception as e:
@@ -209,75 +320,101 @@ class DataProcessor:
             print(f"Error in process_image_data: {str(e)}")
             return []
 
-    def save_bus_data(self, data: Dict[str, Any]) -> Optional[Bus]:
-        """Save processed bus data to database."""
-        print(f"\nStarting save_bus_data with VIN: {data.get('vin')}")
-        session = db.session
-        try:
-            duplicates = self.find_duplicates(data, session)
-            
-            if duplicates:
-                print(f"Found {len(duplicates)} potential duplicate(s)")
-                for dup in duplicates:
-                    self.logger.info(f"Duplicate found - ID: {dup.id}, VIN: {dup.vin}, Title: {dup.title}")
-                
-                bus = duplicates[0]
-                self.logger.info(f"Updating existing bus with ID: {bus.id}")
-                print(f"Current updated_at: {bus.updated_at}")
-                
-                for key, value in data.items():
-                    if hasattr(bus, key) and key not in ['id', 'created_at', 'updated_at', 'images', 'overview']:
-                        print(f"Updating {key} from {getattr(bus, key)} to {value}")
-                        setattr(bus, key, value)
-                
-                new_timestamp = datetime.now(UTC) + timedelta(seconds=1)
-                print(f"Setting new updated_at to: {new_timestamp}")
-                bus.updated_at = new_timestamp
-            else:
-                print("No duplicates found, creating new bus")
-                bus = self.process_bus_data(data)
-                if bus:
-                    print(f"Adding new bus to session with ID: {getattr(bus, 'id', None)}")
-                    session.add(bus)
-                    session.flush()
+    def _apply_listing(self, listing: ScrapedListing, data: Union[ScrapedListing, Dict[str, Any]], session,
+                       errors: Optional[List[str]] = None) -> Optional[Bus]:
+        """Add or update the bus of a listing, with its overview and images, without committing."""
+        session.info['run_id'] = self.run_id
+        duplicates = self.find_duplicates(listing, session)
+
+        if duplicates:
+            print(f"Found {len(duplicates)} potential duplicate(s)")
+            for dup in duplicates:
+                self.logger.info(f"Duplicate found - ID: {dup.id}, VIN: {dup.vin}, Title: {dup.title}")
+
+            bus = duplicates[0]
+            self.logger.info(f"Updating existing bus with ID: {bus.id}")
+            print(f"Current updated_at: {bus.updated_at}")
+
+            # Plain dicts (e.g. change sets) may carry explicit Nones that clear a field
+            updates = data if isinstance(data, dict) else listing.to_dict()
+            for key, value in updates.items():
+                if hasattr(bus, key) and key not in PROTECTED_FIELDS:
+                    print(f"Updating {key} from {getattr(bus, key)} to {value}")
+                    setattr(bus, key, value)
 
+            # Listed again after a sweep flagged it as gone
+            if bus.stale:
+                bus.stale = False
+
+            new_timestamp = datetime.now(UTC) + timedelta(seconds=1)
+            print(f"Setting new updated_at to: {new_timestamp}")
+            bus.updated_at = new_timestamp
+        else:
+            print("No duplicates found, creating new bus")
+            bus = self.process_bus_data(listing, errors)
             if bus:
-                print(f"Bus object created/updated with ID: {getattr(bus, 'id', None)}")
-                print(f"Final updated_at value: {getattr(bus, 'updated_at', None)}")
-                
-                if any(key in data for key in ['mdesc', 'intdesc', 'extdesc', 'features', 'specs']):
-                    print("Processing overview data")
-                    existing_overview = session.query(BusOverview).filter_by(bus_id=bus.id).first()
-                    if existing_overview:
-                        print(f"Deleting existing overview with ID: {existing_overview.id}")
-                        session.delete(existing_overview)
-                    
-                    overview = self.process_overview_data(bus.id, data)
-                    if overview:
-                        print(f"Adding new overview to session with ID: {getattr(overview, 'id', None)}")
-                        session.add(overview)
-
-                if data.get('images'):
-                    print("Processing image data")
-                    existing_images = session.query(BusImage).filter_by(bus_id=bus.id).all()
-                    if existing_images:
-                        print(f"Deleting {len(existing_images)} existing images")
-                        for img in existing_images:
-                            session.delete(img)
-                    
-                    images = self.process_image_data(bus.id, data['images'])
-                    for image in images:
-                        print(f"Adding image to session with ID: {getattr(image, 'id', None)}")
-                        session.add(image)
+                print(f"Adding new bus to session with ID: {getattr(bus, 'id', None)}")
+                session.add(bus)
+                session.flush()
+
+        if not bus:
+            print("No bus object created/updated")
+            return None
+
+        print(f"Bus object created/updated with ID: {getattr(bus, 'id', None)}")
+        print(f"Final updated_at value: {getattr(bus, 'updated_at', None)}")
+
+        if any(getattr(listing, field) is not None for field in OVERVIEW_FIELDS):
+            print("Processing overview data")
+            existing_overview = session.query(BusOverview).filter_by(bus_id=bus.id).first()
+            if existing_overview:
+                print(f"Deleting existing overview with ID: {existing_overview.id}")
+                session.delete(existing_overview)
+
+            overview = self.process_overview_data(bus.id, listing)
+            if overview:
+                print(f"Adding new overview to session with ID: {getattr(overview, 'id', None)}")
+                session.add(overview)
+
+        if listing.images:
+            print("Processing image data")
+            existing_images = session.query(BusImage).filter_by(bus_id=bus.id).all()
+            if existing_images:
+                print(f"Deleting {len(existing_images)} existing images")
+                for img in existing_images:
+                    session.delete(img)
+
+            images = self.process_image_data(bus.id, listing.images)
+            for image in images:
+                print(f"Adding image to session with ID: {getattr(image, 'id', None)}")
+                session.add(image)
+
+        session.flush()
+        return bus
 
+    def save_bus_data(self, data: Union[ScrapedListing, Dict[str, Any]], session=None) -> Optional[Bus]:
+        """Save processed bus data to database.
+
+        With a ``session`` (see DatabaseConnector.unit_of_work) the record is
+        written inside a savepoint of that session and left for the caller to
+        commit; a failure only rolls back this record.
+        """
+        listing = ScrapedListing.coerce(data)
+        print(f"\nStarting save_bus_data with VIN: {listing.vin}")
+
+        if session is not None:
+            return self._save_in_savepoint(listing, data, session)
+
+        session = self.db.session
+        try:
+            bus = self._apply_listing(listing, data, session)
+            if bus:
+                stamp_seen(session, self.run_id, [bus.id])
                 print("Committing session")
                 session.commit()
                 self.logger.info(f"Successfully saved bus data with ID: {bus.id}")
                 print(f"Successfully saved bus with ID: {bus.id}")
-                return bus
-
-            print("No bus object created/updated")
-            return None
+            return bus
 
         except Exception as e:
             self.logger.error(f"Error saving bus data: {str(e)}")
@@ -288,17 +425,81 @@ class DataProcessor:
             print("Closing session")
             session.close()
 
-    def save_multiple_buses(self, data_list: List[Dict[str, Any]]) -> List[Bus]:
-        """Save multiple bus records to database."""
-        print(f"\nStarting save_multiple_buses with {len(data_list)} buses")
+    def _save_in_savepoint(self, listing: ScrapedListing, data: Union[ScrapedListing, Dict[str, Any]], session,
+                           errors: Optional[List[str]] = None) -> Optional[Bus]:
+        """Write one record inside a savepoint of ``session``, rolling back only it on failure."""
+        savepoint = session.begin_nested()
+        try:
+            bus = self._apply_listing(listing, data, session, errors)
+            savepoint.commit()
+            return bus
+        except Exception as e:
+            self.logger.error(f"Error saving bus data: {str(e)}")
+            print(f"Error in save_bus_data: {str(e)}")
+            savepoint.rollback()
+            return None
+
+    def _save_batch(self, session, data_list: List[Union[ScrapedListing, Dict[str, Any]]]) -> List[Bus]:
+        """Save every record of a batch in its own savepoint of ``session``."""
+        listings = [ScrapedListing.coerce(data) for data in data_list]
+        # One columnar validation pass for the whole batch instead of one per record
+        batch_errors = self.validate_batch(listings)
         saved_buses = []
-        for i, data in enumerate(data_list):
+        for i, (listing, data, errors) in enumerate(zip(listings, data_list, batch_errors)):
             print(f"\nProcessing bus {i+1}/{len(data_list)}")
-            bus = self.save_bus_data(data)
+            bus = self._save_in_savepoint(listing, data, session, errors)
             if bus:
                 saved_buses.append(bus)
                 print(f"Successfully saved bus {i+1} with ID: {bus.id}")
             else:
                 print(f"Failed to save bus {i+1}")
+        # One bulk stamp for the whole batch instead of a write per bus
+        stamp_seen(session, self.run_id, [bus.id for bus in saved_buses])
+        return saved_buses
+
+    def save_multiple_buses(self, data_list: List[Union[ScrapedListing, Dict[str, Any]]],
+                            raise_on_error: bool = False) -> List[Bus]:
+        """Save multiple bus records to database.
+
+        The whole batch shares one session and connection and is committed
+        once. Every record gets its own savepoint, so a bad record is skipped
+        without rolling back the others.
+
+        A batch that fails to commit returns an empty list, like one whose
+        records were all rejected; with ``raise_on_error`` it raises instead,
+        so the caller can tell the two apart.
+        """
+        print(f"\nStarting save_multiple_buses with {len(data_list)} buses")
+        try:
+            with self.db.unit_of_work() as session:
+                saved_buses = self._save_batch(session, data_list)
+        except Exception as e:
+            self.logger.error(f"Error committing batch of {len(data_list)} buses: {str(e)}")
+            if raise_on_error:
+                raise
+            return []
         print(f"Completed save_multiple_buses. Successfully saved {len(saved_buses)} buses")
-        return saved_buses 
\ No newline at end of file
+        return saved_buses
+
+    async def save_multiple_buses_async(self, data_list: List[Union[ScrapedListing, Dict[str, Any]]],
+                                        async_connector=None, raise_on_error: bool = False) -> List[Bus]:
+        """Async variant of save_multiple_buses for code running in an event loop.
+
+        The same insert-or-update logic runs on an AsyncSession (through
+        run_sync), so other coroutines keep running while the database
+        round trips of the batch are awaited.
+        """
+        if async_connector is None:
+            from .async_connector import async_db as async_connector
+
+        print(f"\nStarting save_multiple_buses_async with {len(data_list)} buses")
+        try:
+            async with async_connector.unit_of_work() as session:
+                saved_buses = await session.run_sync(self._save_batch, data_list)
+        except Exception as e:
+            self.logger.error(f"Error committing batch of {len(data_list)} buses: {str(e)}")
+            if raise_on_error:
+                raise
+            return []
+        print(f"Completed save_multiple_buses_async. Successfully saved {len(saved_buses)} buses")
+        return saved_buses
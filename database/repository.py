@@ -0,0 +1,120 @@
+from typing import List, Dict, Any, Optional, Iterator, Sequence, Tuple, Union
+from datetime import datetime
+
+from sqlalchemy import select, and_, or_
+from sqlalchemy.orm import joinedload, selectinload, raiseload
+from .models import Bus, BusOverview, BusImage
+
+# Relationship loading per use case. The overview is one row per bus and is
+# joined in; images are many per bus and are fetched with one extra
+# "WHERE bus_id IN (...)" query per page. Anything not listed raises instead
+# of lazy loading, so a forgotten relationship shows up as an error rather
+# than as one query per bus.
+LOAD_PRESETS = {
+    'bare': [raiseload('*')],
+    'overview': [joinedload(Bus.overview), raiseload('*')],
+    'images': [selectinload(Bus.images), raiseload('*')],
+    'full': [joinedload(Bus.overview), selectinload(Bus.images)]
+}
+
+# Keyset orders: column that pages are sorted on, with Bus.id as tie breaker
+ORDERS = ('id', 'updated_at')
+
+Cursor = Union[int, Tuple[datetime, int]]
+
+class BusRepository:
+    """Read access to buses with their overview and images in a fixed number of queries.
+
+    Pages are fetched with keyset pagination (``WHERE id > :last_id``), so
+    reading page 1000 costs the same as reading page 1, and rows inserted
+    while iterating do not shift the pages.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    def _select(self, preset: str, where: Sequence):
+        if preset not in LOAD_PRESETS:
+            raise ValueError(f"Unknown load preset: {preset}")
+        return select(Bus).options(*LOAD_PRESETS[preset]).where(*where)
+
+    def get(self, bus_id: int, preset: str = 'full') -> Optional[Bus]:
+        return self.session.scalars(self._select(preset, [Bus.id == bus_id])).unique().first()
+
+    def latest(self, limit: int = 10, preset: str = 'full', where: Sequence = ()) -> List[Bus]:
+        """Most recently created buses."""
+        statement = self._select(preset, where).order_by(Bus.created_at.desc(), Bus.id.desc()).limit(limit)
+        return list(self.session.scalars(statement).unique())
+
+    def page(self, limit: int = 500, after: Optional[Cursor] = None, order: str = 'id',
+             preset: str = 'full', where: Sequence = ()) -> Tuple[List[Bus], Optional[Cursor]]:
+        """One page of buses after ``after`` and the cursor of the next page (None at the end).
+
+        With ``order='updated_at'`` pages follow modification time, so a
+        consumer can resume from its last cursor to read only changed buses.
+        """
+        order_columns = _order_columns(order)
+        statement = self._select(preset, [*where, *_after(order, after)]).order_by(*order_columns).limit(limit)
+        buses = list(self.session.scalars(statement).unique())
+        next_cursor = _cursor(order, buses[-1]) if len(buses) == limit else None
+        return buses, next_cursor
+
+    def iter_pages(self, page_size: int = 500, order: str = 'id', preset: str = 'full',
+                   where: Sequence = ()) -> Iterator[List[Bus]]:
+        """All buses matching ``where``, one page (and one or two queries) at a time."""
+        cursor = None
+        while True:
+            buses, cursor = self.page(page_size, cursor, order, preset, where)
+            if buses:
+                yield buses
+            if cursor is None:
+                return
+
+    def iter_rows(self, columns: Sequence[str], page_size: int = 5000, order: str = 'id',
+                  where: Sequence = ()) -> Iterator[Dict[str, Any]]:
+        """Only the given Bus columns, as dicts, without building ORM objects."""
+        order_columns = _order_columns(order)
+        selected = [getattr(Bus, name) for name in columns]
+        keys = [column for column in order_columns if column.key not in columns]
+        cursor = None
+        while True:
+            statement = select(*selected, *keys).where(*where, *_after(order, cursor))
+            rows = self.session.execute(statement.order_by(*order_columns).limit(page_size)).all()
+            for row in rows:
+                yield {name: getattr(row, name) for name in columns}
+            if len(rows) < page_size:
+                return
+            cursor = _cursor(order, rows[-1])
+
+    def images_by_bus(self, bus_ids: Sequence[int]) -> Dict[int, List[BusImage]]:
+        """Images of many buses in one query, in image order."""
+        images = {bus_id: [] for bus_id in bus_ids}
+        statement = select(BusImage).where(BusImage.bus_id.in_(bus_ids)) \
+            .order_by(BusImage.bus_id, BusImage.image_index)
+        for image in self.session.scalars(statement):
+            images[image.bus_id].append(image)
+        return images
+
+    def overviews_by_bus(self, bus_ids: Sequence[int]) -> Dict[int, BusOverview]:
+        """Overviews of many buses in one query."""
+        statement = select(BusOverview).where(BusOverview.bus_id.in_(bus_ids))
+        return {overview.bus_id: overview for overview in self.session.scalars(statement)}
+
+def _order_columns(order: str) -> List:
+    if order == 'id':
+        return [Bus.id]
+    if order == 'updated_at':
+        return [Bus.updated_at, Bus.id]
+    raise ValueError(f"Unsupported order: {order} (expected one of {', '.join(ORDERS)})")
+
+def _after(order: str, cursor: Optional[Cursor]) -> List:
+    """Keyset condition selecting the rows after ``cursor``."""
+    if cursor is None:
+        return []
+    if order == 'id':
+        return [Bus.id > cursor]
+    updated_at, bus_id = cursor
+    return [or_(Bus.updated_at > updated_at, and_(Bus.updated_at == updated_at, Bus.id > bus_id))]
+
+def _cursor(order: str, row) -> Cursor:
+    return row.id if order == 'id' else (row.updated_at, row.id)
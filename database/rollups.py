@@ -0,0 +1,197 @@
+from typing import List, Dict, Any, Optional
+from collections import Counter
+from enum import Enum
+import logging
+
+from sqlalchemy import event, func, inspect, select, delete
+from sqlalchemy.orm import Session
+from .models import Bus, InventoryRollup
+from .upsert import upsert
+
+logger = logging.getLogger(__name__)
+
+# Rollup dimension -> Bus attribute counted by it. The 'vin' dimension only
+# exists to find duplicate VIN candidates (VINs counted more than once).
+DIMENSIONS = {
+    'source': 'source',
+    'make': 'make',
+    'year': 'year',
+    'region': 'us_region',
+    'vin': 'vin'
+}
+TOTAL = 'total'
+
+# Not a count: the number of commits that changed buses, kept up by
+# database.changes so that other processes can notice changes cheaply
+REVISION = 'revision'
+
+# Not a count either: written by rebuild_rollups only, so its absence means
+# the counts were never filled from the buses table (the incremental
+# updates alone would only count the buses written since the table existed)
+REBUILT = 'rebuilt'
+
+def rollup_key(value: Any) -> Optional[str]:
+    """Rollup value of a column value; None and '' share one bucket."""
+    if isinstance(value, Enum):
+        return value.name
+    return '' if value is None else str(value)
+
+def _value(state, name: str, old: bool) -> Any:
+    """Committed (``old``) or pending value of an attribute from its history."""
+    history = state.attrs[name].history
+    changed = history.deleted if old else history.added
+    if changed:
+        return changed[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    if old and not history.added:
+        # Attribute was never loaded, e.g. after expiry: load it now
+        return getattr(state.obj(), name)
+    return None
+
+def _column_default(name: str) -> Any:
+    """Scalar default the INSERT will fill in for an unset column (e.g. us_region)."""
+    default = Bus.__table__.c[name].default
+    return default.arg if default is not None and default.is_scalar else None
+
+def _count(deltas: Counter, state, sign: int, old: bool) -> None:
+    deltas[(TOTAL, '')] += sign
+    for dimension, name in DIMENSIONS.items():
+        value = _value(state, name, old)
+        if value is None and not old:
+            value = _column_default(name)
+        if dimension == 'vin' and not value:
+            continue
+        deltas[(dimension, rollup_key(value))] += sign
+
+def bus_deltas(session: Session) -> Counter:
+    """Rollup count changes implied by the Bus inserts, updates and deletes pending in a session."""
+    deltas = Counter()
+    for bus in session.new:
+        if isinstance(bus, Bus):
+            _count(deltas, inspect(bus), 1, old=False)
+    for bus in session.deleted:
+        if isinstance(bus, Bus) and inspect(bus).has_identity:
+            _count(deltas, inspect(bus), -1, old=True)
+    for bus in session.dirty:
+        if not isinstance(bus, Bus):
+            continue
+        state = inspect(bus)
+        for dimension, name in DIMENSIONS.items():
+            history = state.attrs[name].history
+            if not history.added:
+                continue
+            old, new = _value(state, name, old=True), _value(state, name, old=False)
+            if rollup_key(old) == rollup_key(new):
+                continue
+            if dimension != 'vin' or old:
+                deltas[(dimension, rollup_key(old))] -= 1
+            if dimension != 'vin' or new:
+                deltas[(dimension, rollup_key(new))] += 1
+    return deltas
+
+def apply_deltas(connection, deltas: Counter) -> None:
+    """Add count deltas to the rollup rows, creating missing ones."""
+    rows = [
+        {'dimension': dimension, 'value': value, 'count': delta}
+        for (dimension, value), delta in sorted(deltas.items()) if delta
+    ]
+    upsert(connection, InventoryRollup.__table__, rows, ['dimension', 'value'],
+           update_columns=[], increment_columns=['count'])
+
+def _pending(session) -> List[tuple]:
+    """(transaction, deltas) of the flushes not yet applied to the rollups."""
+    return session.info.setdefault('rollup_deltas', [])
+
+@event.listens_for(Session, 'before_flush')
+def _collect_deltas(session, flush_context, instances):
+    deltas = bus_deltas(session)
+    if any(deltas.values()):
+        transaction = session.get_nested_transaction() or session.get_transaction()
+        _pending(session).append((transaction, deltas))
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_rolled_back(session, previous_transaction):
+    # A rolled back savepoint (one bad record of a batch) takes its deltas
+    # with it, a rolled back transaction all of them
+    pending = session.info.get('rollup_deltas')
+    if not pending:
+        return
+
+    def rolled_back(transaction) -> bool:
+        while transaction is not None:
+            if transaction is previous_transaction:
+                return True
+            transaction = transaction.parent
+        return False
+
+    session.info['rollup_deltas'] = [entry for entry in pending if not rolled_back(entry[0])]
+
+@event.listens_for(Session, 'before_commit')
+def _update_rollups(session):
+    # Applied once, when the outermost transaction commits: the total row is
+    # updated by every writer, so it is locked for the commit only rather
+    # than from a batch's first flush to its end
+    if session.in_nested_transaction():
+        return
+    session.flush()
+    pending = session.info.pop('rollup_deltas', None)
+    if pending:
+        deltas = Counter()
+        for _, flushed in pending:
+            deltas.update(flushed)
+        if any(deltas.values()):
+            apply_deltas(session.connection(), deltas)
+
+# Load the old value when a counted attribute is overwritten without having
+# been loaded, so the flush can decrement the right bucket.
+for _name in DIMENSIONS.values():
+    event.listen(getattr(Bus, _name), 'set', lambda *args: None, active_history=True)
+
+def rebuild_rollups(session) -> None:
+    """Recompute every rollup from the buses table.
+
+    Needed once after creating the table (rollup_stats does it on first
+    read), and after bulk statements that bypass the ORM
+    (e.g. ``query(Bus).delete()``).
+    """
+    session.execute(delete(InventoryRollup).where(InventoryRollup.dimension != REVISION))
+    rows = [{'dimension': TOTAL, 'value': '', 'count': session.scalar(select(func.count(Bus.id)))},
+            {'dimension': REBUILT, 'value': '', 'count': 1}]
+    for dimension, name in DIMENSIONS.items():
+        column = getattr(Bus, name)
+        statement = select(column, func.count(Bus.id)).group_by(column)
+        if dimension == 'vin':
+            statement = statement.where(column.isnot(None), column != '')
+        counts = Counter()
+        for value, count in session.execute(statement):
+            counts[rollup_key(value)] += count
+        rows.extend({'dimension': dimension, 'value': value, 'count': count} for value, count in counts.items())
+    session.execute(InventoryRollup.__table__.insert(), rows)
+    logger.info(f"Rebuilt {len(rows)} inventory rollups")
+
+def rollup_stats(session) -> Dict[str, Any]:
+    """verify_data statistics read from the rollups instead of scanning buses.
+
+    Same shape as scripts.verify_data.collect_stats, plus counts by region.
+    Rollups are rebuilt first if they have never been filled.
+    """
+    if session.get(InventoryRollup, (REBUILT, '')) is None:
+        rebuild_rollups(session)
+        session.commit()
+
+    stats = {'total': 0, 'by_source': {}, 'by_make': {}, 'by_year': {}, 'by_region': {}, 'duplicate_vins': {}}
+    counts = select(InventoryRollup.dimension, InventoryRollup.value, InventoryRollup.count)
+    for dimension, value, count in session.execute(
+        counts.where(InventoryRollup.dimension.notin_(['vin', REVISION, REBUILT]), InventoryRollup.count > 0)
+    ):
+        if dimension == TOTAL:
+            stats['total'] = count
+        else:
+            stats[f"by_{dimension}"][value] = count
+    # Served by idx_rollup_count, without reading the VINs seen only once
+    for _, value, count in session.execute(
+        counts.where(InventoryRollup.dimension == 'vin', InventoryRollup.count > 1)
+    ):
+        stats['duplicate_vins'][value] = count
+    return stats
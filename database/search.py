@@ -0,0 +1,179 @@
+from typing import List, Iterable, Optional, Tuple
+import logging
+import re
+import weakref
+
+from sqlalchemy import event, inspect, select, text, bindparam, false, Integer
+from sqlalchemy.orm import Session
+from .models import Bus, BusOverview
+from .changes import changed_bus_ids
+from .repository import LOAD_PRESETS
+
+logger = logging.getLogger(__name__)
+
+# One search document per bus. MySQL keeps it in a plain table with a
+# FULLTEXT index, SQLite in an FTS5 table whose rowid is the bus id.
+SEARCH_TABLE = 'bus_search'
+
+# Bus and overview columns that make up the body of a search document
+BODY_FIELDS = [Bus.make, Bus.model, Bus.engine, Bus.chassis, Bus.description,
+               BusOverview.mdesc, BusOverview.intdesc, BusOverview.extdesc,
+               BusOverview.features, BusOverview.specs]
+
+# Title matches count this many times more than body matches
+TITLE_WEIGHT = 5.0
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+_MYSQL_DDL = f"""
+CREATE TABLE IF NOT EXISTS `{SEARCH_TABLE}` (
+    `bus_id` int NOT NULL,
+    `title` varchar(256) DEFAULT NULL,
+    `body` longtext DEFAULT NULL,
+    PRIMARY KEY (`bus_id`),
+    FULLTEXT KEY `ft_bus_search` (`title`, `body`),
+    FULLTEXT KEY `ft_bus_search_title` (`title`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
+
+_SQLITE_DDL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(title, body, tokenize='porter unicode61')
+"""
+
+# Engine -> whether it has a search table, so sessions on databases created
+# without one (e.g. bare Base.metadata.create_all in tests) skip indexing
+_enabled = weakref.WeakKeyDictionary()
+
+def create_search_index(engine, rebuild: bool = False) -> None:
+    """Create the search table for the engine's backend if missing.
+
+    Existing buses are indexed when the table is created (or with
+    ``rebuild``); afterwards commits keep it up to date.
+    """
+    ddl = {'mysql': _MYSQL_DDL, 'sqlite': _SQLITE_DDL}.get(engine.dialect.name)
+    if ddl is None:
+        raise ValueError(f"Full-text search is not supported for the {engine.dialect.name} dialect")
+    with engine.begin() as conn:
+        created = not inspect(conn).has_table(SEARCH_TABLE)
+        conn.execute(text(ddl))
+        if created or rebuild:
+            logger.info(f"Indexed {reindex(conn)} buses for full-text search")
+    _enabled[engine] = True
+
+def drop_search_index(engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+    _enabled.pop(engine, None)
+
+def search_enabled(connection) -> bool:
+    engine = connection.engine
+    if engine not in _enabled:
+        _enabled[engine] = inspect(connection).has_table(SEARCH_TABLE)
+    return _enabled[engine]
+
+def _documents(connection, bus_ids: Optional[Iterable[int]]) -> List[dict]:
+    statement = select(Bus.id, Bus.title, *BODY_FIELDS).outerjoin(BusOverview, BusOverview.bus_id == Bus.id)
+    if bus_ids is not None:
+        statement = statement.where(Bus.id.in_(list(bus_ids)))
+    return [
+        {'bus_id': row[0], 'title': row[1] or '', 'body': '\n'.join(str(value) for value in row[2:] if value)}
+        for row in connection.execute(statement)
+    ]
+
+def reindex(connection, bus_ids: Optional[Iterable[int]] = None) -> int:
+    """Rewrite the search documents of ``bus_ids`` (all buses by default).
+
+    Ids of buses that no longer exist simply lose their document.
+    """
+    if bus_ids is not None:
+        bus_ids = sorted(set(bus_ids))
+        if not bus_ids:
+            return 0
+    documents = _documents(connection, bus_ids)
+
+    key = 'rowid' if connection.dialect.name == 'sqlite' else 'bus_id'
+    if bus_ids is None:
+        connection.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    else:
+        connection.execute(
+            text(f"DELETE FROM {SEARCH_TABLE} WHERE {key} IN :ids").bindparams(bindparam('ids', expanding=True)),
+            {'ids': bus_ids}
+        )
+    if documents:
+        connection.execute(
+            text(f"INSERT INTO {SEARCH_TABLE} ({key}, title, body) VALUES (:bus_id, :title, :body)"), documents
+        )
+    return len(documents)
+
+def _terms(query: str) -> List[str]:
+    return [term.lower() for term in TOKEN_PATTERN.findall(query)]
+
+def _match(connection, terms: List[str]) -> str:
+    """MATCH/AGAINST argument requiring every term."""
+    if connection.dialect.name == 'sqlite':
+        return ' '.join('"' + term.replace('"', '') + '"' for term in terms)
+    return ' '.join(f"+{term}" for term in terms)
+
+def search_ids(connection, query: str, limit: int = 20, offset: int = 0) -> List[Tuple[int, float]]:
+    """Ids and scores of the buses matching every word of ``query``, best first."""
+    terms = _terms(query)
+    if not terms:
+        return []
+    if connection.dialect.name == 'sqlite':
+        # bm25 is lower for better matches
+        statement = text(
+            f"SELECT rowid, -bm25({SEARCH_TABLE}, :title_weight, 1.0) AS score FROM {SEARCH_TABLE} "
+            f"WHERE {SEARCH_TABLE} MATCH :match ORDER BY score DESC, rowid LIMIT :limit OFFSET :offset"
+        )
+    else:
+        statement = text(
+            f"SELECT bus_id, MATCH(title, body) AGAINST (:match IN BOOLEAN MODE) "
+            f"+ :title_weight * MATCH(title) AGAINST (:match IN BOOLEAN MODE) AS score "
+            f"FROM {SEARCH_TABLE} WHERE MATCH(title, body) AGAINST (:match IN BOOLEAN MODE) "
+            f"ORDER BY score DESC, bus_id LIMIT :limit OFFSET :offset"
+        )
+    rows = connection.execute(statement, {'match': _match(connection, terms), 'title_weight': TITLE_WEIGHT,
+                                          'limit': limit, 'offset': offset})
+    return [(bus_id, float(score)) for bus_id, score in rows]
+
+def matching_ids(connection, query: str):
+    """Unranked SELECT of the ids of every bus matching ``query``, to use as a subquery.
+
+    E.g. ``select(func.count()).where(Bus.id.in_(matching_ids(connection, 'lift')))``;
+    cheaper than search_ids when only the set of matches is needed.
+    """
+    terms = _terms(query)
+    if not terms:
+        return select(Bus.id).where(false())
+    if connection.dialect.name == 'sqlite':
+        statement = text(f"SELECT rowid AS bus_id FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match")
+    else:
+        statement = text(f"SELECT bus_id FROM {SEARCH_TABLE} WHERE MATCH(title, body) AGAINST (:match IN BOOLEAN MODE)")
+    statement = statement.bindparams(match=_match(connection, terms)).columns(bus_id=Integer)
+    return select(statement.subquery().c.bus_id)
+
+def search(session, query: str, limit: int = 20, offset: int = 0, preset: str = 'bare') -> List[Tuple[Bus, float]]:
+    """Buses matching every word of ``query`` with their relevance, best first.
+
+    E.g. ``search(session, 'wheelchair lift cummins')``. Buses are loaded in
+    one query with the given BusRepository load preset.
+    """
+    ranked = search_ids(session.connection(), query, limit, offset)
+    if not ranked:
+        return []
+    statement = select(Bus).options(*LOAD_PRESETS[preset]).where(Bus.id.in_([bus_id for bus_id, _ in ranked]))
+    buses = {bus.id: bus for bus in session.scalars(statement).unique()}
+    return [(buses[bus_id], score) for bus_id, score in ranked if bus_id in buses]
+
+@event.listens_for(Session, 'before_commit')
+def _update_search_index(session):
+    # Indexed once per commit rather than per flush; a record saved with
+    # several flushes (bus, then overview and images) is indexed once.
+    if session.in_nested_transaction():
+        return
+    session.flush()
+    changed = changed_bus_ids(session)
+    if changed:
+        connection = session.connection()
+        if search_enabled(connection):
+            reindex(connection, changed)
@@ -28,7 +28,7 @@ CREATE TABLE IF NOT EXISTS `buses` (
     `price` varchar(30) DEFAULT NULL,
     `cprice` varchar(30) DEFAULT NULL,
     `vin` varchar(60) DEFAULT NULL,
-    `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    `updated_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
     `gvwr` varchar(50) DEFAULT NULL,
     `dimensions` varchar(300) DEFAULT NULL,
@@ -43,6 +43,8 @@ CREATE TABLE IF NOT EXISTS `buses` (
     `description` longtext DEFAULT NULL,
     `score` tinyint(1) DEFAULT 0,
     `category_id` int DEFAULT 0,
+    `last_seen_run` varchar(32) DEFAULT NULL,
+    `stale` tinyint(1) DEFAULT 0,
     PRIMARY KEY (`id`),
     KEY `idx_bus_year` (`year`),
     KEY `idx_bus_make` (`make`),
@@ -50,7 +52,9 @@ CREATE TABLE IF NOT EXISTS `buses` (
     KEY `idx_bus_price` (`price`),
     KEY `idx_bus_mileage` (`mileage`),
     KEY `idx_bus_location` (`location`),
-    KEY `idx_bus_us_region` (`us_region`)
+    KEY `idx_bus_us_region` (`us_region`),
+    KEY `idx_bus_updated` (`updated_at`, `id`),
+    KEY `idx_bus_seen` (`source`, `last_seen_run`)
 ) ENGINE=InnoDB AUTO_INCREMENT=1 DEFAULT CHARSET=utf8mb4;
 
 CREATE TABLE IF NOT EXISTS `buses_overview` (
@@ -76,4 +80,117 @@ CREATE TABLE IF NOT EXISTS `buses_images` (
     PRIMARY KEY (`id`),
     KEY `busid` (`bus_id`) USING BTREE,
     CONSTRAINT `buses_images_ibfk_1` FOREIGN KEY (`bus_id`) REFERENCES `buses` (`id`)
-) ENGINE=InnoDB AUTO_INCREMENT=1 DEFAULT CHARSET=utf8mb4; 
\ No newline at end of file
+) ENGINE=InnoDB AUTO_INCREMENT=1 DEFAULT CHARSET=utf8mb4; 
+CREATE TABLE IF NOT EXISTS `scrape_tasks` (
+    `id` int NOT NULL AUTO_INCREMENT,
+    `task_key` varchar(64) NOT NULL,
+    `source` varchar(50) NOT NULL,
+    `url` varchar(1000) NOT NULL,
+    `generation` int NOT NULL DEFAULT 0,
+    `status` varchar(10) NOT NULL DEFAULT 'pending',
+    `attempts` int NOT NULL DEFAULT 0,
+    `max_attempts` int NOT NULL DEFAULT 3,
+    `available_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    `lease_owner` varchar(100) DEFAULT NULL,
+    `lease_expires_at` datetime DEFAULT NULL,
+    `last_error` longtext DEFAULT NULL,
+    `result` longtext DEFAULT NULL,
+    `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
+    `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (`id`),
+    UNIQUE KEY `task_key` (`task_key`),
+    KEY `idx_task_claim` (`source`, `status`, `available_at`),
+    KEY `idx_task_generation` (`source`, `generation`, `status`, `id`)
+) ENGINE=InnoDB AUTO_INCREMENT=1 DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS `inventory_rollups` (
+    `dimension` varchar(20) NOT NULL,
+    `value` varchar(300) NOT NULL,
+    `count` int NOT NULL DEFAULT 0,
+    PRIMARY KEY (`dimension`, `value`),
+    KEY `idx_rollup_count` (`dimension`, `count`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- MinHash signatures of bus texts and their LSH band buckets, kept in sync
+-- by database/near_duplicates.py
+CREATE TABLE IF NOT EXISTS `bus_signatures` (
+    `bus_id` int NOT NULL,
+    `signature` blob NOT NULL,
+    `updated_at` datetime DEFAULT NULL,
+    PRIMARY KEY (`bus_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS `bus_lsh_buckets` (
+    `bucket` bigint NOT NULL,
+    `bus_id` int NOT NULL,
+    PRIMARY KEY (`bucket`, `bus_id`),
+    KEY `idx_lsh_bus` (`bus_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Physical bus (entity) of every listing, assigned by database/entities.py
+CREATE TABLE IF NOT EXISTS `bus_entities` (
+    `bus_id` int NOT NULL,
+    `entity_id` int NOT NULL,
+    `score` float DEFAULT NULL,
+    `updated_at` datetime DEFAULT NULL,
+    PRIMARY KEY (`bus_id`),
+    KEY `idx_entity` (`entity_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Append-only log of changed bus fields, written by database/history.py.
+-- Partitioned by month (YYYYMM); history.ensure_partitions splits pmax ahead of time.
+CREATE TABLE IF NOT EXISTS `bus_history` (
+    `id` int NOT NULL AUTO_INCREMENT,
+    `bus_id` int NOT NULL,
+    `field` varchar(50) NOT NULL,
+    `old_value` text DEFAULT NULL,
+    `value` text DEFAULT NULL,
+    `changed_at` datetime NOT NULL,
+    `month` int NOT NULL,
+    `run_id` varchar(32) DEFAULT NULL,
+    PRIMARY KEY (`id`, `month`),
+    KEY `idx_history_bus` (`bus_id`, `field`, `changed_at`),
+    KEY `idx_history_month` (`month`, `field`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY RANGE (`month`) (
+    PARTITION pmax VALUES LESS THAN MAXVALUE
+);
+
+-- Change feed written in the same transaction as the changes, by
+-- database/outbox.py, and the position of every consumer in it
+CREATE TABLE IF NOT EXISTS `outbox` (
+    `id` int NOT NULL AUTO_INCREMENT,
+    `entity` varchar(10) NOT NULL,
+    `op` varchar(6) NOT NULL,
+    `bus_id` int DEFAULT NULL,
+    `row_id` int DEFAULT NULL,
+    `fields` text DEFAULT NULL,
+    `created_at` datetime NOT NULL,
+    PRIMARY KEY (`id`)
+) ENGINE=InnoDB AUTO_INCREMENT=1 DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS `outbox_cursors` (
+    `consumer` varchar(100) NOT NULL,
+    `position` int NOT NULL DEFAULT 0,
+    `updated_at` datetime DEFAULT NULL,
+    PRIMARY KEY (`consumer`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Sources each ingest run loaded completely, used by database/sweep.py
+CREATE TABLE IF NOT EXISTS `ingest_runs` (
+    `run_id` varchar(32) NOT NULL,
+    `source` varchar(300) NOT NULL,
+    `finished_at` datetime DEFAULT NULL,
+    PRIMARY KEY (`run_id`, `source`),
+    KEY `idx_run_source` (`source`, `run_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Full-text search documents, kept in sync by database/search.py
+CREATE TABLE IF NOT EXISTS `bus_search` (
+    `bus_id` int NOT NULL,
+    `title` varchar(256) DEFAULT NULL,
+    `body` longtext DEFAULT NULL,
+    PRIMARY KEY (`bus_id`),
+    FULLTEXT KEY `ft_bus_search` (`title`, `body`),
+    FULLTEXT KEY `ft_bus_search_title` (`title`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
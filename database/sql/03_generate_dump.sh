@@ -23,6 +23,12 @@ if [ $? -eq 0 ]; then
     
     gzip "$DUMP_FILE"
     echo -e "${GREEN}Dump file compressed: $DUMP_FILE.gz${NC}"
+
+    if [ "$1" == "--parquet" ]; then
+        PARQUET_DIR="school_buses_parquet_$(date +%Y%m%d_%H%M%S)"
+        python "$(dirname "$0")/../parquet_io.py" export --output-dir "$PARQUET_DIR"
+        echo -e "${GREEN}Parquet export: $PARQUET_DIR${NC}"
+    fi
 else
     echo -e "${RED}Error creating database dump${NC}"
     exit 1
@@ -0,0 +1,16 @@
+-- Columns and table used by the stale listing sweep (database/sweep.py), for
+-- databases created before they were added to 01_create_database.sql
+USE school_buses;
+
+ALTER TABLE `buses`
+    ADD COLUMN `last_seen_run` varchar(32) DEFAULT NULL,
+    ADD COLUMN `stale` tinyint(1) DEFAULT 0,
+    ADD KEY `idx_bus_seen` (`source`, `last_seen_run`);
+
+CREATE TABLE IF NOT EXISTS `ingest_runs` (
+    `run_id` varchar(32) NOT NULL,
+    `source` varchar(300) NOT NULL,
+    `finished_at` datetime DEFAULT NULL,
+    PRIMARY KEY (`run_id`, `source`),
+    KEY `idx_run_source` (`source`, `run_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
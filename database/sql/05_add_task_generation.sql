@@ -0,0 +1,7 @@
+-- Discovery generation of work queue tasks (database/work_queue.py), for
+-- databases created before it was added to 01_create_database.sql
+USE school_buses;
+
+ALTER TABLE `scrape_tasks`
+    ADD COLUMN `generation` int NOT NULL DEFAULT 0 AFTER `url`,
+    ADD KEY `idx_task_generation` (`source`, `generation`, `status`, `id`);
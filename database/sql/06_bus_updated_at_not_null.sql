@@ -0,0 +1,9 @@
+-- buses.updated_at can no longer be NULL (keyset pages on (updated_at, id) in
+-- database/repository.py skip NULL rows), for databases created before
+-- 01_create_database.sql declared it NOT NULL
+USE school_buses;
+
+UPDATE `buses` SET `updated_at` = COALESCE(`created_at`, CURRENT_TIMESTAMP) WHERE `updated_at` IS NULL;
+
+ALTER TABLE `buses`
+    MODIFY COLUMN `updated_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP;
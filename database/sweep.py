@@ -0,0 +1,110 @@
+from typing import Dict, Iterable, Optional
+from datetime import datetime
+import logging
+import os
+
+from sqlalchemy import select, update, func, literal, case, or_, String, DateTime, Integer
+from .models import Bus, BusHistory, IngestRun, OutboxEvent
+from .changes import bump_revision
+from .history import history_enabled, month_of
+from .outbox import outbox_enabled, UPDATE
+from .upsert import upsert
+
+logger = logging.getLogger(__name__)
+
+# Completed runs of a source a listing may be missing from before it is flagged stale
+STALE_AFTER_RUNS = int(os.getenv('STALE_AFTER_RUNS', 3))
+
+# Ids per UPDATE when stamping
+STAMP_CHUNK_SIZE = 500
+
+def stamp_seen(connection, run_id: str, bus_ids: Iterable[int]) -> int:
+    """Record that ``run_id`` saw the given buses, one UPDATE per chunk of ids.
+
+    Works through a Connection or a Session, inside the caller's transaction.
+    """
+    ids = sorted(set(bus_ids))
+    stamped = 0
+    for start in range(0, len(ids), STAMP_CHUNK_SIZE):
+        statement = update(Bus.__table__).where(Bus.id.in_(ids[start:start + STAMP_CHUNK_SIZE])) \
+            .values(last_seen_run=run_id)
+        stamped += connection.execute(statement).rowcount
+    return stamped
+
+def stamp_listed(connection, run_id: str, source: str, keys: Iterable[Optional[str]]) -> int:
+    """Record that ``run_id`` saw the buses of ``source`` behind listing keys ('vin:...' or 'url:...').
+
+    For listings a run did not write because they did not change
+    (see utils.snapshot_diff.listing_key); one UPDATE per chunk of keys.
+    """
+    values = {'vin': set(), 'url': set()}
+    for key in keys:
+        if key:
+            kind, _, value = key.partition(':')
+            values[kind].add(value)
+    stamped = 0
+    for column, chosen in ((Bus.vin, values['vin']), (Bus.source_url, values['url'])):
+        chosen = sorted(chosen)
+        for start in range(0, len(chosen), STAMP_CHUNK_SIZE):
+            statement = update(Bus.__table__) \
+                .where(Bus.source == source, column.in_(chosen[start:start + STAMP_CHUNK_SIZE])) \
+                .values(last_seen_run=run_id)
+            stamped += connection.execute(statement).rowcount
+    return stamped
+
+def finish_run(connection, run_id: str, sources: Iterable[str]) -> None:
+    """Record that ``run_id`` loaded every listing of ``sources``.
+
+    Only finished runs count for the sweep, so call this only once a source
+    was loaded completely (not from a change set or a failed load).
+    """
+    rows = [{'run_id': run_id, 'source': source, 'finished_at': datetime.utcnow()} for source in sorted(set(sources))]
+    upsert(connection, IngestRun.__table__, rows, ['run_id', 'source'])
+
+def _cutoffs(connection, after_runs: int, sources: Optional[Iterable[str]]) -> Dict[str, tuple]:
+    """Source -> (latest run, run a listing must have been seen in or after)."""
+    statement = select(IngestRun.source, IngestRun.run_id).order_by(IngestRun.source, IngestRun.run_id.desc())
+    if sources is not None:
+        statement = statement.where(IngestRun.source.in_(list(sources)))
+    runs = {}
+    for source, run_id in connection.execute(statement):
+        runs.setdefault(source, []).append(run_id)
+    return {source: (ids[0], ids[after_runs - 1]) for source, ids in runs.items() if len(ids) >= after_runs}
+
+def sweep_stale(connection, after_runs: int = STALE_AFTER_RUNS, sources: Optional[Iterable[str]] = None,
+                dry_run: bool = False) -> Dict[str, int]:
+    """Flag the buses missing from the last ``after_runs`` finished runs of their source as stale.
+
+    One set-based UPDATE per source (plus the matching outbox and history
+    rows, also INSERT ... SELECT), inside the caller's transaction. Sources
+    with fewer finished runs are left alone. Returns the buses flagged per source.
+    """
+    flagged = {}
+    now = datetime.utcnow()
+    for source, (latest, cutoff) in _cutoffs(connection, after_runs, sources).items():
+        missing = [
+            Bus.source == source,
+            or_(Bus.last_seen_run.is_(None), Bus.last_seen_run < cutoff),
+            or_(Bus.stale.is_(None), Bus.stale == False)  # noqa: E712
+        ]
+        if dry_run:
+            flagged[source] = connection.execute(select(func.count(Bus.id)).where(*missing)).scalar()
+            continue
+
+        if outbox_enabled(connection):
+            events = select(literal('bus'), literal(UPDATE), Bus.id, Bus.id, literal('["stale"]'),
+                            literal(now, DateTime)).where(*missing)
+            connection.execute(OutboxEvent.__table__.insert().from_select(
+                ['entity', 'op', 'bus_id', 'row_id', 'fields', 'created_at'], events))
+        if history_enabled(connection):
+            changes = select(Bus.id, literal('stale'), case((Bus.stale.is_(None), None), else_=literal('False')),
+                             literal('True'), literal(now, DateTime), literal(month_of(now), Integer),
+                             literal(latest, String)).where(*missing)
+            connection.execute(BusHistory.__table__.insert().from_select(
+                ['bus_id', 'field', 'old_value', 'value', 'changed_at', 'month', 'run_id'], changes))
+        flagged[source] = connection.execute(update(Bus.__table__).where(*missing).values(stale=True)).rowcount
+
+    if not dry_run and any(flagged.values()):
+        bump_revision(connection)
+    logger.info(f"{'Would flag' if dry_run else 'Flagged'} {sum(flagged.values())} stale buses: {flagged}")
+    return flagged
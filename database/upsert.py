@@ -0,0 +1,57 @@
+from typing import List, Dict, Any, Optional, Sequence
+from sqlalchemy import Table
+
+def _updates(table: Table, incoming, update_columns: Sequence[str], increment_columns: Sequence[str]) -> Dict:
+    """SET clause: replace ``update_columns``, add the incoming value to ``increment_columns``."""
+    updates = {name: incoming[name] for name in update_columns}
+    updates.update({name: table.c[name] + incoming[name] for name in increment_columns})
+    return updates
+
+def upsert_statement(dialect_name: str, table: Table, keys: Sequence[str],
+                     update_columns: Optional[Sequence[str]] = None, increment_columns: Sequence[str] = ()):
+    """INSERT that updates ``update_columns`` of rows that already exist.
+
+    MySQL uses ON DUPLICATE KEY UPDATE, which fires on any unique key of the
+    table; SQLite (and PostgreSQL) use ON CONFLICT on the ``keys`` columns.
+    ``increment_columns`` of existing rows are increased by the inserted
+    value instead of replaced. Without any update columns existing rows are
+    left untouched.
+    """
+    update_columns = update_columns or []
+    if dialect_name == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        statement = insert(table)
+        if not update_columns and not increment_columns:
+            return statement.prefix_with('IGNORE')
+        return statement.on_duplicate_key_update(
+            _updates(table, statement.inserted, update_columns, increment_columns)
+        )
+
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise ValueError(f"Upsert is not supported for the {dialect_name} dialect")
+
+    statement = insert(table)
+    if not update_columns and not increment_columns:
+        return statement.on_conflict_do_nothing(index_elements=list(keys))
+    return statement.on_conflict_do_update(
+        index_elements=list(keys),
+        set_=_updates(table, statement.excluded, update_columns, increment_columns)
+    )
+
+def upsert(connection, table: Table, rows: List[Dict[str, Any]], keys: Sequence[str],
+           update_columns: Optional[Sequence[str]] = None, increment_columns: Sequence[str] = ()) -> None:
+    """Insert or update ``rows`` (all with the same keys) through a Connection or Session.
+
+    ``update_columns`` defaults to every column of the rows except ``keys``
+    and ``increment_columns``; pass an empty list to only insert missing rows.
+    """
+    if not rows:
+        return
+    if update_columns is None:
+        update_columns = [name for name in rows[0] if name not in keys and name not in increment_columns]
+    dialect_name = connection.get_bind().dialect.name if hasattr(connection, 'get_bind') else connection.dialect.name
+    connection.execute(upsert_statement(dialect_name, table, keys, update_columns, increment_columns), rows)
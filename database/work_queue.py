@@ -0,0 +1,257 @@
+from typing import List, Dict, Any, Optional, Iterable, Union
+from datetime import datetime, timedelta
+import hashlib
+import json
+import logging
+import os
+import socket
+
+from sqlalchemy import create_engine, select, update, func, and_, or_
+from sqlalchemy.engine import Engine
+from .db_connector import configure_engine
+from .models import ScrapeTask
+from .upsert import upsert
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+DEAD = 'dead'
+
+DEFAULT_QUEUE_URL = 'sqlite:///scrape_queue.db'
+
+def task_key(source: str, url: str) -> str:
+    """Stable key of a listing fetch, used to enqueue every URL only once."""
+    return hashlib.sha256(f"{source}\n{url}".encode('utf-8')).hexdigest()
+
+def worker_name() -> str:
+    """Lease owner name of the current process, unique across hosts."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class WorkQueue:
+    """Durable queue of listing fetches stored in the scrape_tasks table.
+
+    A local SQLite file is enough for workers on one machine; pointing the
+    queue at the shared MySQL database lets several hosts work on it. Tasks
+    are claimed with a conditional UPDATE (no broker and no row locks), so a
+    task whose lease expires, because its worker died, becomes claimable
+    again. Failed tasks are retried with exponential backoff and moved to
+    the ``dead`` status once they run out of attempts.
+    """
+
+    def __init__(self, url_or_engine: Union[str, Engine] = DEFAULT_QUEUE_URL, lease_seconds: int = 300,
+                 max_attempts: int = 3, backoff_seconds: int = 30):
+        if isinstance(url_or_engine, Engine):
+            self.engine = url_or_engine
+        else:
+            # WAL (see SQLITE_PRAGMAS) lets workers read while another one writes a claim
+            self.engine = configure_engine(create_engine(url_or_engine, pool_pre_ping=True))
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        ScrapeTask.__table__.create(self.engine, checkfirst=True)
+
+    def current_generation(self, source: str, conn=None) -> int:
+        """Generation of the latest enqueue of a source (0 before the first one)."""
+        table = ScrapeTask.__table__
+        statement = select(func.max(table.c.generation)).where(table.c.source == source)
+        if conn is not None:
+            return conn.execute(statement).scalar() or 0
+        with self.engine.connect() as conn:
+            return conn.execute(statement).scalar() or 0
+
+    def enqueue(self, source: str, urls: Iterable[str], requeue: bool = True) -> int:
+        """Add listing URLs of a source; finished tasks are reset when ``requeue`` is set.
+
+        Every call starts a new generation of the source: the URLs given are
+        tagged with it, so tasks of listings that are no longer discovered
+        stay behind in older generations and are left out of iter_results.
+        """
+        table = ScrapeTask.__table__
+        now = datetime.utcnow()
+        urls = list(dict.fromkeys(urls))
+        keys = {task_key(source, url): url for url in urls}
+        added = 0
+        with self.engine.begin() as conn:
+            generation = self.current_generation(source, conn) + 1
+            existing = set()
+            key_list = list(keys)
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                existing.update(conn.scalars(select(table.c.task_key).where(table.c.task_key.in_(chunk))))
+
+            new_rows = [
+                {'task_key': key, 'source': source, 'url': url, 'generation': generation, 'status': PENDING,
+                 'attempts': 0, 'max_attempts': self.max_attempts, 'available_at': now, 'created_at': now,
+                 'updated_at': now}
+                for key, url in keys.items() if key not in existing
+            ]
+            if new_rows:
+                # Another host may enqueue the same URL meanwhile, keep its row
+                upsert(conn, table, new_rows, ['task_key'], update_columns=[])
+                added = len(new_rows)
+
+            existing_list = sorted(existing)
+            for start in range(0, len(existing_list), 500):
+                chunk = existing_list[start:start + 500]
+                conn.execute(update(table).where(table.c.task_key.in_(chunk))
+                             .values(generation=generation, updated_at=now))
+                if requeue:
+                    conn.execute(
+                        update(table)
+                        .where(table.c.task_key.in_(chunk), table.c.status.in_([DONE, DEAD]))
+                        .values(status=PENDING, attempts=0, available_at=now, lease_owner=None,
+                                lease_expires_at=None, last_error=None, result=None, updated_at=now)
+                    )
+        logger.info(f"Enqueued {added} new {source} tasks ({len(existing)} already known), generation {generation}")
+        return added
+
+    def _claimable(self, now: datetime, source: Optional[str]):
+        table = ScrapeTask.__table__
+        condition = or_(
+            and_(table.c.status == PENDING, table.c.available_at <= now),
+            and_(table.c.status == LEASED, table.c.lease_expires_at < now)
+        )
+        if source:
+            condition = and_(table.c.source == source, condition)
+        return condition
+
+    def reap_expired(self) -> int:
+        """Dead-letter leased tasks whose worker vanished on their last attempt."""
+        table = ScrapeTask.__table__
+        now = datetime.utcnow()
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                update(table)
+                .where(table.c.status == LEASED, table.c.lease_expires_at < now,
+                       table.c.attempts >= table.c.max_attempts)
+                .values(status=DEAD, lease_owner=None, last_error='lease expired', updated_at=now)
+            )
+        return result.rowcount
+
+    def claim(self, worker: str, source: Optional[str] = None, limit: int = 1) -> List[Dict[str, Any]]:
+        """Lease up to ``limit`` tasks for a worker.
+
+        Candidates are read first, then each one is taken with an UPDATE that
+        repeats the claimable condition; only the worker whose UPDATE matched
+        the row owns it, so concurrent workers never get the same task.
+        """
+        self.reap_expired()
+        table = ScrapeTask.__table__
+        now = datetime.utcnow()
+        expires = now + timedelta(seconds=self.lease_seconds)
+        claimed = []
+        with self.engine.connect() as conn:
+            candidates = conn.execute(
+                select(table.c.id, table.c.source, table.c.url, table.c.attempts)
+                .where(self._claimable(now, source))
+                .order_by(table.c.available_at, table.c.id)
+                .limit(limit * 4)
+            ).all()
+            for task in candidates:
+                result = conn.execute(
+                    update(table)
+                    .where(table.c.id == task.id, table.c.attempts == task.attempts, self._claimable(now, None))
+                    .values(status=LEASED, lease_owner=worker, lease_expires_at=expires,
+                            attempts=table.c.attempts + 1, updated_at=now)
+                )
+                conn.commit()
+                if result.rowcount == 1:
+                    claimed.append({'id': task.id, 'source': task.source, 'url': task.url,
+                                    'attempt': task.attempts + 1})
+                    if len(claimed) >= limit:
+                        break
+        return claimed
+
+    def _finish(self, task_id: int, worker: str, **values) -> bool:
+        table = ScrapeTask.__table__
+        values['updated_at'] = datetime.utcnow()
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                update(table)
+                .where(table.c.id == task_id, table.c.status == LEASED, table.c.lease_owner == worker)
+                .values(**values)
+            )
+        if result.rowcount != 1:
+            logger.warning(f"Task {task_id} is no longer leased by {worker}, result dropped")
+        return result.rowcount == 1
+
+    def complete(self, task_id: int, worker: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        """Mark a leased task done and keep the parsed listing with it."""
+        payload = json.dumps(result, ensure_ascii=False, default=str) if result is not None else None
+        return self._finish(task_id, worker, status=DONE, lease_owner=None, lease_expires_at=None,
+                            result=payload, last_error=None)
+
+    def fail(self, task_id: int, worker: str, error: str) -> bool:
+        """Schedule a retry with exponential backoff, or dead-letter the task."""
+        table = ScrapeTask.__table__
+        with self.engine.connect() as conn:
+            task = conn.execute(
+                select(table.c.attempts, table.c.max_attempts).where(table.c.id == task_id)
+            ).one()
+        if task.attempts >= task.max_attempts:
+            logger.error(f"Task {task_id} failed {task.attempts} times, moving it to the dead letters: {error}")
+            return self._finish(task_id, worker, status=DEAD, lease_owner=None, lease_expires_at=None,
+                                last_error=error)
+        delay = self.backoff_seconds * 2 ** (task.attempts - 1)
+        return self._finish(task_id, worker, status=PENDING, lease_owner=None, lease_expires_at=None,
+                            available_at=datetime.utcnow() + timedelta(seconds=delay), last_error=error)
+
+    def retry_dead(self, source: Optional[str] = None) -> int:
+        """Give dead-lettered tasks a fresh set of attempts."""
+        table = ScrapeTask.__table__
+        condition = table.c.status == DEAD
+        if source:
+            condition = and_(condition, table.c.source == source)
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                update(table).where(condition)
+                .values(status=PENDING, attempts=0, available_at=datetime.utcnow(), updated_at=datetime.utcnow())
+            )
+        return result.rowcount
+
+    def stats(self, source: Optional[str] = None) -> Dict[str, int]:
+        """Number of tasks per status."""
+        table = ScrapeTask.__table__
+        query = select(table.c.status, func.count()).group_by(table.c.status)
+        if source:
+            query = query.where(table.c.source == source)
+        with self.engine.connect() as conn:
+            counts = dict(conn.execute(query).all())
+        return {status: counts.get(status, 0) for status in (PENDING, LEASED, DONE, DEAD)}
+
+    def dead_letters(self, source: Optional[str] = None) -> List[Dict[str, Any]]:
+        """URL, attempts and last error of every dead-lettered task."""
+        table = ScrapeTask.__table__
+        query = select(table.c.id, table.c.source, table.c.url, table.c.attempts, table.c.last_error) \
+            .where(table.c.status == DEAD)
+        if source:
+            query = query.where(table.c.source == source)
+        with self.engine.connect() as conn:
+            return [dict(row._mapping) for row in conn.execute(query)]
+
+    def iter_results(self, source: str, batch_size: int = 500, generation: Optional[int] = None):
+        """Parsed listings of the finished tasks of a source, streamed in id order.
+
+        Only tasks of ``generation`` (by default the current one) are read, so
+        a listing that was not discovered again is not collected again.
+        """
+        table = ScrapeTask.__table__
+        if generation is None:
+            generation = self.current_generation(source)
+        last_id = 0
+        while True:
+            with self.engine.connect() as conn:
+                rows = conn.execute(
+                    select(table.c.id, table.c.result)
+                    .where(table.c.source == source, table.c.generation == generation, table.c.status == DONE,
+                           table.c.id > last_id)
+                    .order_by(table.c.id).limit(batch_size)
+                ).all()
+            if not rows:
+                return
+            for row in rows:
+                if row.result:
+                    yield json.loads(row.result)
+            last_id = rows[-1].id
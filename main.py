@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""Command line entry point: python main.py {scrape,load,verify,sweep,search,serve,daemon,queue,bench,profile} ..."""
+from typing import List, Optional
+import argparse
+import json
+import logging
+import sys
+
+from scrapers import SCRAPERS
+
+logger = logging.getLogger('main')
+
+# Every subcommand imports its own dependencies inside its handler so that
+# e.g. `main.py verify` never loads the scraping stack.
+
+def cmd_scrape(args) -> int:
+    from scripts.run_scrapers import run_scrapers
+
+    stats = run_scrapers(args.cache_dir, args.output_format, args.compression, args.sources, args.workers)
+    failed = [name for name, result in stats['scrapers'].items() if result['status'] != 'success']
+    return 1 if failed else 0
+
+def cmd_load(args) -> int:
+    from database.populate_db import find_snapshots, populate_from_snapshots
+
+    snapshots = args.snapshots or find_snapshots(args.cache_dir)
+    if not snapshots:
+        logger.error(f"No snapshots found in {args.cache_dir}, run `main.py scrape` first")
+        return 1
+    saved = populate_from_snapshots(snapshots, args.workers, args.batch_size)
+    return 0 if saved > 0 else 1
+
+def cmd_verify(args) -> int:
+    from scripts.verify_data import main as verify
+
+    verify(args.output_format, args.exact, args.rebuild)
+    return 0
+
+def cmd_sweep(args) -> int:
+    from database import db
+    from database.sweep import STALE_AFTER_RUNS, sweep_stale
+
+    with db.engine.begin() as connection:
+        flagged = sweep_stale(connection, args.runs or STALE_AFTER_RUNS, args.sources, args.dry_run)
+    for source, count in sorted(flagged.items()):
+        print(f"{source}: {count} {'would be ' if args.dry_run else ''}flagged stale")
+    return 0
+
+def cmd_search(args) -> int:
+    from database import db
+    from database.search import create_search_index, search
+
+    create_search_index(db.engine, args.reindex)
+    with db.get_session() as session:
+        results = [
+            {'id': bus.id, 'score': round(score, 3), 'title': bus.title, 'price': bus.price, 'url': bus.source_url}
+            for bus, score in search(session, ' '.join(args.query), args.limit)
+        ]
+    if args.output_format == 'json':
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print(f"{result['id']:>6}  {result['score']:7.3f}  {result['title']}")
+    return 0 if results else 1
+
+def cmd_serve(args) -> int:
+    from config.config import API_HOST, API_PORT
+    from scripts.inventory_api import serve
+
+    serve(args.host or API_HOST, args.port or API_PORT)
+    return 0
+
+def cmd_daemon(args) -> int:
+    from scripts.daemon import run_daemon
+
+    run_daemon(args.sources, args.cache_dir, args.output_format, args.compression, args.load,
+               args.batch_size, dict(args.interval), args.max_cycles)
+    return 0
+
+def cmd_queue(args) -> int:
+    from scripts.scrape_queue import open_queue, enqueue_sources, run_workers, collect
+
+    queue = open_queue(args.queue_url) if args.queue_url else open_queue()
+    if args.action == 'enqueue':
+        enqueue_sources(queue, args.sources)
+    elif args.action == 'work':
+        run_workers(str(queue.engine.url), args.sources, args.workers)
+    elif args.action == 'collect':
+        for name in args.sources or SCRAPERS:
+            collect(queue, name, args.cache_dir, args.compression)
+    elif args.action == 'retry':
+        logger.info(f"Requeued {queue.retry_dead()} dead letters")
+
+    stats = queue.stats()
+    print(json.dumps(stats))
+    return 1 if args.action == 'collect' and stats['dead'] else 0
+
+def cmd_bench(args) -> int:
+    from utils.import_bench import run_benchmark
+
+    results = run_benchmark(args.modules, args.repeat)
+    if args.output_format == 'json':
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            status = 'FAIL ' + ', '.join(result['violations']) if result['violations'] else 'ok'
+            print(f"{result['module']:<24} {result['seconds'] * 1000:8.1f} ms  "
+                  f"heavy: {', '.join(result['heavy']) or '-'}  {status}")
+    return 1 if any(result['violations'] for result in results) else 0
+
+def cmd_profile(args) -> int:
+    import cProfile
+    import pstats
+
+    command_args = args.command_args[1:] if args.command_args[:1] == ['--'] else args.command_args
+    if not command_args or command_args[0] == 'profile':
+        logger.error("profile needs a subcommand to run, e.g. `main.py profile load --workers 1`")
+        return 2
+
+    inner = build_parser().parse_args(command_args)
+    profiler = cProfile.Profile()
+    status = profiler.runcall(inner.handler, inner)
+
+    if args.output:
+        profiler.dump_stats(args.output)
+        logger.info(f"Profile written to {args.output}")
+    pstats.Stats(profiler, stream=sys.stdout).sort_stats(args.sort).print_stats(args.limit)
+    return status
+
+def _parse_interval(expression: str):
+    """Parse a 'source=seconds' cadence override."""
+    name, seconds = expression.split('=', 1)
+    if name not in SCRAPERS:
+        raise argparse.ArgumentTypeError(f"unknown source: {name}")
+    return name, int(seconds)
+
+def build_parser() -> argparse.ArgumentParser:
+    """Parser for all subcommands, sharing the concurrency, cache and batch flags."""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--workers', '--concurrency', type=int, default=1,
+                        help="Scrapers or loader processes to run at the same time")
+    common.add_argument('--cache-dir', default='scraped_data',
+                        help="Snapshot directory written by scrape and read by load")
+    common.add_argument('--batch-size', type=int, default=500, help="Listings per load task")
+
+    parser = argparse.ArgumentParser(description="Scrape, load and verify school bus inventory")
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    scrape = subparsers.add_parser('scrape', parents=[common], help="Run the scrapers and save snapshots")
+    scrape.add_argument('--source', dest='sources', action='append', choices=list(SCRAPERS),
+                        help="Only run this scraper (repeatable)")
+    scrape.add_argument('--format', dest='output_format', choices=['json', 'jsonl'], default='jsonl')
+    scrape.add_argument('--compression', choices=['gzip', 'zstd'], default=None)
+    scrape.set_defaults(handler=cmd_scrape)
+
+    load = subparsers.add_parser('load', parents=[common], help="Load snapshots into the database")
+    load.add_argument('snapshots', nargs='*', help="Snapshot or change set files (default: latest per source)")
+    load.set_defaults(handler=cmd_load)
+
+    verify = subparsers.add_parser('verify', parents=[common], help="Report on the data in the database")
+    verify.add_argument('--format', dest='output_format', choices=['text', 'json'], default='text')
+    verify.add_argument('--exact', action='store_true', help="Aggregate the buses table instead of the rollups")
+    verify.add_argument('--rebuild-rollups', dest='rebuild', action='store_true',
+                        help="Recompute the rollups from the buses table first")
+    verify.set_defaults(handler=cmd_verify)
+
+    sweep = subparsers.add_parser('sweep', help="Flag buses missing from the latest loads of their source as stale")
+    sweep.add_argument('--runs', type=int, default=None,
+                       help="Finished runs a bus may be missing from (default: STALE_AFTER_RUNS)")
+    sweep.add_argument('--source', dest='sources', action='append', help="Only sweep this source (repeatable)")
+    sweep.add_argument('--dry-run', action='store_true', help="Only count the buses that would be flagged")
+    sweep.set_defaults(handler=cmd_sweep)
+
+    search = subparsers.add_parser('search', help="Full-text search over titles, descriptions and specs")
+    search.add_argument('query', nargs='+', help="Words that must all match, e.g. wheelchair lift cummins")
+    search.add_argument('--limit', type=int, default=20)
+    search.add_argument('--format', dest='output_format', choices=['text', 'json'], default='text')
+    search.add_argument('--reindex', action='store_true', help="Rebuild the index from the buses table first")
+    search.set_defaults(handler=cmd_search)
+
+    serve = subparsers.add_parser('serve', help="Serve the inventory over a read-only HTTP API")
+    serve.add_argument('--host', default=None, help="Interface to listen on (default: API_HOST)")
+    serve.add_argument('--port', type=int, default=None, help="Port to listen on (default: API_PORT)")
+    serve.set_defaults(handler=cmd_serve)
+
+    daemon = subparsers.add_parser('daemon', parents=[common], help="Refresh each source on its own cadence")
+    daemon.add_argument('--source', dest='sources', action='append', choices=list(SCRAPERS),
+                        help="Only refresh this source (repeatable)")
+    daemon.add_argument('--format', dest='output_format', choices=['json', 'jsonl'], default='jsonl')
+    daemon.add_argument('--compression', choices=['gzip', 'zstd'], default=None)
+    daemon.add_argument('--interval', action='append', type=_parse_interval, default=[],
+                        help="Override a cadence in seconds, e.g. daimler=1800 (repeatable)")
+    daemon.add_argument('--no-load', dest='load', action='store_false', help="Only write snapshots")
+    daemon.add_argument('--max-cycles', type=int, default=None, help="Exit after this many scheduler cycles")
+    daemon.set_defaults(handler=cmd_daemon)
+
+    queue = subparsers.add_parser('queue', parents=[common],
+                                  help="Distribute listing fetches over worker processes and hosts")
+    queue.add_argument('action', choices=['enqueue', 'work', 'collect', 'status', 'retry'],
+                       help="enqueue discovered URLs, work on them with --workers processes, "
+                            "collect the results into snapshots, show the status or retry dead letters")
+    queue.add_argument('--queue', dest='queue_url', default=None, help="Queue database URL (default: QUEUE_URL)")
+    queue.add_argument('--source', dest='sources', action='append', choices=list(SCRAPERS),
+                       help="Only handle this source (repeatable)")
+    queue.add_argument('--compression', choices=['gzip', 'zstd'], default=None)
+    queue.set_defaults(handler=cmd_queue)
+
+    bench = subparsers.add_parser('bench', parents=[common], help="Measure entry point import times")
+    bench.add_argument('modules', nargs='*', help="Modules to measure (default: all entry points)")
+    bench.add_argument('--repeat', type=int, default=3)
+    bench.add_argument('--format', dest='output_format', choices=['text', 'json'], default='text')
+    bench.set_defaults(handler=cmd_bench)
+
+    profile = subparsers.add_parser('profile', help="Run another subcommand under cProfile")
+    profile.add_argument('--output', help="Write the raw profile (pstats format) to this file")
+    profile.add_argument('--sort', default='cumulative')
+    profile.add_argument('--limit', type=int, default=30, help="Number of functions to print")
+    profile.add_argument('command_args', nargs=argparse.REMAINDER, help="Subcommand and its arguments")
+    profile.set_defaults(handler=cmd_profile)
+
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=getattr(logging, args.log_level),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    try:
+        return args.handler(args)
+    except KeyboardInterrupt:
+        logger.info("Interrupted")
+        return 130
+
+if __name__ == "__main__":
+    sys.exit(main())
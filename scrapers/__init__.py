@@ -1,9 +1,32 @@
-from .base_scraper import BaseScraper
-from .daimler_scraper import DaimlerScraper
+from importlib import import_module
 
 __all__ = [
     'BaseScraper',
-    'DaimlerScraper'
+    'DaimlerScraper',
+    'SCRAPERS',
+    'get_scraper_class'
 ]
 
-# Empty file to make this directory a Python package
+# Source name -> "module:class" of its scraper, imported only when requested
+SCRAPERS = {
+    'daimler': 'scrapers.daimler_scraper:DaimlerScraper',
+    'microbird': 'scrapers.micro_bird_scraper:MicroBirdScraper',
+    'ross': 'scrapers.ross_scraper:RossScraper'
+}
+
+def get_scraper_class(name: str):
+    """Import and return the scraper class registered for a source."""
+    if name not in SCRAPERS:
+        raise ValueError(f"Unknown scraper: {name} (choose from {', '.join(SCRAPERS)})")
+    module_name, class_name = SCRAPERS[name].split(':')
+    return getattr(import_module(module_name), class_name)
+
+def __getattr__(name):
+    # Scraper classes pull in requests and BeautifulSoup, so they are only
+    # imported when first used rather than whenever the package is touched.
+    if name == 'BaseScraper':
+        from .base_scraper import BaseScraper
+        return BaseScraper
+    if name == 'DaimlerScraper':
+        return get_scraper_class('daimler')
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
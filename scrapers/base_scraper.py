@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Iterator, TYPE_CHECKING
 import requests
 from bs4 import BeautifulSoup
 import logging
@@ -13,7 +13,11 @@ import os
 # Add the project root directory to sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from database import Bus, BusOverview, BusImage, AirConditioningType, USRegion
+from database.enums import AirConditioningType, USRegion
+from scrapers.records import ScrapedListing
+
+if TYPE_CHECKING:
+    from database.models import Bus, BusOverview, BusImage
 
 class BaseScraper(ABC):
     def __init__(self):
@@ -24,13 +28,20 @@ class BaseScraper(ABC):
         }
         self.session.headers.update(self.headers)
 
+    def reset(self) -> None:
+        """Drop per-run caches so a long-lived scraper sees fresh pages next run.
+
+        The HTTP session (and its open connections) is kept.
+        """
+        pass
+
     @abstractmethod
     def get_listing_urls(self) -> List[str]:
         """Get all listing URLs from the main page."""
         pass
 
     @abstractmethod
-    def parse_listing(self, url: str) -> Optional[Dict[str, Any]]:
+    def parse_listing(self, url: str) -> Optional[ScrapedListing]:
         """Parse a single listing page and return structured data."""
         pass
 
@@ -92,8 +103,10 @@ class BaseScraper(ABC):
         except (ValueError, TypeError):
             return None
 
-    def create_bus_object(self, data: Dict[str, Any]) -> Bus:
+    def create_bus_object(self, data: Dict[str, Any]) -> 'Bus':
         """Create a Bus object from scraped data."""
+        # The ORM models (and SQLAlchemy) are only loaded by callers that store buses
+        from database.models import Bus
         return Bus(
             title=data.get('title'),
             year=data.get('year'),
@@ -128,8 +141,9 @@ class BaseScraper(ABC):
             scraped=True
         )
 
-    def create_overview_object(self, bus_id: int, data: Dict[str, Any]) -> BusOverview:
+    def create_overview_object(self, bus_id: int, data: Dict[str, Any]) -> 'BusOverview':
         """Create a BusOverview object from scraped data."""
+        from database.models import BusOverview
         return BusOverview(
             bus_id=bus_id,
             mdesc=data.get('mdesc'),
@@ -139,8 +153,9 @@ class BaseScraper(ABC):
             specs=data.get('specs')
         )
 
-    def create_image_objects(self, bus_id: int, images: List[Dict[str, Any]]) -> List[BusImage]:
+    def create_image_objects(self, bus_id: int, images: List[Dict[str, Any]]) -> List['BusImage']:
         """Create BusImage objects from scraped data."""
+        from database.models import BusImage
         return [
             BusImage(
                 bus_id=bus_id,
@@ -152,10 +167,10 @@ class BaseScraper(ABC):
             for i, img in enumerate(images)
         ]
 
-    def scrape(self) -> List[Dict[str, Any]]:
-        """Main scraping method that orchestrates the scraping process."""
+    def iter_scrape(self) -> Iterator[ScrapedListing]:
+        """Scrape listings one at a time so callers can stream the results."""
         self.logger.info(f"Starting scraping process for {self.__class__.__name__}")
-        results = []
+        count = 0
         
         try:
             listing_urls = self.get_listing_urls()
@@ -165,8 +180,9 @@ class BaseScraper(ABC):
                 try:
                     data = self.parse_listing(url)
                     if data:
-                        results.append(data)
+                        count += 1
                         self.logger.info(f"Successfully scraped listing: {url}")
+                        yield ScrapedListing.coerce(data)
                     else:
                         self.logger.warning(f"Failed to parse listing: {url}")
                 except Exception as e:
@@ -176,5 +192,8 @@ class BaseScraper(ABC):
         except Exception as e:
             self.logger.error(f"Error in scraping process: {str(e)}")
             
-        self.logger.info(f"Completed scraping process. Total results: {len(results)}")
-        return results
+        self.logger.info(f"Completed scraping process. Total results: {count}")
+
+    def scrape(self) -> List[ScrapedListing]:
+        """Main scraping method that orchestrates the scraping process."""
+        return list(self.iter_scrape())
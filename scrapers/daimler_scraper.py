@@ -11,7 +11,9 @@ import logging
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from scrapers.base_scraper import BaseScraper
-from database import AirConditioningType, USRegion
+from scrapers.records import ScrapedListing, ScrapedImage
+from database.enums import AirConditioningType, USRegion
+from utils.locations import resolve_region
 
 class DaimlerScraper(BaseScraper):
     BASE_URL = "https://www.daimlercoachesnorthamerica.com"
@@ -22,6 +24,10 @@ class DaimlerScraper(BaseScraper):
         super().__init__()
         self._main_page_soup = None
         
+    def reset(self) -> None:
+        """Forget the cached main page."""
+        self._main_page_soup = None
+
     def get_main_page(self):
         """Get the main page once and cache it."""
         if not self._main_page_soup:
@@ -78,7 +84,7 @@ class DaimlerScraper(BaseScraper):
             self.logger.error(f"Error fetching images for model {model_id}: {str(e)}")
             return []
 
-    def parse_listing(self, model_id: str) -> Optional[Dict[str, Any]]:
+    def parse_listing(self, model_id: str) -> Optional[ScrapedListing]:
         """Parse a single listing page and return structured data."""            
         soup = self.get_main_page()
         if not soup:
@@ -142,51 +148,38 @@ class DaimlerScraper(BaseScraper):
 
         us_region = self._determine_region(location)
 
-        return {
-            'title': title_text,
-            'year': year,
-            'make': make,
-            'model': model,
-            'unit_number': unit_number,
-            'passengers': passengers,
-            'wheelchair': has_wheelchair or (wheelchair == 'Yes' if wheelchair else False),
-            'vin': vin,
-            'engine': engine,
-            'transmission': transmission,
-            'gvwr': gvwr,
-            'mileage': mileage,
-            'price': price,
-            'sold': is_sold,
-            'source': 'Daimler Coaches North America',
-            'source_url': self.LISTINGS_URL,
-            'location': location,
-            'us_region': us_region,
-            'description': description,
-            'features': features,
-            'specifications': specifications,
-            'images': [
-                {
-                    'url': url,
-                    'name': f'image_{i}',
-                    'description': f'Image {i+1} of {len(images)}'
-                }
+        return ScrapedListing(
+            title=title_text,
+            year=year,
+            make=make,
+            model=model,
+            unit_number=unit_number,
+            passengers=passengers,
+            wheelchair=has_wheelchair or (wheelchair == 'Yes' if wheelchair else False),
+            vin=vin,
+            engine=engine,
+            transmission=transmission,
+            gvwr=gvwr,
+            mileage=mileage,
+            price=price,
+            sold=is_sold,
+            source='Daimler Coaches North America',
+            source_url=self.LISTINGS_URL,
+            location=location,
+            us_region=us_region,
+            description=description,
+            features=features,
+            specs=specifications,
+            images=[
+                ScrapedImage(
+                    url=url,
+                    name=f'image_{i}',
+                    description=f'Image {i+1} of {len(images)}'
+                )
                 for i, url in enumerate(images)
             ]
-        }
+        )
 
     def _determine_region(self, location: Optional[str]) -> USRegion:
         """Determine the US region based on location."""
-        if not location:
-            return USRegion.OTHER
-
-        location = location.lower()
-        if any(state in location for state in ['new york', 'massachusetts', 'connecticut', 'rhode island', 'vermont', 'new hampshire', 'maine']):
-            return USRegion.NORTHEAST
-        elif any(state in location for state in ['florida', 'georgia', 'alabama', 'mississippi', 'louisiana', 'arkansas', 'tennessee', 'kentucky', 'west virginia', 'virginia', 'north carolina', 'south carolina']):
-            return USRegion.SOUTH
-        elif any(state in location for state in ['ohio', 'indiana', 'illinois', 'michigan', 'wisconsin', 'minnesota', 'iowa', 'missouri', 'north dakota', 'south dakota', 'nebraska', 'kansas']):
-            return USRegion.MIDWEST
-        elif any(state in location for state in ['washington', 'oregon', 'california', 'nevada', 'idaho', 'utah', 'arizona', 'montana', 'wyoming', 'colorado', 'new mexico', 'alaska', 'hawaii']):
-            return USRegion.WEST
-        else:
-            return USRegion.OTHER
\ No newline at end of file
+        return resolve_region(location)
\ No newline at end of file
@@ -13,6 +13,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 from scrapers.base_scraper import BaseScraper
 from scrapers.pdf_mixin import PDFMixin
+from scrapers.records import ScrapedListing, ScrapedImage
 
 logger = logging.getLogger(__name__)
 
@@ -295,7 +296,7 @@ class MicroBirdScraper(BaseScraper, PDFMixin):
                 
         return False
         
-    def parse_listing(self, url: str) -> Optional[Dict]:
+    def parse_listing(self, url: str) -> Optional[ScrapedListing]:
         try:
             response = self.session.get(url)
             response.raise_for_status()
@@ -305,11 +306,11 @@ class MicroBirdScraper(BaseScraper, PDFMixin):
             for img in soup.select('[data-testid="imageX"] img[loading="lazy"]'):
                 if src := img.get('src'):
                     base_url = src.split('/v1/')[0]
-                    images.append({
-                        'url': base_url,
-                        'name': base_url.split('/')[-1],
-                        'description': img.get('alt', '')
-                    })
+                    images.append(ScrapedImage(
+                        url=base_url,
+                        name=base_url.split('/')[-1],
+                        description=img.get('alt', '')
+                    ))
             
             if images:
                 images = [images[0]]
@@ -341,14 +342,13 @@ class MicroBirdScraper(BaseScraper, PDFMixin):
                 capacity_elem = soup.find('h5', class_='font_5')
                 capacity = capacity_elem.text if capacity_elem else None
                 
-                specs['images'] = images
-                
-                return {
-                    'url': url,
-                    'title': title,
-                    'capacity': capacity,
-                    'specifications': specs
-                }
+                return ScrapedListing(
+                    source_url=url,
+                    title=title,
+                    passengers=capacity,
+                    specs=specs,
+                    images=images
+                )
                 
             finally:
                 self.cleanup_pdf(pdf_path)
@@ -393,7 +393,7 @@ if __name__ == "__main__":
                 if missing_fields:
                     logger.warning(f"Listing {url} missing fields: {missing_fields}")
                 
-                if not listing.get('specifications').get('images'):
+                if not listing.images:
                     logger.warning(f"Listing {url} has no images")
                 
                 results.append(listing)
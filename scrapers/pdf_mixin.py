@@ -1,5 +1,4 @@
 from typing import List, Dict, Any, Optional
-import pdfplumber
 import logging
 from pathlib import Path
 import tempfile
@@ -8,6 +7,11 @@ from urllib.parse import urljoin
 
 logger = logging.getLogger(__name__)
 
+def _pdfplumber():
+    """Import pdfplumber on demand, pdfminer is only needed when a PDF is parsed."""
+    import pdfplumber
+    return pdfplumber
+
 class PDFMixin:
     def __init__(self):
         self.logger = logging.getLogger(self.__class__.__name__)
@@ -34,7 +38,7 @@ class PDFMixin:
             self.logger.info(f"Extracting tables from PDF: {pdf_path}")
             tables = []
             
-            with pdfplumber.open(pdf_path) as pdf:
+            with _pdfplumber().open(pdf_path) as pdf:
                 for page in pdf.pages:
                     page_tables = page.extract_tables()
                     if page_tables:
@@ -52,7 +56,7 @@ class PDFMixin:
             self.logger.info(f"Extracting text from PDF: {pdf_path}")
             text = []
             
-            with pdfplumber.open(pdf_path) as pdf:
+            with _pdfplumber().open(pdf_path) as pdf:
                 for page in pdf.pages:
                     text.append(page.extract_text() or '')
             
@@ -0,0 +1,156 @@
+from collections.abc import Mapping
+from dataclasses import dataclass, field, fields
+from typing import List, Dict, Any, Optional, Union
+
+from database.enums import AirConditioningType, USRegion
+
+# Keys emitted by individual scrapers (or older snapshots) -> canonical field
+ALIASES = {
+    'url': 'source_url',
+    'region': 'us_region',
+    'specifications': 'specs',
+    'capacity': 'passengers'
+}
+
+class _RecordMapping(Mapping):
+    """Read-only dict view of a slotted record, so code written against the
+    old listing dicts (``listing['vin']``, ``listing.get('images')``) keeps
+    working. Fields that are None behave like missing keys."""
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        key = self._aliases.get(key, key)
+        if key in self._field_names:
+            value = getattr(self, key)
+            if value is None:
+                raise KeyError(key)
+            return value
+        extra = getattr(self, 'extra', None)
+        if extra and key in extra:
+            return extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.to_dict())
+
+    def __len__(self) -> int:
+        return len(self.to_dict())
+
+@dataclass(slots=True)
+class ScrapedImage(_RecordMapping):
+    url: Optional[str] = None
+    name: Optional[str] = None
+    description: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in IMAGE_FIELDS if getattr(self, name) is not None}
+
+    @classmethod
+    def from_dict(cls, data: Union[str, Dict[str, Any], 'ScrapedImage']) -> 'ScrapedImage':
+        """Build an image from a dict, or from a bare URL as some sources return."""
+        if isinstance(data, ScrapedImage):
+            return data
+        if isinstance(data, str):
+            return cls(url=data)
+        return cls(url=data.get('url'), name=data.get('name'), description=data.get('description'))
+
+@dataclass(slots=True)
+class ScrapedListing(_RecordMapping):
+    """One scraped bus listing, with the Bus and BusOverview columns as fields."""
+    title: Optional[str] = None
+    year: Optional[str] = None
+    make: Optional[str] = None
+    model: Optional[str] = None
+    body: Optional[str] = None
+    chassis: Optional[str] = None
+    engine: Optional[str] = None
+    transmission: Optional[str] = None
+    mileage: Optional[str] = None
+    passengers: Optional[str] = None
+    wheelchair: Union[bool, str, None] = None
+    color: Optional[str] = None
+    interior_color: Optional[str] = None
+    exterior_color: Optional[str] = None
+    sold: Optional[bool] = None
+    scraped: Optional[bool] = None
+    source: Optional[str] = None
+    source_url: Optional[str] = None
+    price: Optional[str] = None
+    cprice: Optional[str] = None
+    vin: Optional[str] = None
+    gvwr: Optional[str] = None
+    dimensions: Optional[str] = None
+    luggage: Optional[bool] = None
+    state_bus_standard: Optional[str] = None
+    airconditioning: Optional[AirConditioningType] = None
+    location: Optional[str] = None
+    brake: Optional[str] = None
+    contact_email: Optional[str] = None
+    contact_phone: Optional[str] = None
+    us_region: Optional[USRegion] = None
+    description: Optional[str] = None
+    unit_number: Optional[str] = None
+    # buses_overview
+    mdesc: Optional[str] = None
+    intdesc: Optional[str] = None
+    extdesc: Optional[str] = None
+    features: Optional[str] = None
+    specs: Any = None
+    images: List[ScrapedImage] = field(default_factory=list)
+    # Source specific keys without a column of their own
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        key = ALIASES.get(key, key)
+        if key in self._field_names:
+            setattr(self, key, value)
+        else:
+            self.extra[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict for serialization; None fields are left out."""
+        data = {}
+        for name in LISTING_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                data[name] = value
+        if self.images:
+            data['images'] = [image.to_dict() for image in self.images]
+        data.update(self.extra)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ScrapedListing':
+        """Build a listing from a scraper or snapshot dict, normalising its keys."""
+        listing = cls()
+        for key, value in data.items():
+            if key == 'images':
+                listing.images = [ScrapedImage.from_dict(image) for image in value or []]
+            else:
+                listing[key] = value
+        if isinstance(listing.us_region, str):
+            listing.us_region = _enum_member(USRegion, listing.us_region)
+        if isinstance(listing.airconditioning, str):
+            listing.airconditioning = _enum_member(AirConditioningType, listing.airconditioning)
+        return listing
+
+    @classmethod
+    def coerce(cls, data: Union['ScrapedListing', Dict[str, Any]]) -> 'ScrapedListing':
+        """Return ``data`` as a ScrapedListing, converting plain dicts."""
+        return data if isinstance(data, cls) else cls.from_dict(data)
+
+def _enum_member(enum_class, value: str):
+    """Map a stored enum name or value back to its member, dropping unknown ones."""
+    value = value.split('.')[-1]
+    return enum_class.__members__.get(value) or enum_class._value2member_map_.get(value)
+
+def as_dict(listing: Union[ScrapedListing, Dict[str, Any]]) -> Dict[str, Any]:
+    """Plain dict of a listing, whichever form it comes in."""
+    return listing.to_dict() if isinstance(listing, ScrapedListing) else listing
+
+IMAGE_FIELDS = tuple(f.name for f in fields(ScrapedImage))
+LISTING_FIELDS = tuple(f.name for f in fields(ScrapedListing) if f.name not in ('images', 'extra'))
+ScrapedImage._field_names = frozenset(IMAGE_FIELDS)
+ScrapedImage._aliases = {}
+ScrapedListing._field_names = frozenset(LISTING_FIELDS + ('images',))
+ScrapedListing._aliases = ALIASES
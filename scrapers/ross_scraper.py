@@ -1,4 +1,4 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator
 import logging
 from bs4 import BeautifulSoup
 import requests
@@ -12,6 +12,7 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from scrapers.base_scraper import BaseScraper
+from scrapers.records import ScrapedListing, ScrapedImage
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +28,11 @@ class RossScraper(BaseScraper):
         import urllib3
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
         self.seen_titles = set()
+
+    def reset(self) -> None:
+        """Forget the titles seen in the previous run."""
+        super().reset()
+        self.seen_titles.clear()
     
     def normalize_title(self, title: str) -> str:
         """Normaliza un título para comparación."""
@@ -174,7 +180,7 @@ class RossScraper(BaseScraper):
             logger.error(f"Error fetching category listings: {str(e)}")
             return []
     
-    def parse_listing(self, url: str) -> Optional[Dict[str, Any]]:
+    def parse_listing(self, url: str) -> Optional[ScrapedListing]:
         """Parse a detailed bus listing page."""
         try:
             logger.info(f"Parsing listing: {url}")
@@ -197,11 +203,11 @@ class RossScraper(BaseScraper):
             if img_wrappers:
                 for i, img in enumerate(img_wrappers):
                     image_url = urljoin(self.BASE_URL, img['src'])
-                    images.append({
-                        'url': image_url,
-                        'name': f"image_{i}",
-                        'description': ""
-                    })
+                    images.append(ScrapedImage(
+                        url=image_url,
+                        name=f"image_{i}",
+                        description=""
+                    ))
             
             # Extract specifications
             specs = {}
@@ -239,28 +245,23 @@ class RossScraper(BaseScraper):
             # Extract GVWR
             gvwr = details.get('GVWR', 'N/A')
             
-            data = {
-                'title': title,
-                'make': make,
-                'model': model,
-                'year': None,  # Not available in the source
-                'mileage': specs.get('Miles', 'N/A'),
-                'passengers': passengers,
-                'wheelchair': wheelchair,
-                'engine': engine,
-                'transmission': transmission,
-                'gvwr': gvwr,
-                'price': None,  # Not available in the source
-                'vin': None,  # Not available in the source
-                'location': None,  # Not available in the source
-                'region': None,  # Not available in the source
-                'description': description,
-                'specifications': details,
-                'images': images,
-                'source': 'Ross Bus',
-                'source_url': url,
-                'scraped': True
-            }
+            data = ScrapedListing(
+                title=title,
+                make=make,
+                model=model,
+                mileage=specs.get('Miles', 'N/A'),
+                passengers=passengers,
+                wheelchair=wheelchair,
+                engine=engine,
+                transmission=transmission,
+                gvwr=gvwr,
+                description=description,
+                specs=details,
+                images=images,
+                source='Ross Bus',
+                source_url=url,
+                scraped=True
+            )
             
             return data
             
@@ -268,10 +269,8 @@ class RossScraper(BaseScraper):
             logger.error(f"Error parsing listing {url}: {str(e)}")
             return None
     
-    def scrape(self) -> List[Dict[str, Any]]:
-        """Main scraping method."""
-        all_listings = []
-        
+    def iter_scrape(self) -> Iterator[ScrapedListing]:
+        """Scrape listings one at a time so callers can stream the results."""
         try:
             main_listings = self.get_listings()
             logger.info(f"Found {len(main_listings)} main listings")
@@ -285,8 +284,8 @@ class RossScraper(BaseScraper):
                         try:
                             detailed_data = self.parse_listing(category_listing['url'])
                             if detailed_data:
-                                all_listings.append(detailed_data)
                                 logger.info(f"Successfully scraped listing: {detailed_data['title']}")
+                                yield detailed_data
                             
                             time.sleep(1)
                             
@@ -298,11 +297,8 @@ class RossScraper(BaseScraper):
                     logger.error(f"Error processing main listing {listing['url']}: {str(e)}")
                     continue
             
-            return all_listings
-            
         except Exception as e:
             logger.error(f"Error in main scraping process: {str(e)}")
-            return []
 
 if __name__ == "__main__":
     from database import db, Bus, BusOverview, BusImage
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+import os
+import sys
+import logging
+import argparse
+from collections import Counter
+from typing import Dict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import or_
+from database import db, Bus, USRegion
+from database.repository import BusRepository
+from utils.locations import resolve_region
+
+logger = logging.getLogger(__name__)
+
+def backfill_regions(connector=None, page_size: int = 1000, dry_run: bool = False) -> Dict[str, int]:
+    """Fill in us_region from location for the buses that have none yet (NULL or OTHER).
+
+    Regions set by the scrapers are kept, as the processor keeps them, and
+    locations that resolve to no state leave the row alone. Reads only ids
+    and locations, then updates the buses through the ORM (one transaction
+    per page), so the rollups, search index and change subscribers see the
+    corrections. Returns how many buses moved to each region.
+    """
+    connector = connector or db
+    unset = or_(Bus.us_region.is_(None), Bus.us_region == USRegion.OTHER)
+    moved = Counter()
+    with connector.get_session() as session:
+        rows = BusRepository(session).iter_rows(['id', 'location'], page_size,
+                                               where=[Bus.location.isnot(None), Bus.location != '', unset])
+        changes = {row['id']: region for row in rows
+                   if (region := resolve_region(row['location'])) != USRegion.OTHER}
+
+    ids = sorted(changes)
+    for start in range(0, len(ids), page_size):
+        chunk = ids[start:start + page_size]
+        with connector.unit_of_work() as session:
+            # Skips the buses a scraper gave a region in the meantime
+            for bus in session.query(Bus).filter(Bus.id.in_(chunk), unset):
+                moved[changes[bus.id].name] += 1
+                if not dry_run:
+                    bus.us_region = changes[bus.id]
+    logger.info(f"{'Would move' if dry_run else 'Moved'} {sum(moved.values())} buses: {dict(moved)}")
+    return dict(moved)
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Fill in the US region of the buses that have none from their location")
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--dry-run', action='store_true', help="Only report what would change")
+    args = parser.parse_args()
+
+    backfill_regions(page_size=args.page_size, dry_run=args.dry_run)
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import db
+from database.history import bus_as_of, price_drops, ensure_partitions
+
+logger = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Query the change history of buses")
+    parser.add_argument('--bus', type=int, help="Show this bus as it was at --as-of")
+    parser.add_argument('--as-of', type=datetime.fromisoformat, default=None, help="ISO timestamp (UTC), now by default")
+    parser.add_argument('--price-drops', type=int, metavar='DAYS', help="List the price drops of the last DAYS days")
+    parser.add_argument('--partitions-ahead', type=int, metavar='MONTHS',
+                        help="Create the monthly partitions of the next MONTHS months (MySQL)")
+    args = parser.parse_args()
+
+    moment = args.as_of or datetime.utcnow()
+    if args.partitions_ahead is not None:
+        with db.engine.begin() as connection:
+            created = ensure_partitions(connection, moment + timedelta(days=31 * args.partitions_ahead))
+        print(f"Created {len(created)} partition(s)")
+    with db.engine.connect() as connection:
+        if args.bus is not None:
+            print(json.dumps(bus_as_of(connection, args.bus, moment), indent=2))
+        if args.price_drops is not None:
+            for drop in price_drops(connection, moment - timedelta(days=args.price_drops), moment):
+                print(f"{drop['changed_at']:%Y-%m-%d %H:%M}  bus {drop['bus_id']:>6}  "
+                      f"{drop['old_price']} -> {drop['price']}  (-{drop['drop']:,.0f})")
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+import os
+import sys
+import signal
+import logging
+import argparse
+from datetime import datetime
+from itertools import islice
+from typing import List, Dict, Any, Optional, Iterator
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import (
+    REFRESH_INTERVALS, SCHEDULER_JITTER, SCHEDULER_STARTUP_SPREAD, SCHEDULER_RETRY_DELAY
+)
+from scrapers import SCRAPERS, get_scraper_class
+from scripts.run_scrapers import run_scraper
+from utils.scheduler import Scheduler
+from utils.snapshot import iter_snapshot
+from utils.snapshot_diff import diff_snapshots, listing_key
+
+logger = logging.getLogger(__name__)
+
+class SourceRefresher:
+    """Scheduler job that refreshes one source.
+
+    The scraper (and its HTTP session) and the processor (and its connection
+    pool) live as long as the daemon, so only the first cycle pays for
+    opening connections. When a processor is given, only listings that
+    changed since the last snapshot that loaded successfully are written,
+    each cycle under its own run id; the unchanged ones are stamped as seen.
+    """
+
+    def __init__(self, name: str, output_dir: str = 'scraped_data', output_format: str = 'jsonl',
+                 compression: Optional[str] = None, processor=None, batch_size: int = 500):
+        self.name = name
+        self.scraper = get_scraper_class(name)()
+        self.prefix = self.scraper.__class__.__name__.lower()
+        self.source = self.scraper.__class__.__name__.replace('Scraper', '')
+        self.output_dir = output_dir
+        self.output_format = output_format
+        self.compression = compression
+        self.processor = processor
+        self.batch_size = batch_size
+        os.makedirs(output_dir, exist_ok=True)
+
+    def __call__(self) -> Dict[str, Any]:
+        self.scraper.reset()
+
+        result = run_scraper(self.scraper, self.output_dir, self.timestamp(), self.output_format, self.compression)
+        if result['status'] != 'success':
+            raise RuntimeError(result['error'])
+
+        if self.processor is not None:
+            result['saved'] = self.load(self.last_loaded(), result['output_file'])
+        return result
+
+    @property
+    def marker(self) -> str:
+        """File holding the name of the last snapshot of the source that loaded successfully."""
+        return os.path.join(self.output_dir, f"{self.prefix}.loaded")
+
+    def last_loaded(self) -> Optional[str]:
+        try:
+            with open(self.marker, encoding='utf-8') as f:
+                path = os.path.join(self.output_dir, f.read().strip())
+        except FileNotFoundError:
+            return None
+        return path if os.path.exists(path) else None
+
+    def mark_loaded(self, path: str) -> None:
+        temporary = f"{self.marker}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            f.write(os.path.basename(path))
+        os.replace(temporary, self.marker)
+
+    def timestamp(self) -> str:
+        return datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    def changed_listings(self, previous: Optional[str], current: str) -> Iterator[Dict[str, Any]]:
+        """Listings added or changed since the previous snapshot (all of them without one)."""
+        if previous is None:
+            yield from iter_snapshot(current)
+            return
+        for event in diff_snapshots(previous, current):
+            if event['op'] in ('added', 'changed'):
+                yield event['listing']
+
+    def load(self, previous: Optional[str], current: str) -> int:
+        """Write the changes of ``current`` under a new run id and record the run for the stale sweep.
+
+        If a batch fails to commit, the snapshot is not marked as loaded, so
+        the next cycle diffs against the same baseline and retries its changes.
+        """
+        from database.history import new_run_id
+        from database.sweep import finish_run, stamp_listed
+
+        self.processor.run_id = new_run_id()
+        listings = self.changed_listings(previous, current)
+        saved, complete = 0, True
+        while batch := list(islice(listings, self.batch_size)):
+            for listing in batch:
+                listing['scraped'] = True
+            try:
+                stored = self.processor.save_multiple_buses(batch, raise_on_error=True)
+            except Exception:
+                # Listings rejected by validation are not a failure, a failed commit is
+                complete = False
+                continue
+            saved += len(stored)
+        logger.info(f"{self.name}: saved {saved} new or changed buses from {current}")
+
+        if not complete:
+            logger.warning(f"{self.name}: {current} did not load completely, "
+                           f"the next cycle diffs against {previous or 'nothing'} again")
+            return saved
+
+        # Written listings were stamped by the processor, unchanged ones are stamped here
+        keys = [listing_key(listing) for listing in iter_snapshot(current)]
+        with self.processor.db.engine.begin() as connection:
+            stamp_listed(connection, self.processor.run_id, self.source, keys)
+            # An empty scrape is more likely a broken scraper than a sold-out dealer
+            if keys:
+                finish_run(connection, self.processor.run_id, [self.source])
+        self.mark_loaded(current)
+        return saved
+
+def run_daemon(sources: Optional[List[str]] = None, output_dir: str = 'scraped_data',
+               output_format: str = 'jsonl', compression: Optional[str] = None, load: bool = True,
+               batch_size: int = 500, intervals: Optional[Dict[str, int]] = None,
+               max_cycles: Optional[int] = None) -> Scheduler:
+    """Refresh every source on its own cadence until SIGINT/SIGTERM."""
+    intervals = {**REFRESH_INTERVALS, **(intervals or {})}
+    scheduler = Scheduler(SCHEDULER_JITTER, SCHEDULER_STARTUP_SPREAD, SCHEDULER_RETRY_DELAY)
+
+    processor = None
+    if load:
+        from database.processor import DataProcessor
+        processor = DataProcessor()
+
+    for name in sources or SCRAPERS:
+        refresher = SourceRefresher(name, output_dir, output_format, compression, processor, batch_size)
+        scheduler.add(name, intervals[name], refresher)
+        logger.info(f"Scheduled {name} every {intervals[name]}s")
+
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: scheduler.stop())
+
+    try:
+        scheduler.run(max_cycles)
+    finally:
+        if processor is not None:
+            processor.db.close()
+    return scheduler
+
+def _parse_interval(expression: str):
+    """Parse a 'source=seconds' command line override."""
+    name, seconds = expression.split('=', 1)
+    return name, int(seconds)
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Refresh every source on its own schedule")
+    parser.add_argument('--source', dest='sources', action='append', choices=list(SCRAPERS),
+                        help="Only refresh this source (repeatable)")
+    parser.add_argument('--output-dir', default='scraped_data', help="Snapshot directory")
+    parser.add_argument('--interval', action='append', type=_parse_interval, default=[],
+                        help="Override a cadence, e.g. daimler=1800 (repeatable)")
+    parser.add_argument('--no-load', dest='load', action='store_false', help="Only write snapshots")
+    args = parser.parse_args()
+
+    run_daemon(args.sources, args.output_dir, load=args.load, intervals=dict(args.interval))
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import logging
+import argparse
+from typing import List, Dict, Any
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+from database import db, Bus
+from database.near_duplicates import THRESHOLD, near_duplicate_pairs, update_signatures
+
+logger = logging.getLogger(__name__)
+
+def find_near_duplicates(connector=None, threshold: float = THRESHOLD, rebuild: bool = False) -> List[Dict[str, Any]]:
+    """Pairs of stored buses that look like the same listing posted twice."""
+    connector = connector or db
+    if rebuild:
+        with connector.engine.begin() as connection:
+            logger.info(f"Signed {update_signatures(connection)} buses")
+
+    with connector.engine.connect() as connection:
+        pairs = near_duplicate_pairs(connection, threshold)
+        ids = {bus_id for first, second, _ in pairs for bus_id in (first, second)}
+        titles = dict(connection.execute(select(Bus.id, Bus.title).where(Bus.id.in_(ids))).all()) if ids else {}
+    return [
+        {'first': first, 'second': second, 'similarity': round(score, 3),
+         'first_title': titles.get(first), 'second_title': titles.get(second)}
+        for first, second, score in pairs
+    ]
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="List buses whose texts are near duplicates")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help="Minimum estimated similarity")
+    parser.add_argument('--rebuild', action='store_true', help="Sign every bus first (needed once on existing data)")
+    parser.add_argument('--format', dest='output_format', choices=['text', 'json'], default='text')
+    args = parser.parse_args()
+
+    pairs = find_near_duplicates(threshold=args.threshold, rebuild=args.rebuild)
+    if args.output_format == 'json':
+        print(json.dumps(pairs, indent=2))
+    else:
+        for pair in pairs:
+            print(f"{pair['similarity']:.2f}  {pair['first']:>6} {pair['first_title']}")
+            print(f"      {pair['second']:>6} {pair['second_title']}")
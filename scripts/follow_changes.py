@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import logging
+import argparse
+from datetime import timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import db
+from database.outbox import OutboxReader, prune_outbox
+
+logger = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Print the change feed as JSON lines from a consumer's checkpoint")
+    parser.add_argument('--consumer', default='cli', help="Checkpoint name")
+    parser.add_argument('--follow', action='store_true', help="Keep waiting for new changes")
+    parser.add_argument('--poll', type=float, default=1.0, help="Seconds between polls with --follow")
+    parser.add_argument('--prune-days', type=int, metavar='DAYS',
+                        help="Delete events older than DAYS days that every consumer has processed, then exit")
+    args = parser.parse_args()
+
+    if args.prune_days is not None:
+        with db.engine.begin() as connection:
+            logger.info(f"Pruned {prune_outbox(connection, timedelta(days=args.prune_days))} events")
+        sys.exit(0)
+
+    reader = OutboxReader(db, args.consumer)
+    try:
+        for events in reader.batches(poll_interval=args.poll if args.follow else 0):
+            for event in events:
+                print(json.dumps(event, default=str), flush=True)
+    except KeyboardInterrupt:
+        pass
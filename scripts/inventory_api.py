@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+from datetime import datetime
+from enum import Enum
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional, Set, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, func
+from config.config import (
+    API_HOST, API_PORT, API_CACHE_SIZE, API_CACHE_TTL, API_REVISION_POLL_SECONDS, API_PAGE_SIZE, API_MAX_PAGE_SIZE
+)
+from database import db, Bus, USRegion
+from database.changes import subscribe, unsubscribe, revision
+from database.repository import BusRepository, LOAD_PRESETS
+from database.facets import FacetIndex, FACETS
+from database.search import search_ids, matching_ids
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Query parameter -> Bus column it filters on (exact match)
+FILTERS = {
+    'make': Bus.make,
+    'model': Bus.model,
+    'year': Bus.year,
+    'source': Bus.source,
+    'region': Bus.us_region
+}
+
+# Ranked full-text matches a search can page through; ``total`` and the
+# facet counts still cover every match
+SEARCH_MAX_RESULTS = 1000
+
+SUMMARY_FIELDS = ['id', 'title', 'year', 'make', 'model', 'mileage', 'passengers', 'wheelchair',
+                  'price', 'location', 'us_region', 'source', 'source_url', 'sold', 'updated_at']
+
+# Cache tag of everything that depends on more than one bus
+LISTINGS = 'listings'
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _fields(obj, names: List[str]) -> Dict[str, Any]:
+    return {name: _jsonable(getattr(obj, name)) for name in names}
+
+def bus_summary(bus: Bus) -> Dict[str, Any]:
+    summary = _fields(bus, SUMMARY_FIELDS)
+    summary['image'] = bus.images[0].url if bus.images else None
+    return summary
+
+def bus_detail(bus: Bus) -> Dict[str, Any]:
+    detail = _fields(bus, [column.key for column in Bus.__table__.columns])
+    overview = bus.overview
+    detail['overview'] = _fields(overview, ['mdesc', 'intdesc', 'extdesc', 'features', 'specs']) if overview else None
+    detail['images'] = [_fields(image, ['name', 'url', 'description', 'image_index']) for image in bus.images]
+    return detail
+
+def _param(params: Dict[str, List[str]], name: str) -> Optional[str]:
+    values = params.get(name)
+    return values[-1] if values else None
+
+def _int_param(params: Dict[str, List[str]], name: str, default: Optional[int]) -> Optional[int]:
+    value = _param(params, name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise HTTPError(400, f"{name} must be an integer")
+
+def _filters(params: Dict[str, List[str]]) -> List:
+    where = []
+    for name, column in FILTERS.items():
+        value = _param(params, name)
+        if value is None:
+            continue
+        if name == 'region':
+            if value.upper() not in USRegion.__members__:
+                raise HTTPError(400, f"Unknown region: {value}")
+            value = USRegion[value.upper()]
+        where.append(column == value)
+    return where
+
+class InventoryAPI:
+    """Read-only JSON API over the inventory, with responses cached in memory.
+
+    Endpoints:
+        GET /buses?q=&make=&model=&year=&source=&region=&limit=&after=
+        GET /buses/<id>
+        GET /facets?q=&make=&year=&source=&region=&wheelchair=&passengers=
+
+    Responses are kept in a TTLCache keyed by revision, path and query. A commit in
+    this process drops the entries of the buses it changed (and every
+    listing); commits from other processes are noticed by polling
+    database.changes.revision, and drop the whole cache. Every response has
+    an ETag, so clients revalidate with If-None-Match and get a 304.
+    """
+
+    def __init__(self, connector=None, cache: Optional[TTLCache] = None,
+                 revision_poll: float = API_REVISION_POLL_SECONDS, clock=time.monotonic):
+        self.db = connector or db
+        self.cache = cache if cache is not None else TTLCache(API_CACHE_SIZE, API_CACHE_TTL)
+        self.revision_poll = revision_poll
+        self.clock = clock
+        self._revision = None
+        self._checked_at = None
+        # Bumped by every local invalidation, see get()
+        self._invalidations = 0
+        self.facet_index = FacetIndex(self.db, revision_poll, clock)
+        subscribe(self.invalidate)
+
+    def close(self):
+        unsubscribe(self.invalidate)
+        self.facet_index.close()
+
+    def invalidate(self, bus_ids: Set[int]) -> None:
+        """Change subscriber: drop the responses that may show ``bus_ids``."""
+        self._invalidations += 1
+        self.cache.invalidate(LISTINGS)
+        for bus_id in bus_ids:
+            self.cache.invalidate(('bus', bus_id))
+
+    def _check_revision(self) -> int:
+        """Revision of the inventory, read at most every revision_poll seconds."""
+        now = self.clock()
+        if self._checked_at is not None and now - self._checked_at < self.revision_poll:
+            return self._revision
+        self._checked_at = now
+        with self.db.engine.connect() as connection:
+            current = revision(connection)
+        if self._revision is not None and current != self._revision:
+            logger.info(f"Inventory changed (revision {self._revision} -> {current}), clearing response cache")
+            self.cache.clear()
+        self._revision = current
+        return current
+
+    def get(self, target: str, if_none_match: Optional[str] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """Status, headers and body of the response to ``GET target``."""
+        parts = urlsplit(target)
+        params = parse_qs(parts.query)
+        path = parts.path.rstrip('/') or '/'
+        # One revision per request, for both the cache key and the ETag
+        current = self._check_revision()
+        key = (current, path, tuple(sorted((name, tuple(values)) for name, values in params.items())))
+
+        response = self.cache.get(key)
+        if response is None:
+            invalidations = self._invalidations
+            try:
+                payload, tags = self.route(path, params)
+                status = 200
+            except HTTPError as e:
+                payload, tags, status = {'error': str(e)}, None, e.status
+            body = json.dumps(payload).encode('utf-8')
+            response = (status, body, f'"{current}-{hashlib.sha1(body).hexdigest()}"')
+            # A commit during the fill may have been invalidated before the
+            # entry existed; such a response is served but not kept
+            if tags is not None and self._invalidations == invalidations:
+                self.cache.set(key, response, tags)
+
+        status, body, etag = response
+        headers = {'Content-Type': 'application/json', 'ETag': etag, 'Cache-Control': 'no-cache'}
+        if status == 200 and if_none_match and (
+            if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+        ):
+            return 304, headers, b''
+        return status, headers, body
+
+    def route(self, path: str, params: Dict[str, List[str]]) -> Tuple[Any, List]:
+        """Payload of a path and the cache tags it depends on."""
+        segments = path.strip('/').split('/')
+        with self.db.Session() as session:
+            if segments == ['buses']:
+                return self.listing(session, params), [LISTINGS]
+            if segments == ['facets']:
+                return self.facets(session, params), [LISTINGS]
+            if len(segments) == 2 and segments[0] == 'buses' and segments[1].isdigit():
+                bus = BusRepository(session).get(int(segments[1]), preset='full')
+                if bus is None:
+                    raise HTTPError(404, f"No bus with id {segments[1]}")
+                return bus_detail(bus), [('bus', bus.id)]
+        raise HTTPError(404, f"Unknown path: {path}")
+
+    def _search(self, session, query: str, where: List) -> Tuple[List[int], int]:
+        """Ids of the first SEARCH_MAX_RESULTS buses matching ``query`` and ``where``, best first,
+        and the number of all matching buses."""
+        ranked = [bus_id for bus_id, _ in search_ids(session.connection(), query, SEARCH_MAX_RESULTS)]
+        capped = len(ranked) == SEARCH_MAX_RESULTS
+        if where and ranked:
+            matching = set(session.scalars(select(Bus.id).where(Bus.id.in_(ranked), *where)))
+            ranked = [bus_id for bus_id in ranked if bus_id in matching]
+        if not capped:
+            return ranked, len(ranked)
+        total = session.scalar(select(func.count(Bus.id)).where(
+            Bus.id.in_(matching_ids(session.connection(), query)), *where))
+        return ranked, total
+
+    def listing(self, session, params: Dict[str, List[str]]) -> Dict[str, Any]:
+        """One page of bus summaries, in id order or by relevance when searching.
+
+        ``after`` is the ``next`` value of the previous page: a bus id when
+        browsing, an offset into the ranked results when searching.
+        """
+        limit = min(max(_int_param(params, 'limit', API_PAGE_SIZE), 1), API_MAX_PAGE_SIZE)
+        after = _int_param(params, 'after', None)
+        where = _filters(params)
+        query = _param(params, 'q')
+
+        if query:
+            if after is not None and after < 0:
+                raise HTTPError(400, "after must not be negative")
+            offset = after or 0
+            ids, total = self._search(session, query, where)
+            page = ids[offset:offset + limit]
+            statement = select(Bus).options(*LOAD_PRESETS['images']).where(Bus.id.in_(page))
+            buses = {bus.id: bus for bus in session.scalars(statement)}
+            items = [bus_summary(buses[bus_id]) for bus_id in page if bus_id in buses]
+            next_cursor = offset + limit if offset + limit < len(ids) else None
+            # Only the best SEARCH_MAX_RESULTS matches can be paged through
+            return {'items': items, 'total': total, 'next': next_cursor, 'truncated': total > len(ids)}
+
+        buses, next_cursor = BusRepository(session).page(limit, after, preset='images', where=where)
+        return {'items': [bus_summary(bus) for bus in buses], 'next': next_cursor}
+
+    def facets(self, session, params: Dict[str, List[str]]) -> Dict[str, Dict[str, int]]:
+        """Counts per facet value of the buses matching the facet filters and ``q``.
+
+        Answered by the in-memory FacetIndex; repeat a parameter to match
+        any of several values, e.g. ``?passengers=16-24&passengers=25-36``.
+        """
+        filters = {name: values for name, values in params.items() if name in FACETS}
+        query = _param(params, 'q')
+        ids = set(session.scalars(matching_ids(session.connection(), query))) if query else None
+        return self.facet_index.counts(filters, ids)
+
+def make_handler(api: InventoryAPI):
+    class InventoryRequestHandler(BaseHTTPRequestHandler):
+        server_version = 'InventoryAPI/1.0'
+
+        def do_GET(self):
+            try:
+                status, headers, body = api.get(self.path, self.headers.get('If-None-Match'))
+            except Exception as e:
+                logger.error(f"Error serving {self.path}: {str(e)}")
+                status, headers, body = 500, {'Content-Type': 'application/json'}, b'{"error": "Internal error"}'
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} {format % args}")
+
+    return InventoryRequestHandler
+
+def serve(host: str = API_HOST, port: int = API_PORT, api: Optional[InventoryAPI] = None) -> None:
+    """Serve the API until interrupted."""
+    api = api or InventoryAPI()
+    server = ThreadingHTTPServer((host, port), make_handler(api))
+    logger.info(f"Serving the inventory API on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        api.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the inventory over a read-only HTTP API")
+    parser.add_argument('--host', default=API_HOST)
+    parser.add_argument('--port', type=int, default=API_PORT)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    try:
+        serve(args.host, args.port)
+    except KeyboardInterrupt:
+        logger.info("Interrupted")
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+import os
+import sys
+import logging
+import argparse
+from typing import Dict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import db
+from database.entities import MATCH_THRESHOLD, resolve_entities
+
+logger = logging.getLogger(__name__)
+
+def run(connector=None, threshold: float = MATCH_THRESHOLD) -> Dict[str, int]:
+    """Group the stored listings into physical buses in one transaction."""
+    connector = connector or db
+    with connector.get_session() as session:
+        return resolve_entities(session, threshold)
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Link listings of the same physical bus across sources")
+    parser.add_argument('--threshold', type=float, default=MATCH_THRESHOLD, help="Minimum match score")
+    args = parser.parse_args()
+
+    stats = run(threshold=args.threshold)
+    print(f"{stats['buses']} buses, {stats['entities']} entities, {stats['compared']} pairs compared, "
+          f"{stats['matched']} matched, {stats['changed']} assignments changed")
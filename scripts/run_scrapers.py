@@ -3,42 +3,80 @@ import os
 import sys
 import json
 import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from scrapers.daimler_scraper import DaimlerScraper
-from scrapers.micro_bird_scraper import MicroBirdScraper
-from scrapers.ross_scraper import RossScraper
+from scrapers import SCRAPERS, get_scraper_class
+from utils.snapshot import SnapshotWriter, snapshot_filename, index_path
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('scrapers_execution.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
-def run_scrapers(output_dir='scraped_data'):
+def run_scraper(scraper, output_dir, timestamp, output_format, compression):
+    """Run one scraper and write its snapshot, returning its stats entry."""
+    scraper_name = scraper.__class__.__name__
+    logger.info(f"Starting {scraper_name}")
+    
+    try:
+        output_file = f"{output_dir}/{snapshot_filename(scraper_name.lower(), timestamp, output_format, compression)}"
+        source = scraper_name.replace('Scraper', '')
+
+        if output_format == 'jsonl':
+            with SnapshotWriter(output_file, compression) as writer:
+                for bus in scraper.iter_scrape():
+                    bus.source = source
+                    writer.write(bus)
+            count = writer.count
+        else:
+            buses_data = scraper.scrape()
+            
+            for bus in buses_data:
+                bus.source = source
+            
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump([bus.to_dict() for bus in buses_data], f, indent=2, ensure_ascii=False)
+            count = len(buses_data)
+        
+        logger.info(f"✓ {scraper_name} completed: {count} buses saved to {output_file}")
+        
+        result = {
+            "count": count,
+            "output_file": output_file,
+            "status": "success"
+        }
+        if output_format == 'jsonl':
+            result["index_file"] = index_path(output_file)
+        return result
+        
+    except Exception as e:
+        logger.error(f"✗ Error in {scraper_name}: {str(e)}")
+        return {
+            "count": 0,
+            "status": "error",
+            "error": str(e)
+        }
+
+def run_scrapers(output_dir='scraped_data', output_format='json', compression=None, sources=None, workers=1):
     """
-    Run all scrapers and save their results as JSON files.
+    Run all scrapers and save their results as snapshot files.
     
     Args:
-        output_dir: Directory to save JSON output files
+        output_dir: Directory to save output files
+        output_format: 'json' for a pretty-printed array per source, or 'jsonl'
+            to append listings one per line as they are scraped
+        compression: None, 'gzip' or 'zstd' (jsonl only)
+        sources: Names from scrapers.SCRAPERS to run (default: all)
+        workers: Number of scrapers to run at the same time
     
     Returns:
         dict: Statistics about the scraped data
     """
     Path(output_dir).mkdir(parents=True, exist_ok=True)
     
-    scrapers = [
-        DaimlerScraper(),
-        MicroBirdScraper(),
-        RossScraper()
-    ]
+    scrapers = [get_scraper_class(name)() for name in sources or SCRAPERS]
     
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     stats = {
@@ -46,35 +84,14 @@ def run_scrapers(output_dir='scraped_data'):
         "scrapers": {}
     }
     
-    for scraper in scrapers:
-        scraper_name = scraper.__class__.__name__
-        logger.info(f"Starting {scraper_name}")
-        
-        try:
-            buses_data = scraper.scrape()
-            
-            for bus in buses_data:
-                bus['source'] = scraper_name.replace('Scraper', '')
-            
-            output_file = f"{output_dir}/{scraper_name.lower()}_{timestamp}.json"
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(buses_data, f, indent=2, ensure_ascii=False)
-            
-            logger.info(f"✓ {scraper_name} completed: {len(buses_data)} buses saved to {output_file}")
-            
-            stats["scrapers"][scraper_name] = {
-                "count": len(buses_data),
-                "output_file": output_file,
-                "status": "success"
-            }
-            
-        except Exception as e:
-            logger.error(f"✗ Error in {scraper_name}: {str(e)}")
-            stats["scrapers"][scraper_name] = {
-                "count": 0,
-                "status": "error",
-                "error": str(e)
-            }
+    # Scrapers are network bound, so threads are enough to overlap them
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = executor.map(
+            lambda scraper: run_scraper(scraper, output_dir, timestamp, output_format, compression),
+            scrapers
+        )
+        for scraper, result in zip(scrapers, results):
+            stats["scrapers"][scraper.__class__.__name__] = result
     
     stats_file = f"{output_dir}/scraping_stats_{timestamp}.json"
     with open(stats_file, 'w', encoding='utf-8') as f:
@@ -88,5 +105,25 @@ def run_scrapers(output_dir='scraped_data'):
     return stats
 
 if __name__ == "__main__":
-    run_scrapers()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('scrapers_execution.log'),
+            logging.StreamHandler()
+        ]
+    )
+
+    parser = argparse.ArgumentParser(description="Run all scrapers and save snapshot files")
+    parser.add_argument('--output-dir', default='scraped_data', help="Directory for the snapshot files")
+    parser.add_argument('--format', dest='output_format', choices=['json', 'jsonl'], default='json',
+                        help="Snapshot format (jsonl streams one listing per line)")
+    parser.add_argument('--compression', choices=['gzip', 'zstd'], default=None,
+                        help="Compress jsonl snapshots")
+    parser.add_argument('--source', dest='sources', action='append', choices=list(SCRAPERS),
+                        help="Only run this scraper (repeatable)")
+    parser.add_argument('--workers', type=int, default=1, help="Scrapers to run concurrently")
+    args = parser.parse_args()
+
+    run_scrapers(args.output_dir, args.output_format, args.compression, args.sources, args.workers)
     logger.info("To populate the database with this data, run: python database/populate_db.py") 
\ No newline at end of file
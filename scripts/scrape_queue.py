@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import QUEUE_URL, QUEUE_LEASE_SECONDS, QUEUE_MAX_ATTEMPTS, QUEUE_BACKOFF_SECONDS
+from database.work_queue import WorkQueue, worker_name
+from scrapers import SCRAPERS, get_scraper_class
+from utils.snapshot import SnapshotWriter, snapshot_filename
+
+logger = logging.getLogger(__name__)
+
+def open_queue(queue_url: str = QUEUE_URL) -> WorkQueue:
+    return WorkQueue(queue_url, QUEUE_LEASE_SECONDS, QUEUE_MAX_ATTEMPTS, QUEUE_BACKOFF_SECONDS)
+
+def enqueue_sources(queue: WorkQueue, sources: Optional[List[str]] = None) -> Dict[str, int]:
+    """Discover the listing URLs of each source and add them to the queue."""
+    added = {}
+    for name in sources or SCRAPERS:
+        urls = get_scraper_class(name)().get_listing_urls()
+        logger.info(f"{name}: discovered {len(urls)} listings")
+        added[name] = queue.enqueue(name, urls)
+    return added
+
+def process_task(queue: WorkQueue, scraper, task: Dict[str, Any], worker: str) -> bool:
+    """Parse the listing of a claimed task and record the outcome."""
+    try:
+        listing = scraper.parse_listing(task['url'])
+    except Exception as e:
+        queue.fail(task['id'], worker, str(e))
+        return False
+    if listing is None:
+        queue.fail(task['id'], worker, 'listing could not be parsed')
+        return False
+    return queue.complete(task['id'], worker, listing.to_dict() if hasattr(listing, 'to_dict') else listing)
+
+def work(queue_url: str = QUEUE_URL, sources: Optional[List[str]] = None, worker_id: Optional[str] = None,
+         max_tasks: Optional[int] = None, idle_timeout: float = 0, poll_interval: float = 5) -> int:
+    """Claim and parse tasks until the queue is drained.
+
+    Runs in its own process; several of them (on one or several hosts) can
+    work on the same queue. Returns the number of listings parsed.
+    """
+    queue = open_queue(queue_url)
+    worker = worker_id or worker_name()
+    scrapers = {}
+    done = 0
+    idle_since = None
+
+    while max_tasks is None or done < max_tasks:
+        tasks = []
+        for source in sources or [None]:
+            tasks = queue.claim(worker, source)
+            if tasks:
+                break
+        if not tasks:
+            # Tasks backing off after a failure, or leased by a worker that may
+            # still die, can come back: only stop once none are left
+            remaining = [queue.stats(source) for source in sources or [None]]
+            idle_since = idle_since or time.monotonic()
+            if not any(stats['pending'] or stats['leased'] for stats in remaining):
+                break
+            if idle_timeout and time.monotonic() - idle_since >= idle_timeout:
+                break
+            time.sleep(poll_interval)
+            continue
+        idle_since = None
+
+        task = tasks[0]
+        if task['source'] not in scrapers:
+            scrapers[task['source']] = get_scraper_class(task['source'])()
+        if process_task(queue, scrapers[task['source']], task, worker):
+            done += 1
+
+    logger.info(f"Worker {worker} parsed {done} listings")
+    return done
+
+def run_workers(queue_url: str = QUEUE_URL, sources: Optional[List[str]] = None, processes: int = 1) -> int:
+    """Run ``processes`` workers on this machine and wait for the queue to drain."""
+    processes = max(1, processes)
+    if processes == 1:
+        return work(queue_url, sources)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(work, queue_url, sources) for _ in range(processes)]
+        return sum(future.result() for future in futures)
+
+def collect(queue: WorkQueue, source: str, output_dir: str = 'scraped_data',
+            compression: Optional[str] = None) -> Optional[str]:
+    """Write the parsed listings of a source to a JSON Lines snapshot."""
+    scraper_name = get_scraper_class(source).__name__
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_file = f"{output_dir}/{snapshot_filename(scraper_name.lower(), timestamp, 'jsonl', compression)}"
+
+    with SnapshotWriter(output_file, compression) as writer:
+        for listing in queue.iter_results(source):
+            listing['source'] = scraper_name.replace('Scraper', '')
+            writer.write(listing)
+
+    dead = queue.dead_letters(source)
+    logger.info(f"{source}: {writer.count} listings written to {output_file}, {len(dead)} dead letters")
+    for task in dead:
+        logger.warning(f"Dead letter {task['url']} after {task['attempts']} attempts: {task['last_error']}")
+    return output_file
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Distribute listing fetches over worker processes")
+    parser.add_argument('action', choices=['enqueue', 'work', 'collect', 'status', 'retry'])
+    parser.add_argument('--queue', default=QUEUE_URL, help="Queue database URL")
+    parser.add_argument('--source', dest='sources', action='append', choices=list(SCRAPERS),
+                        help="Only handle this source (repeatable)")
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument('--output-dir', default='scraped_data', help="Snapshot directory for collect")
+    args = parser.parse_args()
+
+    queue = open_queue(args.queue)
+    if args.action == 'enqueue':
+        enqueue_sources(queue, args.sources)
+    elif args.action == 'work':
+        run_workers(args.queue, args.sources, args.processes)
+    elif args.action == 'collect':
+        for name in args.sources or SCRAPERS:
+            collect(queue, name, args.output_dir)
+    elif args.action == 'retry':
+        logger.info(f"Requeued {queue.retry_dead()} dead letters")
+    print(queue.stats())
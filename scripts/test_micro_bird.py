@@ -36,7 +36,7 @@ def main():
             details = scraper.parse_listing(model['url'])
             if details:
                 logger.info("\nSpecifications:")
-                for key, value in details['specifications'].items():
+                for key, value in details.specs.items():
                     logger.info(f"- {key}: {value}")
             else:
                 logger.warning("Could not parse model details")
@@ -1,5 +1,9 @@
+from typing import Dict, Any
+import json
 import logging
 from database import db, Bus, BusOverview, BusImage
+from database.repository import BusRepository
+from database.rollups import rollup_stats, rebuild_rollups, rollup_key
 from sqlalchemy import func
 
 logging.basicConfig(
@@ -35,56 +39,91 @@ def print_bus_details(bus):
     
     logger.info("="*50)
 
-def main():
+def collect_stats(session, exact: bool = False) -> Dict[str, Any]:
+    """Counts used to verify a load, in a form that can be compared between runs.
+
+    Read from the inventory rollups unless ``exact`` asks for aggregates over
+    the whole buses table (which also catches rollups gone stale).
+    """
+    if not exact:
+        return rollup_stats(session)
+
+    def grouped(column):
+        counts = {}
+        for key, count in session.query(column, func.count(Bus.id)).group_by(column).all():
+            counts[rollup_key(key)] = counts.get(rollup_key(key), 0) + count
+        return counts
+
+    duplicate_vins = session.query(
+        Bus.vin, func.count(Bus.vin)
+    ).group_by(Bus.vin).having(func.count(Bus.vin) > 1).all()
+
+    return {
+        'total': session.query(func.count(Bus.id)).scalar(),
+        'by_source': grouped(Bus.source),
+        'by_make': grouped(Bus.make),
+        'by_year': grouped(Bus.year),
+        'by_region': grouped(Bus.us_region),
+        'duplicate_vins': {vin: count for vin, count in duplicate_vins if vin}
+    }
+
+def main(output_format='text', exact=False, rebuild=False):
     try:
         db.create_tables()
+        session = db.session
+        if rebuild:
+            rebuild_rollups(session)
+            session.commit()
+        stats = collect_stats(session, exact)
         
-        total_buses = db.session.query(func.count(Bus.id)).scalar()
-        logger.info(f"\nTotal buses in database: {total_buses}")
+        if output_format == 'json':
+            print(json.dumps(stats, indent=2))
+            return stats
         
-        source_counts = db.session.query(
-            Bus.source, func.count(Bus.id)
-        ).group_by(Bus.source).all()
+        logger.info(f"\nTotal buses in database: {stats['total']}")
         
         logger.info("\nBuses by source:")
-        for source, count in source_counts:
+        for source, count in stats['by_source'].items():
             logger.info(f"{source}: {count}")
         
-        make_counts = db.session.query(
-            Bus.make, func.count(Bus.id)
-        ).group_by(Bus.make).all()
-        
         logger.info("\nBuses by make:")
-        for make, count in make_counts:
+        for make, count in stats['by_make'].items():
             logger.info(f"{make}: {count}")
         
-        year_counts = db.session.query(
-            Bus.year, func.count(Bus.id)
-        ).group_by(Bus.year).all()
-        
         logger.info("\nBuses by year:")
-        for year, count in year_counts:
+        for year, count in stats['by_year'].items():
             logger.info(f"{year}: {count}")
         
+        logger.info("\nBuses by region:")
+        for region, count in stats['by_region'].items():
+            logger.info(f"{region}: {count}")
+        
         logger.info("\nLatest 3 buses added:")
-        latest_buses = db.session.query(Bus).order_by(Bus.created_at.desc()).limit(3).all()
+        # Overview joined in and images fetched in one query for all three buses
+        latest_buses = BusRepository(session).latest(3, preset='full')
         for bus in latest_buses:
             print_bus_details(bus)
         
-        duplicate_vins = db.session.query(
-            Bus.vin, func.count(Bus.vin)
-        ).group_by(Bus.vin).having(func.count(Bus.vin) > 1).all()
-        
-        if duplicate_vins:
+        if stats['duplicate_vins']:
             logger.warning("\nPotential duplicate VINs found:")
-            for vin, count in duplicate_vins:
+            for vin, count in stats['duplicate_vins'].items():
                 logger.warning(f"VIN {vin}: {count} occurrences")
         
         logger.info("\nData verification completed successfully")
+        return stats
         
     except Exception as e:
         logger.error(f"Error in verification process: {str(e)}")
         raise
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Report on the data in the database")
+    parser.add_argument('--format', dest='output_format', choices=['text', 'json'], default='text')
+    parser.add_argument('--exact', action='store_true', help="Aggregate the buses table instead of the rollups")
+    parser.add_argument('--rebuild-rollups', dest='rebuild', action='store_true',
+                        help="Recompute the rollups from the buses table first")
+    args = parser.parse_args()
+
+    main(args.output_format, args.exact, args.rebuild)
@@ -0,0 +1,11 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+# The database tests create and wipe the bus tables, so they run on a
+# throwaway SQLite file unless TEST_DATABASE_URL points them at a server,
+# e.g. TEST_DATABASE_URL=mysql+pymysql://root@localhost/buses_test
+_tmp_dir = tempfile.mkdtemp(prefix='buses_test_')
+atexit.register(shutil.rmtree, _tmp_dir, ignore_errors=True)
+os.environ['DATABASE_URL'] = os.getenv('TEST_DATABASE_URL') or f"sqlite:///{_tmp_dir}/buses.db"
@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from database.models import Bus
+
+pytest.importorskip('aiosqlite')
+
+from database.async_connector import AsyncDatabaseConnector
+from database.processor import DataProcessor
+
+def listing(title, **extra):
+    return {'title': title, 'year': '2020', 'make': 'Blue Bird', 'model': 'Vision',
+            'source_url': f"https://example.com/{title}", **extra}
+
+async def count_buses(connector):
+    async with connector.unit_of_work() as session:
+        return await session.run_sync(lambda sync_session: sync_session.query(Bus).count())
+
+def test_async_batch_insert_then_update(tmp_path):
+    async def scenario():
+        connector = AsyncDatabaseConnector(f"sqlite+aiosqlite:///{tmp_path / 'buses.db'}")
+        await connector.create_tables()
+        processor = DataProcessor()
+        try:
+            saved = await processor.save_multiple_buses_async([listing('A'), listing('B')], connector)
+            updated = await processor.save_multiple_buses_async([listing('A', price='1000')], connector)
+            return saved, updated, await count_buses(connector)
+        finally:
+            await connector.close()
+
+    saved, updated, total = asyncio.run(scenario())
+
+    assert [bus.title for bus in saved] == ['A', 'B']
+    assert updated[0].id == saved[0].id and updated[0].price == '1000'
+    assert total == 2
+
+def test_writes_overlap_with_other_coroutines(tmp_path):
+    async def scenario():
+        connector = AsyncDatabaseConnector(f"sqlite+aiosqlite:///{tmp_path / 'buses.db'}")
+        await connector.create_tables()
+        ticks = []
+
+        async def fetcher():
+            for _ in range(5):
+                ticks.append('fetch')
+                await asyncio.sleep(0)
+
+        async def writer():
+            saved = await DataProcessor().save_multiple_buses_async([listing(str(i)) for i in range(20)], connector)
+            ticks.append('saved')
+            return saved
+
+        try:
+            saved, _ = await asyncio.gather(writer(), fetcher())
+            return saved, ticks
+        finally:
+            await connector.close()
+
+    saved, ticks = asyncio.run(scenario())
+    assert len(saved) == 20
+    # The fetcher ran while the batch was being written, not after it
+    assert ticks == ['fetch'] * 5 + ['saved']
@@ -0,0 +1,106 @@
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import select
+from database.db_connector import DatabaseConnector
+from database.models import Base, Bus, IngestRun
+from database.processor import DataProcessor
+from scrapers.records import ScrapedListing
+from scripts.daemon import SourceRefresher
+from utils.snapshot import iter_snapshot
+
+MAIN_PAGE = """
+<li><div class="ListGridView"><a href="/vision"></a><h6 class="Title">Vision</h6></div></li>
+"""
+CATEGORY_PAGE = """
+<li><div class="ListGridView ListInnerWrap"><a href="/vision/1"></a><h6 class="Title">2019 Vision 1</h6></div></li>
+<li><div class="ListGridView ListInnerWrap"><a href="/vision/2"></a><h6 class="Title">2019 Vision 2</h6></div></li>
+"""
+
+def _response(url):
+    response = MagicMock()
+    response.raise_for_status.return_value = None
+    response.text = MAIN_PAGE if url.endswith('/school-buses') else CATEGORY_PAGE
+    return response
+
+@pytest.fixture
+def refresher(tmp_path, monkeypatch):
+    monkeypatch.setattr('scrapers.ross_scraper.time.sleep', lambda seconds: None)
+    refresher = SourceRefresher('ross', str(tmp_path))
+    refresher.scraper.session.get = _response
+    refresher.scraper.parse_listing = lambda url: ScrapedListing(
+        title=f"Bus {url.rsplit('/', 1)[-1]}", year='2019', make='Blue Bird', model='Vision', source_url=url)
+    return refresher
+
+def test_every_cycle_scrapes_the_whole_inventory(refresher):
+    cycles = iter(['20260101_000000', '20260101_010000'])
+    refresher.timestamp = lambda: next(cycles)
+    first, second = refresher(), refresher()
+    assert first['count'] == second['count'] == 2
+    assert [listing['title'] for listing in iter_snapshot(second['output_file'])] == ['Bus 1', 'Bus 2']
+
+@pytest.fixture
+def processor(tmp_path):
+    connector = DatabaseConnector(f"sqlite:///{tmp_path / 'buses.db'}")
+    Base.metadata.create_all(connector.engine)
+    yield DataProcessor(connector, near_duplicates=False)
+    connector.close()
+
+def runs(processor):
+    with processor.db.engine.connect() as connection:
+        seen = connection.execute(select(Bus.title, Bus.last_seen_run).order_by(Bus.title)).all()
+        finished = connection.execute(select(IngestRun.run_id).where(IngestRun.source == 'Ross')
+                                      .order_by(IngestRun.run_id)).scalars().all()
+    return seen, finished
+
+def test_every_cycle_is_its_own_run(refresher, processor):
+    cycles = iter(['20260101_000000', '20260101_010000'])
+    refresher.timestamp = lambda: next(cycles)
+    refresher.processor = processor
+
+    assert refresher()['saved'] == 2
+    first_seen, first_runs = runs(processor)
+    assert refresher()['saved'] == 0
+    seen, finished = runs(processor)
+
+    # Nothing changed in the second cycle, yet its run saw every bus
+    assert len(finished) == 2 and finished[0] == first_runs[0]
+    assert seen == [('Bus 1', finished[1]), ('Bus 2', finished[1])]
+    assert {run for _, run in first_seen} == {finished[0]}
+
+def test_failed_load_is_retried_next_cycle(refresher, processor, monkeypatch):
+    cycles = iter(['20260101_000000', '20260101_010000', '20260101_020000'])
+    refresher.timestamp = lambda: next(cycles)
+    refresher.processor = processor
+    refresher()
+
+    titles = {'/vision/1': 'Bus 1 (sold)'}
+    refresher.scraper.parse_listing = lambda url: ScrapedListing(
+        title=titles.get(url[url.index('/vision'):], f"Bus {url.rsplit('/', 1)[-1]}"), year='2019',
+        make='Blue Bird', model='Vision', source_url=url)
+    save = processor.save_multiple_buses
+
+    def failed_commit(batch, raise_on_error=False):
+        raise RuntimeError("database is locked")
+    monkeypatch.setattr(processor, 'save_multiple_buses', failed_commit)
+    assert refresher()['saved'] == 0
+    assert len(runs(processor)[1]) == 1
+
+    # The third snapshot equals the second, but is diffed against the first
+    monkeypatch.setattr(processor, 'save_multiple_buses', save)
+    assert refresher()['saved'] == 1
+    seen, finished = runs(processor)
+    assert len(finished) == 2
+    assert [title for title, _ in seen] == ['Bus 1 (sold)', 'Bus 2']
+
+def test_run_finishes_when_every_listing_is_rejected(refresher, processor):
+    refresher.timestamp = lambda: '20260101_000000'
+    refresher.processor = processor
+    # No year: every listing fails validation, yet the batch commits
+    refresher.scraper.parse_listing = lambda url: ScrapedListing(
+        title=f"Bus {url.rsplit('/', 1)[-1]}", make='Blue Bird', model='Vision', source_url=url)
+
+    result = refresher()
+    assert result['saved'] == 0
+    assert len(runs(processor)[1]) == 1
+    assert refresher.last_loaded() == result['output_file']
@@ -1,5 +1,8 @@
 import pytest
-from database import db, Bus, BusOverview, BusImage, AirConditioningType, USRegion
+import subprocess
+import sys
+from pathlib import Path
+from database import db, Bus, BusOverview, BusImage, AirConditioningType, USRegion, DatabaseConnector
 from datetime import datetime
 
 @pytest.fixture(scope="function")
@@ -8,6 +11,22 @@ def session():
         yield session
         session.rollback()
 
+def test_engine_is_created_on_first_use():
+    connector = DatabaseConnector()
+    assert connector._engine is None
+    assert connector.engine is connector.engine
+    connector.close()
+    assert connector._engine is None
+
+def test_scrapers_do_not_load_the_connector():
+    code = (
+        "import sys, scrapers.daimler_scraper; "
+        "print(any(m in sys.modules for m in ('database.db_connector', 'dotenv', 'pymysql')))"
+    )
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=Path(__file__).parent.parent)
+    assert result.stdout.strip() == 'False'
+
 def test_create_tables():
     db.create_tables()
     assert True
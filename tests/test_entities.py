@@ -0,0 +1,78 @@
+import pytest
+from database.db_connector import DatabaseConnector
+from database.models import Base, Bus, BusEntity
+from database import entities
+from database.entities import blocking_keys, candidate_pairs, entity_of, match_score, resolve_entities
+
+DESCRIPTION = ("Clean one owner activity bus with Cummins ISB engine, Allison transmission, rear air, "
+               "Braun wheelchair lift and luggage compartment. Serviced every year.")
+
+def bus(source, **fields):
+    return {'source': source, 'vin': None, 'year': '2019', 'make': 'Blue Bird', 'model': 'Vision',
+            'passengers': '24', 'mileage': '85,000', 'title': f'{source} bus', 'description': None, **fields}
+
+@pytest.fixture
+def connector(tmp_path):
+    connector = DatabaseConnector(f"sqlite:///{tmp_path / 'buses.db'}")
+    Base.metadata.create_all(connector.engine)
+    yield connector
+    connector.close()
+
+def add(connector, *rows):
+    with connector.engine.begin() as connection:
+        connection.execute(Bus.__table__.insert(), list(rows))
+
+def assignments(connector):
+    with connector.engine.connect() as connection:
+        return dict(connection.execute(BusEntity.__table__.select().with_only_columns(
+            BusEntity.bus_id, BusEntity.entity_id)).all())
+
+def test_match_score_weighs_shared_evidence():
+    first = bus('dealer-a', id=1)
+    assert match_score(first, bus('dealer-b', make='BLUEBIRD', model='Vision 3800', mileage='85,400 miles')) >= 0.75
+    assert match_score(first, bus('dealer-b', year='2018')) == 0.0
+    assert match_score(first, bus('dealer-b', passengers='36', mileage='140,000', model='All American')) < 0.75
+    # Two VINs settle it either way
+    assert match_score(bus('a', vin='1BAKFCPH5KF000001'), bus('b', vin='1bakfcph5kf000001', model='T3RE')) == 1.0
+    assert match_score(bus('a', vin='1BAKFCPH5KF000001'), bus('b', vin='1BAKFCPH5KF000002')) == 0.0
+    # Too little to go on
+    assert match_score(bus('a', model=None, passengers=None, mileage=None),
+                       bus('b', model=None, passengers=None, mileage=None)) == 0.0
+
+def test_blocking_limits_comparisons(monkeypatch):
+    rows = {1: bus('a', id=1), 2: bus('b', id=2), 3: bus('a', id=3),
+            4: bus('b', id=4, year='2010', make='Thomas', passengers='72')}
+    assert ('year_make', '2019', 'blue bird') in blocking_keys(rows[1])
+    # Same-source and unrelated pairs are never compared
+    assert candidate_pairs(rows) == {(1, 2), (2, 3)}
+    monkeypatch.setattr(entities, 'MAX_BLOCK_SIZE', 2)
+    assert candidate_pairs(rows) == set()
+
+def test_resolves_listings_across_sources(connector):
+    add(connector,
+        bus('dealer-a', title='2019 Blue Bird Vision Activity Bus', description=DESCRIPTION),
+        bus('dealer-b', title='Used 2019 Bluebird Vision - 24 pass', make='BLUEBIRD', mileage='85,350 mi'),
+        bus('dealer-c', vin='1BAKFCPH5KF000001', passengers='36', mileage='12,000'),
+        bus('dealer-d', vin='1BAKFCPH5KF000001', passengers='36 passengers', mileage=None, model='Vision SD'))
+    with connector.get_session() as session:
+        stats = resolve_entities(session)
+    assert stats['entities'] == 2 and stats['matched'] == 2
+    assert assignments(connector) == {1: 1, 2: 1, 3: 3, 4: 3}
+    with connector.get_session() as session:
+        assert [listing.id for listing in entity_of(session, 2)] == [1, 2]
+
+def test_entity_ids_are_stable_across_runs(connector):
+    add(connector, bus('dealer-a'), bus('dealer-b'))
+    with connector.get_session() as session:
+        resolve_entities(session)
+    assert assignments(connector) == {1: 1, 2: 1}
+
+    # The first listing is sold and a third source lists the bus: the entity keeps its id
+    with connector.engine.begin() as connection:
+        connection.execute(Bus.__table__.delete().where(Bus.id == 1))
+    add(connector, bus('dealer-c'))
+    with connector.get_session() as session:
+        stats = resolve_entities(session)
+        assert resolve_entities(session)['changed'] == 0
+    assert stats['changed'] == 1
+    assert assignments(connector) == {2: 1, 3: 1}
@@ -0,0 +1,85 @@
+import pytest
+from sqlalchemy import event
+from database.db_connector import DatabaseConnector
+from database.facets import FacetIndex, passenger_band, wheelchair_value
+from database.models import Base, Bus
+from database.enums import USRegion
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def connector(tmp_path):
+    connector = DatabaseConnector(f"sqlite:///{tmp_path / 'buses.db'}")
+    Base.metadata.create_all(connector.engine)
+    with connector.get_session() as session:
+        for i in range(40):
+            session.add(Bus(title=f"Bus {i}", make='Thomas' if i % 2 else 'Blue Bird', year=str(2018 + i % 3),
+                            us_region=USRegion.MIDWEST if i < 10 else USRegion.WEST,
+                            wheelchair='Yes' if i % 4 == 0 else 'No', passengers=f"{10 + i} passengers"))
+    yield connector
+    connector.close()
+
+@pytest.fixture
+def index(connector):
+    index = FacetIndex(connector, revision_poll=60, clock=FakeClock())
+    yield index
+    index.close()
+
+@pytest.fixture
+def queries(connector):
+    statements = []
+    event.listen(connector.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    return statements
+
+def test_value_normalization():
+    assert passenger_band('24 + 2 WC') == '16-24'
+    assert passenger_band('Up to 37') == '37+'
+    assert passenger_band('N/A') == 'unknown'
+    assert wheelchair_value('True') == wheelchair_value('2 positions') == 'yes'
+    assert wheelchair_value('False') == wheelchair_value('') == 'no'
+
+def test_combined_filters_and_counts(index, queries):
+    counts = index.counts()
+    assert counts['make'] == {'Blue Bird': 20, 'Thomas': 20}
+    assert counts['region'] == {'MIDWEST': 10, 'WEST': 30}
+    assert counts['passengers'] == {'1-15': 6, '16-24': 9, '25-36': 12, '37+': 13}
+
+    queries.clear()
+    counts = index.counts({'make': ['Thomas'], 'wheelchair': ['yes']})
+    assert queries == []
+    # Odd buses are Thomas and never a multiple of four
+    assert counts['wheelchair'] == {'no': 20}
+    assert counts['make'] == {'Blue Bird': 10}
+    assert counts['year'] == {}
+
+    counts = index.counts({'passengers': ['1-15', '16-24'], 'region': ['MIDWEST']})
+    assert counts['make'] == {'Blue Bird': 5, 'Thomas': 5}
+    assert index.matching_ids({'region': ['MIDWEST'], 'make': ['Thomas']}, ids=[1, 2, 4, 30]) == [2, 4]
+
+def test_index_follows_commits(index, connector):
+    assert index.counts()['make']['Thomas'] == 20
+    with connector.get_session() as session:
+        bus = session.get(Bus, 2)
+        bus.make = 'Collins'
+        session.add(Bus(title='New', make='Collins', passengers='72'))
+        session.delete(session.get(Bus, 4))
+
+    counts = index.counts()
+    assert counts['make'] == {'Blue Bird': 20, 'Thomas': 18, 'Collins': 2}
+    assert counts['passengers']['37+'] == 14
+    assert len(index) == 40
+
+def test_rebuilds_after_changes_from_other_processes(index, connector):
+    index.counts()
+    index.close()  # stands in for a commit made by another process
+    with connector.get_session() as session:
+        session.add(Bus(title='New', make='Collins'))
+
+    assert 'Collins' not in index.counts()['make']
+    index.clock.now += 60
+    assert index.counts()['make']['Collins'] == 1
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+import pytest
+from database.db_connector import DatabaseConnector
+from database.models import Base, Bus, BusHistory
+from database.history import bus_as_of, field_as_of, price_drops, month_of
+from database.processor import DataProcessor
+
+def listing(**extra):
+    return {'title': '2019 Blue Bird Vision', 'year': '2019', 'make': 'Blue Bird', 'model': 'Vision',
+            'source_url': 'https://dealer-a.example/1', **extra}
+
+@pytest.fixture
+def connector(tmp_path):
+    connector = DatabaseConnector(f"sqlite:///{tmp_path / 'buses.db'}")
+    Base.metadata.create_all(connector.engine)
+    yield connector
+    connector.close()
+
+def history(connector):
+    with connector.engine.connect() as connection:
+        statement = BusHistory.__table__.select().order_by(BusHistory.id)
+        return [row._asdict() for row in connection.execute(statement)]
+
+def test_records_only_changed_fields_per_run(connector):
+    bus = DataProcessor(connector, run_id='run-1').save_bus_data(listing(price='$60,000', mileage='80,000'))
+    created = history(connector)
+    assert {row['field'] for row in created} >= {'title', 'price', 'mileage', 'source_url'}
+    assert all(row['run_id'] == 'run-1' and row['old_value'] is None for row in created)
+    assert created[0]['month'] == month_of(created[0]['changed_at'])
+
+    DataProcessor(connector, run_id='run-2').save_bus_data(listing(price='$55,000', mileage='80,000'))
+    DataProcessor(connector, run_id='run-3').save_bus_data(listing(price='$55,000', mileage='80,000'))
+    changes = history(connector)[len(created):]
+    assert [(row['field'], row['old_value'], row['value'], row['run_id']) for row in changes] == \
+        [('price', '$60,000', '$55,000', 'run-2')]
+    assert bus.id == changes[0]['bus_id']
+
+def test_point_in_time_queries(connector):
+    processor = DataProcessor(connector)
+    bus = processor.save_bus_data(listing(price='$60,000'))
+    between = datetime.utcnow()
+    processor.save_bus_data(listing(price='$52,500'))
+
+    with connector.engine.connect() as connection:
+        assert bus_as_of(connection, bus.id, between - timedelta(days=1)) is None
+        assert bus_as_of(connection, bus.id, between)['price'] == '$60,000'
+        assert bus_as_of(connection, bus.id, datetime.utcnow())['price'] == '$52,500'
+        assert field_as_of(connection, 'price', between) == {bus.id: '$60,000'}
+        drops = price_drops(connection, between - timedelta(days=40))
+    assert [(drop['bus_id'], drop['drop']) for drop in drops] == [(bus.id, 7500.0)]
+
+def test_rolled_back_savepoints_leave_no_history(connector):
+    with connector.unit_of_work() as session:
+        kept = Bus(title='Kept', price='$10,000')
+        session.add(kept)
+        savepoint = session.begin_nested()
+        session.add(Bus(title='Rolled back'))
+        kept.price = '$9,000'
+        session.flush()
+        savepoint.rollback()
+        kept_id = kept.id
+    rows = history(connector)
+    assert {row['bus_id'] for row in rows} == {kept_id}
+    assert [row['value'] for row in rows if row['field'] == 'price'] == ['$10,000']
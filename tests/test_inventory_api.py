@@ -0,0 +1,170 @@
+import json
+import threading
+from urllib.request import Request, urlopen
+from urllib.error import HTTPError
+import pytest
+from sqlalchemy import event
+from database.changes import revision
+from database.db_connector import DatabaseConnector
+from database.processor import DataProcessor
+from scripts.inventory_api import InventoryAPI, make_handler
+from utils.cache import TTLCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def listing(title, **extra):
+    return {'title': title, 'year': '2020', 'make': 'Blue Bird', 'model': 'Vision',
+            'source_url': f"https://example.com/{title}", 'images': [{'url': f"https://example.com/{title}.jpg"}],
+            **extra}
+
+@pytest.fixture
+def connector(tmp_path):
+    connector = DatabaseConnector(f"sqlite:///{tmp_path / 'buses.db'}")
+    connector.create_tables()
+    DataProcessor(connector).save_multiple_buses([
+        listing('Wheelchair Activity Bus', features='Braun wheelchair lift', source='daimler'),
+        listing('Route Bus', make='Thomas', year='2018', source='ross'),
+        listing('Shuttle', make='Thomas', features='Ricon wheelchair lift', source='ross')
+    ])
+    yield connector
+    connector.close()
+
+@pytest.fixture
+def api(connector):
+    api = InventoryAPI(connector, revision_poll=60, clock=FakeClock())
+    yield api
+    api.close()
+
+@pytest.fixture
+def queries(connector):
+    statements = []
+    event.listen(connector.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    return statements
+
+def get_json(api, target):
+    status, _, body = api.get(target)
+    assert status == 200
+    return json.loads(body)
+
+def test_cache_evicts_least_recently_used_and_expired_entries():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=2, ttl=10, clock=clock)
+    cache.set('a', 1)
+    cache.set('b', 2, tags=['bus'])
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert cache.get('b') is None and cache.get('a') == 1
+
+    clock.now = 11
+    assert cache.get('a') is None and len(cache) == 1
+    cache.set('d', 4, tags=['bus'])
+    assert cache.invalidate('bus') == 1 and cache.get('d') is None
+
+def test_listing_filters_search_and_detail(api):
+    page = get_json(api, '/buses?make=Thomas&limit=1')
+    assert [bus['title'] for bus in page['items']] == ['Route Bus']
+    assert page['items'][0]['image'] == 'https://example.com/Route Bus.jpg'
+    page = get_json(api, f"/buses?make=Thomas&limit=1&after={page['next']}")
+    assert [bus['title'] for bus in page['items']] == ['Shuttle']
+    assert get_json(api, f"/buses?make=Thomas&limit=1&after={page['next']}") == {'items': [], 'next': None}
+
+    found = get_json(api, '/buses?q=wheelchair+lift&make=Thomas')
+    assert [bus['title'] for bus in found['items']] == ['Shuttle'] and found['total'] == 1
+
+    detail = get_json(api, f"/buses/{found['items'][0]['id']}")
+    assert detail['overview']['features'] == 'Ricon wheelchair lift'
+    assert [image['url'] for image in detail['images']] == ['https://example.com/Shuttle.jpg']
+
+    assert get_json(api, '/facets')['make'] == {'Blue Bird': 1, 'Thomas': 2}
+    assert get_json(api, '/facets?q=wheelchair')['source'] == {'daimler': 1, 'ross': 1}
+
+    assert api.get('/buses/999')[0] == 404
+    assert api.get('/buses?region=atlantis')[0] == 400
+
+def test_hot_pages_are_served_from_memory_with_etags(api, queries):
+    status, headers, body = api.get('/buses?make=Thomas')
+    count = len(queries)
+    assert api.get('/buses?make=Thomas') == (status, headers, body)
+    assert len(queries) == count
+
+    status, _, body = api.get('/buses?make=Thomas', if_none_match=headers['ETag'])
+    assert status == 304 and body == b''
+
+def test_commits_invalidate_cached_responses(api, connector):
+    before = get_json(api, '/buses?make=Thomas')
+    detail = get_json(api, f"/buses/{before['items'][0]['id']}")
+    DataProcessor(connector).save_bus_data(listing('Route Bus', make='Thomas', price='$40,000'))
+
+    after = get_json(api, '/buses?make=Thomas')
+    assert after['items'][0]['price'] == '$40,000'
+    assert get_json(api, f"/buses/{detail['id']}")['price'] == '$40,000'
+
+def test_changes_from_other_processes_clear_the_cache(api, connector):
+    get_json(api, '/facets')
+    api.close()  # stands in for a commit made by another process
+    with connector.engine.connect() as connection:
+        start = revision(connection)
+    DataProcessor(connector).save_bus_data(listing('Coach', make='MCI'))
+    with connector.engine.connect() as connection:
+        assert revision(connection) == start + 1
+
+    assert 'MCI' not in get_json(api, '/facets')['make']
+    api.clock.now += 60
+    assert get_json(api, '/facets')['make']['MCI'] == 1
+
+def test_http_server(api):
+    from http.server import ThreadingHTTPServer
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(api))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/buses?make=Thomas"
+        with urlopen(url) as response:
+            etag = response.headers['ETag']
+            assert len(json.loads(response.read())['items']) == 2
+        with pytest.raises(HTTPError) as error:
+            urlopen(Request(url, headers={'If-None-Match': etag}))
+        assert error.value.code == 304
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_capped_searches_report_every_match(api, monkeypatch):
+    monkeypatch.setattr('scripts.inventory_api.SEARCH_MAX_RESULTS', 1)
+    found = get_json(api, '/buses?q=wheelchair+lift')
+    assert len(found['items']) == 1 and found['next'] is None
+    assert found['total'] == 2 and found['truncated']
+    assert get_json(api, '/facets?q=wheelchair')['source'] == {'daimler': 1, 'ross': 1}
+    assert get_json(api, '/buses?q=wheelchair+lift&make=Thomas')['total'] == 1
+
+def test_responses_filled_during_a_commit_are_not_cached(api, connector):
+    route = api.route
+
+    def route_then_commit(path, params):
+        payload = route(path, params)
+        # Lands after the response was read, before it is stored
+        DataProcessor(connector).save_bus_data(listing('Route Bus', make='Thomas', price='$40,000'))
+        return payload
+
+    api.route = route_then_commit
+    stale = get_json(api, '/buses?make=Thomas')
+    api.route = route
+    assert stale['items'][0]['price'] != '$40,000'
+    assert get_json(api, '/buses?make=Thomas')['items'][0]['price'] == '$40,000'
+
+def test_a_request_reads_the_revision_at_most_once(api, queries):
+    get_json(api, '/buses?make=Thomas')
+    assert sum('inventory_rollups' in statement for statement in queries) == 1
+    del queries[:]
+    # A cache miss within the poll interval reads no revision at all
+    get_json(api, '/buses?make=Blue+Bird')
+    assert not any('inventory_rollups' in statement for statement in queries)
+
+def test_negative_search_cursors_are_rejected(api):
+    status, _, body = api.get('/buses?q=wheelchair&after=-1')
+    assert status == 400 and b'after' in body
@@ -0,0 +1,51 @@
+import pytest
+from database.db_connector import DatabaseConnector
+from database.enums import USRegion
+from database.models import Base, Bus
+from database.rollups import rollup_stats
+from scripts.backfill_regions import backfill_regions
+from utils.locations import resolve_location, resolve_region
+
+@pytest.mark.parametrize('location, state, region', [
+    ('Charleston, West Virginia', 'WV', USRegion.SOUTHEAST),
+    ('Richmond, Virginia', 'VA', USRegion.SOUTHEAST),
+    ('Dallas, TX', 'TX', USRegion.SOUTHWEST),
+    ('phoenix', 'AZ', USRegion.SOUTHWEST),
+    ('Kansas City, KS', 'KS', USRegion.MIDWEST),
+    ('Indiana, PA', 'PA', USRegion.NORTHEAST),
+    ('Washington, DC', 'DC', USRegion.NORTHEAST),
+    ('Tacoma, Washington', 'WA', USRegion.WEST),
+    ('portland, me', 'ME', USRegion.NORTHEAST),
+    ('Located in Portland', 'OR', USRegion.WEST),
+    ('Toronto, ON', None, USRegion.OTHER),
+    ('', None, USRegion.OTHER),
+    (None, None, USRegion.OTHER)
+])
+def test_resolve_location(location, state, region):
+    assert resolve_location(location) == (state, region)
+
+def test_backfill_moves_buses_to_their_region(tmp_path):
+    connector = DatabaseConnector(f"sqlite:///{tmp_path / 'buses.db'}")
+    Base.metadata.create_all(connector.engine)
+    with connector.get_session() as session:
+        session.add_all([
+            Bus(title='A', location='Huntington, West Virginia', us_region=USRegion.OTHER),
+            Bus(title='B', location='Austin, TX', us_region=USRegion.OTHER),
+            Bus(title='C', location='Chicago, IL', us_region=USRegion.MIDWEST),
+            Bus(title='D'),
+            # A region set by the scraper wins over the location
+            Bus(title='E', location='Dallas, TX', us_region=USRegion.WEST),
+            # Nothing to resolve the region from
+            Bus(title='F', location='Toronto, ON')
+        ])
+
+    assert backfill_regions(connector, dry_run=True) == {'SOUTHEAST': 1, 'SOUTHWEST': 1}
+    assert backfill_regions(connector) == {'SOUTHEAST': 1, 'SOUTHWEST': 1}
+    assert backfill_regions(connector) == {}
+    with connector.get_session() as session:
+        assert resolve_region('Austin, TX') == session.query(Bus).filter_by(title='B').one().us_region
+        assert session.query(Bus).filter_by(title='E').one().us_region == USRegion.WEST
+        assert session.query(Bus).filter_by(title='F').one().us_region == USRegion.OTHER
+        assert rollup_stats(session)['by_region'] == {'SOUTHEAST': 1, 'SOUTHWEST': 1, 'MIDWEST': 1, 'WEST': 1,
+                                                      'OTHER': 2}
+    connector.close()
@@ -0,0 +1,48 @@
+import json
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database.models import Base, Bus
+import main
+
+def test_subcommands_share_common_flags():
+    parser = main.build_parser()
+    for command in ('scrape', 'load', 'verify', 'bench'):
+        args = parser.parse_args([command, '--concurrency', '3', '--cache-dir', 'cache', '--batch-size', '50'])
+        assert (args.workers, args.cache_dir, args.batch_size) == (3, 'cache', 50)
+        assert args.handler is getattr(main, f'cmd_{command}')
+
+def test_scrape_rejects_unknown_source():
+    with pytest.raises(SystemExit):
+        main.build_parser().parse_args(['scrape', '--source', 'nowhere'])
+
+def test_load_without_snapshots_fails(tmp_path):
+    assert main.main(['load', '--cache-dir', str(tmp_path)]) == 1
+
+def test_profile_runs_the_wrapped_subcommand(tmp_path, capsys):
+    output = tmp_path / 'bench.prof'
+    status = main.main(['profile', '--output', str(output), '--limit', '5',
+                        'bench', 'utils.snapshot_diff', '--repeat', '1', '--format', 'json'])
+    assert status == 0
+    assert output.exists()
+    assert '"module": "utils.snapshot_diff"' in capsys.readouterr().out
+
+def test_verify_stats_are_comparable():
+    from scripts.verify_data import collect_stats
+
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        Bus(title='A', vin='VIN1', year='2019', make='Blue Bird', source='Ross'),
+        Bus(title='B', vin='VIN1', year='2020', make='Thomas', source='Ross'),
+        Bus(title='C', vin='VIN2', year='2020', make='Thomas', source='Daimler')
+    ])
+    session.commit()
+
+    stats = collect_stats(session)
+    assert stats['total'] == 3
+    assert stats['by_source'] == {'Daimler': 1, 'Ross': 2}
+    assert stats['by_year'] == {'2019': 1, '2020': 2}
+    assert stats['duplicate_vins'] == {'VIN1': 2}
+    json.dumps(stats)
@@ -0,0 +1,71 @@
+import pytest
+from database.db_connector import DatabaseConnector
+from database.models import Base, Bus, BusLSHBucket, BusSignature
+from database.near_duplicates import signature, similarity, near_duplicate_pairs, update_signatures
+from database.processor import DataProcessor
+
+DESCRIPTION = ("Clean one owner activity bus with Cummins ISB engine, Allison transmission, rear air, "
+               "Braun wheelchair lift with two securement positions, 24 forward facing seats and "
+               "luggage compartment. Serviced every year and ready to go.")
+
+def listing(title, description=DESCRIPTION, **extra):
+    return {'title': title, 'year': '2019', 'make': 'Blue Bird', 'model': 'Vision', 'description': description,
+            'specs': 'Engine: Cummins ISB; Transmission: Allison 2500', **extra}
+
+@pytest.fixture
+def connector(tmp_path):
+    connector = DatabaseConnector(f"sqlite:///{tmp_path / 'buses.db'}")
+    Base.metadata.create_all(connector.engine)
+    yield connector
+    connector.close()
+
+def test_signatures_estimate_text_similarity():
+    original = signature('2019 Blue Bird Vision Activity Bus', DESCRIPTION)
+    edited = signature('2019 Blue Bird Vision Activity Bus!!', DESCRIPTION.replace('ready to go', 'ready to go today'))
+    other = signature('2012 Thomas Saf-T-Liner HDX', 'Rear engine transit style school bus seating 84 students.')
+    assert similarity(original, signature('2019 blue bird VISION activity bus', DESCRIPTION)) == 1.0
+    assert similarity(original, edited) > 0.8
+    assert similarity(original, other) < 0.2
+    assert signature('', None) is None
+
+def test_commits_keep_signatures_and_pairs_up_to_date(connector):
+    processor = DataProcessor(connector, near_duplicates=False)
+    processor.save_multiple_buses([
+        listing('2019 Blue Bird Vision Activity Bus', source_url='https://dealer-a.example/1'),
+        listing('2019 Blue Bird Vision ACTIVITY BUS!', source_url='https://dealer-b.example/7',
+                description=DESCRIPTION.replace('ready to go', 'ready to go today')),
+        listing('2012 Thomas Saf-T-Liner HDX', description='Rear engine transit style school bus seating 84.',
+                specs=None, source_url='https://dealer-a.example/2')
+    ])
+    with connector.engine.connect() as connection:
+        pairs = near_duplicate_pairs(connection)
+        assert [(first, second) for first, second, _ in pairs] == [(1, 2)]
+        assert connection.execute(BusLSHBucket.__table__.select()).all()
+
+    with connector.get_session() as session:
+        session.delete(session.get(Bus, 2))
+    with connector.engine.connect() as connection:
+        assert near_duplicate_pairs(connection) == []
+        assert connection.execute(BusSignature.__table__.select().where(BusSignature.bus_id == 2)).all() == []
+
+def test_processor_updates_reposts_instead_of_inserting(connector):
+    processor = DataProcessor(connector, near_duplicates=True)
+    first = processor.save_bus_data(listing('2019 Blue Bird Vision Activity Bus', price='$60,000',
+                                            source_url='https://dealer-a.example/1'))
+    repost = processor.save_bus_data(listing('2019 Blue Bird Vision Activity Bus.', price='$55,000',
+                                             source_url='https://dealer-a.example/99'))
+    assert repost.id == first.id
+
+    # Once the bus has a VIN, a different VIN is a different bus however alike the texts are
+    processor.save_bus_data(listing('2019 Blue Bird Vision Activity Bus', vin='1BAKFCPH5KF000001',
+                                    source_url='https://dealer-a.example/99'))
+    other = processor.save_bus_data(listing('2019 Blue Bird Vision Activity Bus!', vin='1BAKFCPH5KF000002',
+                                            source_url='https://dealer-a.example/101'))
+    assert other.id != first.id
+
+def test_rebuild_signs_existing_buses(connector):
+    with connector.engine.begin() as connection:
+        connection.execute(Bus.__table__.insert(), [{'title': 'Bus A', 'description': DESCRIPTION},
+                                                    {'title': 'Bus B', 'description': DESCRIPTION}])
+        assert update_signatures(connection) == 2
+        assert [(first, second) for first, second, _ in near_duplicate_pairs(connection)] == [(1, 2)]
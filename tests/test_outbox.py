@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta
+
+import pytest
+from database.db_connector import DatabaseConnector
+from database.models import Base, Bus, OutboxEvent
+from database.outbox import OutboxReader, prune_outbox
+from database.processor import DataProcessor
+
+def listing(**extra):
+    return {'title': '2019 Blue Bird Vision', 'year': '2019', 'make': 'Blue Bird', 'model': 'Vision',
+            'source_url': 'https://dealer-a.example/1', **extra}
+
+@pytest.fixture
+def connector(tmp_path):
+    connector = DatabaseConnector(f"sqlite:///{tmp_path / 'buses.db'}")
+    Base.metadata.create_all(connector.engine)
+    yield connector
+    connector.close()
+
+def summary(events):
+    return [(event['entity'], event['op'], event['fields']) for event in events]
+
+def test_ingest_writes_compact_events(connector):
+    processor = DataProcessor(connector)
+    bus = processor.save_bus_data(listing(price='$60,000', specs='Cummins ISB',
+                                          images=[{'url': 'https://dealer-a.example/1.jpg'}]))
+    reader = OutboxReader(connector, 'search')
+    assert sorted(summary(reader.read())) == [('bus', 'insert', None), ('image', 'insert', None),
+                                             ('overview', 'insert', None)]
+    assert {event['bus_id'] for event in reader.read()} == {bus.id}
+    reader.commit(reader.read()[-1]['id'])
+
+    processor.save_bus_data(listing(price='$55,000', mileage='80,000'))
+    processor.save_bus_data(listing(price='$55,000', mileage='80,000'))
+    assert summary(reader.read()) == [('bus', 'update', ['mileage', 'price'])]
+
+    with connector.get_session() as session:
+        session.delete(session.get(Bus, bus.id))
+    assert sorted(summary(reader.read())[1:]) == [('bus', 'delete', None), ('image', 'delete', None)]
+
+def test_readers_resume_from_their_checkpoint(connector):
+    processor = DataProcessor(connector)
+    for i in range(5):
+        processor.save_bus_data(listing(source_url=f'https://dealer-a.example/{i}', title=f'Bus {i}'))
+
+    reader = OutboxReader(connector, 'alerts', batch_size=2)
+    batches = reader.batches(poll_interval=0)
+    assert [event['row_id'] for event in next(batches)] == [1, 2]
+    assert [event['row_id'] for event in next(batches)] == [3, 4]
+
+    # Only the batches asked past are checkpointed
+    restarted = OutboxReader(connector, 'alerts')
+    assert [event['row_id'] for event in restarted] == [3, 4, 5]
+    assert [event['row_id'] for event in OutboxReader(connector, 'alerts')] == []
+    assert [event['row_id'] for event in OutboxReader(connector, 'cache')][-1] == 5
+
+    with connector.engine.begin() as connection:
+        assert prune_outbox(connection, timedelta(0)) == 5
+        assert connection.execute(OutboxEvent.__table__.select()).all() == []
+
+def test_rolled_back_changes_have_no_events(connector):
+    with connector.unit_of_work() as session:
+        session.add(Bus(title='Kept'))
+        savepoint = session.begin_nested()
+        session.add(Bus(title='Rolled back'))
+        session.flush()
+        savepoint.rollback()
+        session.add(Bus(title='Added later'))
+
+    assert [(event['id'], event['row_id']) for event in OutboxReader(connector, 'search')] == [(1, 1), (2, 2)]
+
+def test_readers_wait_for_recent_gaps(connector):
+    # Event 2 may still be committed by a slower writer
+    with connector.engine.begin() as connection:
+        connection.execute(OutboxEvent.__table__.insert(), [
+            {'id': 1, 'entity': 'bus', 'op': 'insert', 'bus_id': 1, 'row_id': 1, 'created_at': datetime.utcnow()},
+            {'id': 3, 'entity': 'bus', 'op': 'insert', 'bus_id': 3, 'row_id': 3, 'created_at': datetime.utcnow()}
+        ])
+    assert [event['id'] for event in OutboxReader(connector, 'search')] == [1]
+    assert [event['id'] for event in OutboxReader(connector, 'cache', settle_seconds=0)] == [1, 3]
+
+def test_gaps_are_timed_from_when_the_reader_first_sees_them(connector):
+    # Event 3 was flushed long ago by a batch that committed first; event 2
+    # belongs to a batch still open
+    long_ago = datetime.utcnow() - timedelta(hours=1)
+    event = {'entity': 'bus', 'op': 'insert', 'created_at': long_ago}
+    with connector.engine.begin() as connection:
+        connection.execute(OutboxEvent.__table__.insert(), [
+            {**event, 'id': 1, 'bus_id': 1, 'row_id': 1}, {**event, 'id': 3, 'bus_id': 3, 'row_id': 3}
+        ])
+    clock = iter([0.0, 30.0, 100.0]).__next__
+    reader = OutboxReader(connector, 'search', settle_seconds=60, clock=clock)
+    assert [event['id'] for event in reader.read()] == [1]
+    reader.commit(1)
+    assert reader.read() == []
+
+    # Still missing a minute after it was first seen: rolled back, skipped
+    assert [event['id'] for event in reader.read()] == [3]
+
+def test_filled_gaps_are_delivered(connector):
+    event = {'entity': 'bus', 'op': 'insert', 'created_at': datetime.utcnow()}
+    with connector.engine.begin() as connection:
+        connection.execute(OutboxEvent.__table__.insert(), [
+            {**event, 'id': 1, 'bus_id': 1, 'row_id': 1}, {**event, 'id': 3, 'bus_id': 3, 'row_id': 3}
+        ])
+    reader = OutboxReader(connector, 'search', settle_seconds=60, clock=lambda: 0.0)
+    assert [event['id'] for event in reader.read()] == [1]
+    with connector.engine.begin() as connection:
+        connection.execute(OutboxEvent.__table__.insert(), [{**event, 'id': 2, 'bus_id': 2, 'row_id': 2}])
+    assert [event['id'] for event in reader.read()] == [1, 2, 3]
+
+def test_gaps_of_one_read_settle_together(connector):
+    # Two rolled back savepoints left ids 2 and 4 unused
+    event = {'entity': 'bus', 'op': 'insert', 'created_at': datetime.utcnow()}
+    with connector.engine.begin() as connection:
+        connection.execute(OutboxEvent.__table__.insert(), [
+            {**event, 'id': id, 'bus_id': id, 'row_id': id} for id in (1, 3, 5)
+        ])
+    clock = iter([0.0, 61.0]).__next__
+    reader = OutboxReader(connector, 'search', settle_seconds=60, clock=clock)
+    assert [event['id'] for event in reader.read()] == [1]
+    # One settle period later both gaps are skipped, not only the first
+    assert [event['id'] for event in reader.read()] == [1, 3, 5]
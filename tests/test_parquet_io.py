@@ -0,0 +1,88 @@
+import json
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database.models import Base, Bus, BusOverview, BusImage, USRegion
+
+pytest.importorskip('pyarrow')
+
+from database import parquet_io
+
+@pytest.fixture
+def session():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    for i, source in enumerate(['Daimler', 'Ross', 'Daimler']):
+        bus = Bus(title=f'Bus {i}', year='2020', make='Blue Bird', model='Vision',
+                  source=source, us_region=USRegion.WEST)
+        session.add(bus)
+        session.flush()
+        session.add(BusOverview(bus_id=bus.id, mdesc=f'Description {i}'))
+        session.add_all([
+            BusImage(bus_id=bus.id, name='rear', url=f'https://example.com/{i}/1.jpg', image_index=1),
+            BusImage(bus_id=bus.id, name='front', url=f'https://example.com/{i}/0.jpg', image_index=0)
+        ])
+    session.commit()
+    yield session
+    session.close()
+
+class RecordingProcessor:
+    def __init__(self):
+        self.saved = []
+
+    def save_multiple_buses(self, data_list):
+        self.saved.extend(data_list)
+        return data_list
+
+def test_export_tables_round_trip(tmp_path, session):
+    paths = parquet_io.export_tables(tmp_path, session)
+    assert set(paths) == {'buses', 'buses_overview', 'buses_images'}
+
+    processor = RecordingProcessor()
+    assert parquet_io.load_parquet(tmp_path, processor, filters=[('source', '=', 'Daimler')]) == 2
+
+    titles = [listing['title'] for listing in processor.saved]
+    assert titles == ['Bus 0', 'Bus 2']
+    first = processor.saved[0]
+    assert first['us_region'] == 'WEST'
+    assert first['mdesc'] == 'Description 0'
+    assert [img['name'] for img in first['images']] == ['front', 'rear']
+    assert 'id' not in first
+
+def test_export_snapshot_round_trip(tmp_path):
+    listings = [{
+        'title': '2023 Mercedes Benz Tourrider',
+        'year': 2023,
+        'sold': True,
+        'unit_number': '91620',
+        'specifications': {'Engine': 'Mercedes'},
+        'images': [{'url': 'https://example.com/1.jpg', 'name': 'image_0'}]
+    }]
+    snapshot = tmp_path / 'daimlerscraper_20250101_000000.json'
+    snapshot.write_text(json.dumps(listings), encoding='utf-8')
+
+    assert parquet_io.export_snapshot(snapshot, tmp_path / 'listings.parquet') == 1
+
+    (batch,) = list(parquet_io.iter_listings(tmp_path / 'listings.parquet'))
+    assert batch == [{
+        'title': '2023 Mercedes Benz Tourrider',
+        'year': '2023',
+        'sold': True,
+        'unit_number': '91620',
+        'specifications': {'Engine': 'Mercedes'},
+        'images': [{'url': 'https://example.com/1.jpg', 'name': 'image_0'}]
+    }]
+
+def test_command_line_filters_use_column_types(tmp_path, session):
+    parquet_io.export_tables(tmp_path, session)
+    filters = [parquet_io._parse_filter(expression) for expression in ['id>=2', 'created_at>2000-01-01', 'source=Daimler']]
+    assert filters[0] == ('id', '>=', '2')
+
+    processor = RecordingProcessor()
+    # Compared as numbers, although '10' sorts before '2' as text
+    assert parquet_io.load_parquet(tmp_path, processor, filters=filters + [('id', '<', '10')]) == 1
+    assert [listing['title'] for listing in processor.saved] == ['Bus 2']
+
+    with pytest.raises(ValueError):
+        parquet_io.load_parquet(tmp_path, RecordingProcessor(), filters=[('id', '=', 'two')])
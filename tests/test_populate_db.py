@@ -0,0 +1,87 @@
+import json
+
+import pytest
+from sqlalchemy import select, func
+from database.db_connector import DatabaseConnector
+from database.models import Base, Bus, IngestRun
+from database.populate_db import plan_load_tasks, group_load_tasks, populate_from_snapshots, _read_task, \
+    _read_keyed_task
+from utils.snapshot import SnapshotWriter
+
+def listing(number, source='Ross', **extra):
+    return {'title': f'Bus {number}', 'year': '2019', 'make': 'Blue Bird', 'model': 'Vision',
+            'source_url': f'https://{source.lower()}.example/{number}', **extra}
+
+def write_snapshot(path, listings):
+    with SnapshotWriter(str(path)) as writer:
+        for item in listings:
+            writer.write(item)
+    return str(path)
+
+@pytest.fixture
+def connector(tmp_path, monkeypatch):
+    # Loader workers build their own connectors from DATABASE_URL
+    url = f"sqlite:///{tmp_path / 'buses.db'}"
+    monkeypatch.setenv('DATABASE_URL', url)
+    connector = DatabaseConnector(url)
+    Base.metadata.create_all(connector.engine)
+    yield connector
+    connector.close()
+
+def test_indexed_snapshots_are_split_into_chunks(tmp_path):
+    indexed = write_snapshot(tmp_path / 'rossscraper_20260101_000000.jsonl', [listing(i) for i in range(5)])
+    plain = tmp_path / 'daimlerscraper_20260101_000000.json'
+    plain.write_text(json.dumps([listing(1, 'Daimler')]))
+
+    assert plan_load_tasks([indexed, str(plain)], chunk_size=2) == [
+        (indexed, 0, 2), (indexed, 2, 4), (indexed, 4, 5), (str(plain), None, None)
+    ]
+
+def test_read_task_unwraps_change_sets(tmp_path):
+    snapshot = write_snapshot(tmp_path / 'rossscraper_20260101_000000.jsonl', [listing(1), listing(2)])
+    listings, full = _read_task((snapshot, 1, 2))
+    assert full and [item['title'] for item in listings] == ['Bus 2']
+    assert listings[0]['source'] == 'Ross' and listings[0]['scraped']
+
+    changes = write_snapshot(tmp_path / 'rossscraper_changes.jsonl', [
+        {'op': 'added', 'key': 'url:a', 'listing': listing(3)},
+        {'op': 'removed', 'key': 'url:b'}
+    ])
+    listings, full = _read_task((changes, None, None))
+    assert not full and [item['title'] for item in listings] == ['Bus 3']
+
+def test_tasks_sharing_a_bus_are_grouped(tmp_path):
+    ross = write_snapshot(tmp_path / 'rossscraper_20260101_000000.jsonl',
+                          [listing(1, vin='1BAKGCPH0KF000001'), listing(2), listing(3)])
+    daimler = write_snapshot(tmp_path / 'daimlerscraper_20260101_000000.jsonl',
+                             [listing(4, 'Daimler'), listing(5, 'Daimler', vin='1BAKGCPH0KF000001')])
+    tasks = plan_load_tasks([ross, daimler], chunk_size=1)
+
+    groups = group_load_tasks(tasks, [_read_keyed_task(task)[2] for task in tasks])
+    assert [(ross, 0, 1), (daimler, 1, 2)] in groups
+    assert sorted(len(group) for group in groups) == [1, 1, 1, 2]
+
+def test_parallel_load_stores_every_bus_once(tmp_path, connector):
+    shared = [listing(number, vin=f'1BAKGCPH0KF00000{number}') for number in range(1, 5)]
+    ross = write_snapshot(tmp_path / 'rossscraper_20260101_000000.jsonl', shared + [listing(5)])
+    # The same buses listed again by another dealer, plus one of its own
+    daimler = write_snapshot(tmp_path / 'daimlerscraper_20260101_000000.jsonl',
+                             [{**item, 'source_url': f"https://daimler.example/{item['vin']}"} for item in shared]
+                             + [listing(6, 'Daimler')])
+
+    assert populate_from_snapshots([ross, daimler], workers=2, chunk_size=2) == 10
+
+    with connector.engine.connect() as connection:
+        assert connection.execute(select(func.count(Bus.id))).scalar() == 6
+        vins = connection.execute(select(Bus.vin).where(Bus.vin.like('1BAK%'))).scalars().all()
+        assert sorted(vins) == sorted(item['vin'] for item in shared)
+        assert sorted(connection.execute(select(IngestRun.source)).scalars()) == ['Daimler', 'Ross']
+
+def test_chunks_of_rejected_listings_do_not_block_the_run(tmp_path, connector):
+    # The second chunk has no valid listing, yet it committed
+    rejected = [{**listing(number), 'year': None} for number in (3, 4)]
+    ross = write_snapshot(tmp_path / 'rossscraper_20260101_000000.jsonl', [listing(1), listing(2)] + rejected)
+
+    assert populate_from_snapshots([ross], workers=2, chunk_size=2) == 2
+    with connector.engine.connect() as connection:
+        assert connection.execute(select(IngestRun.source)).scalars().all() == ['Ross']
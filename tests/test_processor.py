@@ -162,4 +162,61 @@ def test_save_bus_with_images(processor, sample_bus_data):
         assert images[0].url == sample_bus_data['images'][0]['url']
         assert images[0].name == sample_bus_data['images'][0]['name']
     finally:
-        session.close() 
\ No newline at end of file
+        session.close() 
+def test_validate_batch_matches_validate_bus_data(processor, sample_bus_data):
+    records = [
+        sample_bus_data,
+        {**sample_bus_data, 'vin': 'INVALID'},
+        {**sample_bus_data, 'year': 'abc'},
+        {**sample_bus_data, 'year': 1850, 'make': None},
+        {**sample_bus_data, 'title': 'x' * 300, 'contact_email': 'not-an-email'},
+        {'title': 'Only a title'}
+    ]
+    batch_errors = processor.validate_batch(records)
+    assert batch_errors == [processor.validate_bus_data(record)[1] for record in records]
+    assert batch_errors[0] == []
+    assert batch_errors[1] == ["Invalid VIN format"]
+    assert batch_errors[2] == ["Year must be a valid number"]
+    assert processor.validate_batch([]) == []
+
+def test_validate_batch_parity_on_unusual_values(processor, sample_bus_data):
+    records = [
+        {**sample_bus_data, 'year': 2019.0},
+        {**sample_bus_data, 'year': 2019.5},
+        {**sample_bus_data, 'year': '2019.0'},
+        {**sample_bus_data, 'year': ' 2019 '},
+        {**sample_bus_data, 'year': '9' * 10},
+        {**sample_bus_data, 'year': float('inf')},
+        {**sample_bus_data, 'year': 10 ** 40},
+        {**sample_bus_data, 'year': float('nan')},
+        {**sample_bus_data, 'title': 10 ** 300},
+        {**sample_bus_data, 'title': 'x' * 256, 'vin': 'y' * 10 ** 4}
+    ]
+    batch_errors = processor.validate_batch(records)
+    assert batch_errors == [processor.validate_bus_data(record)[1] for record in records]
+    assert batch_errors[:3] == [[], [], ["Year must be a valid number"]]
+    assert batch_errors[4] == ["Invalid year"]
+    assert batch_errors[7] == ["Missing required field: year"]
+
+def test_save_multiple_buses_validates_the_batch_once(processor, sample_bus_data, monkeypatch):
+    calls = []
+    monkeypatch.setattr(processor, 'validate_bus_data', lambda data: calls.append(data))
+    records = [{**sample_bus_data, 'vin': None, 'title': f'Bus {i}', 'source_url': f'https://example.com/{i}'}
+               for i in range(2)]
+    saved = processor.save_multiple_buses(records + [{**sample_bus_data, 'vin': None, 'year': 'abc'}])
+    assert [bus.title for bus in saved] == ['Bus 0', 'Bus 1']
+    assert calls == []
+
+def test_length_limits_follow_bus_model():
+    from database.processor import FIELD_LENGTH_LIMITS
+    assert FIELD_LENGTH_LIMITS['title'] == Bus.__table__.c.title.type.length
+    assert FIELD_LENGTH_LIMITS['source_url'] == Bus.__table__.c.source_url.type.length
+    assert 'description' not in FIELD_LENGTH_LIMITS
+    assert 'us_region' not in FIELD_LENGTH_LIMITS
+
+def test_validate_batch_accepts_scraped_listings(processor, sample_bus_data):
+    from scrapers.records import ScrapedListing
+    records = [sample_bus_data, {**sample_bus_data, 'vin': 'INVALID'}, {'title': 'Only a title'}]
+    listings = [ScrapedListing.from_dict(record) for record in records]
+    assert processor.validate_batch(listings) == processor.validate_batch(records)
+    assert processor.validate_bus_data(listings[1]) == (False, ["Invalid VIN format"])
@@ -0,0 +1,58 @@
+import json
+import sys
+import pytest
+from database.enums import USRegion
+from scrapers.records import ScrapedListing, ScrapedImage, LISTING_FIELDS
+from utils.snapshot import encode_listing
+
+@pytest.fixture
+def listing():
+    return ScrapedListing(
+        title='2023 Mercedes Benz Tourrider Business',
+        year='2023',
+        vin='WEBS404H3P3291620',
+        unit_number='91620',
+        sold=True,
+        us_region=USRegion.WEST,
+        specs='Air ride suspension',
+        images=[ScrapedImage(url='https://example.com/1.jpg', name='image_0')]
+    )
+
+def test_listing_is_slotted(listing):
+    assert not hasattr(listing, '__dict__')
+    assert not hasattr(listing.images[0], '__dict__')
+    # Same fields held in a dict, as the scrapers used to emit them
+    assert sys.getsizeof(listing) < sys.getsizeof(dict.fromkeys(LISTING_FIELDS)) / 2
+
+def test_dict_access_still_works(listing):
+    assert listing['vin'] == 'WEBS404H3P3291620'
+    assert listing['unit_number'] == '91620'
+    assert listing['specifications'] == 'Air ride suspension'
+    assert listing.get('price') is None
+    assert listing.get('price', 'N/A') == 'N/A'
+    assert 'price' not in listing
+    assert listing['images'][0]['url'] == 'https://example.com/1.jpg'
+
+def test_from_dict_normalises_source_keys():
+    listing = ScrapedListing.from_dict({
+        'url': 'https://www.microbird.com/g5',
+        'capacity': 'Up to 36 passengers',
+        'region': 'SOUTHEAST',
+        'specifications': {'Length': '25 ft'},
+        'images': ['https://example.com/a.jpg'],
+        'scraped_at': '2024-01-01'
+    })
+    assert listing.source_url == 'https://www.microbird.com/g5'
+    assert listing.passengers == 'Up to 36 passengers'
+    assert listing.us_region is USRegion.SOUTHEAST
+    assert listing.specs == {'Length': '25 ft'}
+    assert listing.images == [ScrapedImage(url='https://example.com/a.jpg')]
+    assert listing.extra == {'scraped_at': '2024-01-01'}
+
+def test_round_trip_through_snapshot_encoding(listing):
+    listing['source'] = 'Daimler'
+    encoded = json.loads(encode_listing(listing))
+    assert encoded['source'] == 'Daimler'
+    assert encoded['us_region'] == 'WEST'
+    assert 'price' not in encoded
+    assert ScrapedListing.from_dict(encoded) == listing
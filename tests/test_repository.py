@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.exc import InvalidRequestError
+from database.db_connector import DatabaseConnector
+from database.models import Base, Bus, BusOverview, BusImage
+from database.repository import BusRepository
+
+@pytest.fixture
+def connector(tmp_path):
+    connector = DatabaseConnector(f"sqlite:///{tmp_path / 'buses.db'}")
+    Base.metadata.create_all(connector.engine)
+    start = datetime(2024, 1, 1)
+    with connector.get_session() as session:
+        for i in range(50):
+            bus = Bus(title=f"Bus {i}", make='Blue Bird' if i % 2 else 'Thomas', year='2020',
+                      updated_at=start + timedelta(minutes=i % 10), created_at=start + timedelta(minutes=i))
+            bus.overview = BusOverview(mdesc=f"Description {i}")
+            bus.images = [BusImage(name=f"{i}-{n}", url=f"https://example.com/{i}/{n}", image_index=n) for n in range(3)]
+            session.add(bus)
+    yield connector
+    connector.close()
+
+@pytest.fixture
+def queries(connector):
+    statements = []
+    event.listen(connector.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    return statements
+
+def test_full_inventory_in_a_handful_of_queries(connector, queries):
+    session = connector.session
+    try:
+        seen = []
+        for page in BusRepository(session).iter_pages(page_size=20):
+            for bus in page:
+                seen.append((bus.id, bus.overview.mdesc, len(bus.images)))
+    finally:
+        session.close()
+
+    assert len(seen) == 50 and len({bus_id for bus_id, _, _ in seen}) == 50
+    assert all(count == 3 for _, _, count in seen)
+    # One query for the buses (overview joined) and one for their images, per page
+    assert len(queries) == 6
+
+def test_bare_preset_refuses_lazy_loads(connector):
+    session = connector.session
+    try:
+        bus = BusRepository(session).latest(1, preset='bare')[0]
+        with pytest.raises(InvalidRequestError):
+            bus.images
+    finally:
+        session.close()
+
+def test_keyset_pages_by_updated_at(connector):
+    session = connector.session
+    try:
+        repository = BusRepository(session)
+        first, cursor = repository.page(limit=15, order='updated_at', preset='bare')
+        second, _ = repository.page(limit=100, after=cursor, order='updated_at', preset='bare')
+    finally:
+        session.close()
+
+    ordered = [(bus.updated_at, bus.id) for bus in first + second]
+    assert len(ordered) == 50 and ordered == sorted(ordered)
+    assert cursor == (first[-1].updated_at, first[-1].id)
+
+def test_buses_always_have_an_updated_at(connector):
+    # A NULL would never match the (updated_at, id) > cursor keyset condition
+    with connector.engine.begin() as connection:
+        connection.execute(insert(Bus.__table__).values(title='Defaults'))
+        assert connection.execute(Bus.__table__.select().where(Bus.updated_at.is_(None))).first() is None
+    with pytest.raises(IntegrityError):
+        with connector.engine.begin() as connection:
+            connection.execute(insert(Bus.__table__).values(title='Explicit NULL', updated_at=None))
+
+def test_iter_rows_projects_columns(connector, queries):
+    session = connector.session
+    try:
+        rows = list(BusRepository(session).iter_rows(['title', 'make'], page_size=30, where=[Bus.make == 'Thomas']))
+    finally:
+        session.close()
+
+    assert len(rows) == 25
+    assert rows[0] == {'title': 'Bus 0', 'make': 'Thomas'}
+    assert len(queries) == 1
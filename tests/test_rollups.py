@@ -0,0 +1,107 @@
+import pytest
+from database.db_connector import DatabaseConnector
+from database.enums import USRegion
+from database.models import Base, Bus
+from database.processor import DataProcessor
+from database.rollups import rollup_stats, rebuild_rollups
+from scripts.verify_data import collect_stats
+
+@pytest.fixture
+def connector(tmp_path):
+    connector = DatabaseConnector(f"sqlite:///{tmp_path / 'buses.db'}")
+    Base.metadata.create_all(connector.engine)
+    with connector.get_session() as session:
+        rebuild_rollups(session)
+    yield connector
+    connector.close()
+
+def stats_match(connector):
+    with connector.get_session() as session:
+        fast, exact = rollup_stats(session), collect_stats(session, exact=True)
+    assert fast == exact
+    return fast
+
+def test_inserts_updates_and_deletes_keep_rollups_exact(connector):
+    with connector.get_session() as session:
+        session.add_all([
+            Bus(title='A', vin='VIN1', year='2019', make='Blue Bird', source='Ross', us_region=USRegion.MIDWEST),
+            Bus(title='B', vin='VIN1', year='2020', make='Thomas', source='Ross'),
+            Bus(title='C', vin='VIN2', year='2020', make='Thomas', source='Daimler')
+        ])
+    stats = stats_match(connector)
+    assert stats['total'] == 3
+    assert stats['by_make'] == {'Blue Bird': 1, 'Thomas': 2}
+    assert stats['duplicate_vins'] == {'VIN1': 2}
+
+    with connector.get_session() as session:
+        bus = session.query(Bus).filter_by(title='B').one()
+        bus.vin, bus.make = 'VIN3', 'Blue Bird'
+    stats = stats_match(connector)
+    assert stats['by_make'] == {'Blue Bird': 2, 'Thomas': 1}
+    assert stats['duplicate_vins'] == {}
+
+    with connector.get_session() as session:
+        session.delete(session.query(Bus).filter_by(title='A').one())
+    stats = stats_match(connector)
+    assert stats['total'] == 2
+    assert stats['by_region'] == {'OTHER': 2}
+
+def test_rolled_back_savepoint_leaves_rollups_alone(connector):
+    processor = DataProcessor(connector)
+    process_overview = processor.process_overview_data
+
+    def fail_on_b(bus_id, data):
+        if data.title == 'B':
+            raise ValueError('broken overview')
+        return process_overview(bus_id, data)
+
+    processor.process_overview_data = fail_on_b
+    listings = [{'title': title, 'year': '2021', 'make': 'Micro Bird', 'model': 'G5',
+                 'source_url': title, 'mdesc': 'Description'} for title in 'ABC']
+    assert len(processor.save_multiple_buses(listings)) == 2
+
+    stats = stats_match(connector)
+    assert stats['total'] == 2 and stats['by_make'] == {'Micro Bird': 2}
+
+def test_rollups_are_filled_on_first_read(tmp_path):
+    connector = DatabaseConnector(f"sqlite:///{tmp_path / 'buses.db'}")
+    Base.metadata.create_all(connector.engine)
+    with connector.engine.begin() as conn:
+        conn.execute(Bus.__table__.insert(), [{'title': 'A', 'make': 'Thomas'}, {'title': 'B', 'make': 'Thomas'}])
+    try:
+        assert stats_match(connector)['by_make'] == {'Thomas': 2}
+    finally:
+        connector.close()
+
+def test_existing_buses_are_counted_after_the_first_orm_write(tmp_path):
+    connector = DatabaseConnector(f"sqlite:///{tmp_path / 'buses.db'}")
+    Base.metadata.create_all(connector.engine)
+    with connector.engine.begin() as conn:
+        conn.execute(Bus.__table__.insert(), [{'title': f'Bus {i}', 'make': 'Thomas'} for i in range(100)])
+    try:
+        # The incremental update creates the total row, which must not pass for a filled table
+        with connector.get_session() as session:
+            session.add(Bus(title='New', make='Thomas'))
+        stats = stats_match(connector)
+        assert stats['total'] == 101 and stats['by_make'] == {'Thomas': 101}
+    finally:
+        connector.close()
+
+def test_batch_updates_shared_rows_once(connector, monkeypatch):
+    from database import rollups
+    from database.changes import revision
+
+    applied = []
+    apply_deltas = rollups.apply_deltas
+    monkeypatch.setattr(rollups, 'apply_deltas', lambda conn, deltas: applied.append(deltas) or apply_deltas(conn, deltas))
+    with connector.engine.connect() as conn:
+        before = revision(conn)
+
+    listings = [{'title': title, 'year': '2021', 'make': 'Micro Bird', 'model': 'G5', 'source_url': title}
+                for title in 'ABC']
+    assert len(DataProcessor(connector).save_multiple_buses(listings)) == 3
+
+    assert len(applied) == 1 and applied[0][('total', '')] == 3
+    with connector.engine.connect() as conn:
+        assert revision(conn) == before + 1
+    assert stats_match(connector)['total'] == 3
@@ -0,0 +1,118 @@
+import random
+import pytest
+from scrapers.records import ScrapedListing
+from utils.scheduler import Scheduler
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+def make_scheduler(clock, **kwargs):
+    options = {'jitter': 0.0, 'startup_spread': 0, 'retry_delay': 5}
+    options.update(kwargs)
+    return Scheduler(clock=clock, rng=random.Random(1), **options)
+
+def test_jobs_run_on_their_own_cadence(clock):
+    scheduler = make_scheduler(clock)
+    runs = []
+    scheduler.add('hourly', 3600, lambda: runs.append('hourly'))
+    scheduler.add('daily', 86400, lambda: runs.append('daily'))
+
+    for clock.now in range(0, 86400 + 1, 600):
+        scheduler.run_pending()
+
+    assert runs.count('hourly') == 25
+    assert runs.count('daily') == 2
+    assert scheduler.next_due() == 0 or scheduler.next_due() <= 3600
+
+def test_jitter_stays_within_bounds(clock):
+    scheduler = make_scheduler(clock, jitter=0.1)
+    delays = [scheduler.jittered(1000) for _ in range(1000)]
+    assert all(900 <= delay <= 1100 for delay in delays)
+    assert len(set(delays)) > 1
+
+def test_failed_job_is_retried_sooner(clock):
+    scheduler = make_scheduler(clock)
+    calls = []
+
+    def flaky():
+        calls.append(clock.now)
+        if len(calls) == 1:
+            raise RuntimeError('source down')
+
+    scheduler.add('weekly', 604800, flaky)
+    scheduler.run_pending()
+    assert scheduler.jobs['weekly'].failures == 1
+    assert scheduler.next_due() == 5
+
+    clock.now = 5
+    scheduler.run_pending()
+    assert calls == [0, 5]
+    assert scheduler.jobs['weekly'].last_error is None
+    assert scheduler.next_due() == 604800
+
+def test_run_stops_after_max_cycles(clock):
+    scheduler = make_scheduler(clock)
+    scheduler.add('job', 0, lambda: None)
+    scheduler.run(max_cycles=3)
+    assert scheduler.jobs['job'].runs >= 3
+
+class RossScraper:
+    """Stands in for the real scraper; named alike so snapshots get the same prefix."""
+    listings = []
+
+    def __init__(self):
+        self.resets = 0
+
+    def reset(self):
+        self.resets += 1
+
+    def iter_scrape(self):
+        return iter([ScrapedListing.from_dict(listing) for listing in self.listings])
+
+class RecordingProcessor:
+    def __init__(self, db=None):
+        self.db = db
+        self.saved = []
+
+    def save_multiple_buses(self, data_list, raise_on_error=False):
+        self.saved.extend(data_list)
+        return data_list
+
+def test_refresher_reuses_scraper_and_loads_only_changes(tmp_path, monkeypatch):
+    from scripts import daemon
+
+    from database.db_connector import DatabaseConnector
+    from database.models import Base
+
+    monkeypatch.setattr(daemon, 'get_scraper_class', lambda name: RossScraper)
+    connector = DatabaseConnector(f"sqlite:///{tmp_path / 'buses.db'}")
+    Base.metadata.create_all(connector.engine)
+    processor = RecordingProcessor(connector)
+    refresher = daemon.SourceRefresher('ross', str(tmp_path), processor=processor, batch_size=1)
+    timestamps = iter(['20240101_000000', '20240102_000000'])
+    refresher.timestamp = lambda: next(timestamps)
+
+    RossScraper.listings = [
+        {'title': 'Bus A', 'source_url': 'https://example.com/a', 'price': '$1'},
+        {'title': 'Bus B', 'source_url': 'https://example.com/b', 'price': '$2'}
+    ]
+    assert refresher()['saved'] == 2
+
+    RossScraper.listings = [
+        {'title': 'Bus A', 'source_url': 'https://example.com/a', 'price': '$1'},
+        {'title': 'Bus B', 'source_url': 'https://example.com/b', 'price': '$3'}
+    ]
+    assert refresher()['saved'] == 1
+
+    assert refresher.scraper.resets == 2
+    assert processor.saved[-1]['price'] == '$3'
+    assert all(listing['scraped'] for listing in processor.saved)
+    connector.close()
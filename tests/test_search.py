@@ -0,0 +1,62 @@
+import pytest
+from database.db_connector import DatabaseConnector
+from database.models import Base, Bus, BusOverview
+from database.processor import DataProcessor
+from database.search import create_search_index, search, search_ids
+
+@pytest.fixture
+def connector(tmp_path):
+    connector = DatabaseConnector(f"sqlite:///{tmp_path / 'buses.db'}")
+    connector.create_tables()
+    yield connector
+    connector.close()
+
+def listing(title, **extra):
+    return {'title': title, 'year': '2020', 'make': 'Blue Bird', 'model': 'Vision',
+            'source_url': f"https://example.com/{title}", **extra}
+
+def titles(connector, query):
+    with connector.get_session() as session:
+        return [bus.title for bus, _ in search(session, query)]
+
+def test_ingest_keeps_the_index_in_sync(connector):
+    processor = DataProcessor(connector)
+    processor.save_multiple_buses([
+        listing('Wheelchair Activity Bus', engine='Cummins B6.7', features='Braun wheelchair lift'),
+        listing('Route Bus', engine='Cummins L9', mdesc='Seats 72 students'),
+        listing('Shuttle', engine='Ford V8', features='Ricon wheelchair lifts')
+    ])
+    assert titles(connector, 'wheelchair lift Cummins') == ['Wheelchair Activity Bus']
+    assert set(titles(connector, 'wheelchair lift')) == {'Wheelchair Activity Bus', 'Shuttle'}
+
+    # Updates replace the document, deletes remove it
+    processor.save_bus_data(listing('Route Bus', features='Q\'Straint wheelchair lift'))
+    assert set(titles(connector, 'wheelchair lift cummins')) == {'Wheelchair Activity Bus', 'Route Bus'}
+    with connector.get_session() as session:
+        session.delete(session.query(Bus).filter_by(title='Shuttle').one())
+    assert titles(connector, 'ricon') == []
+
+def test_title_matches_rank_first(connector):
+    with connector.get_session() as session:
+        first = Bus(title='Electric school bus', description='Quiet ride')
+        second = Bus(title='Type C', description='Available as an electric conversion')
+        session.add_all([second, first])
+    with connector.get_session() as session:
+        ranked = [(bus.title, score) for bus, score in search(session, 'electric')]
+    assert [title for title, _ in ranked] == ['Electric school bus', 'Type C']
+    assert ranked[0][1] > ranked[1][1]
+
+def test_existing_buses_are_indexed_on_creation(tmp_path):
+    connector = DatabaseConnector(f"sqlite:///{tmp_path / 'buses.db'}")
+    Base.metadata.create_all(connector.engine)
+    with connector.get_session() as session:
+        bus = Bus(title='Mini bus')
+        bus.overview = BusOverview(specs='{"Engine": "Duramax diesel"}')
+        session.add(bus)
+    try:
+        create_search_index(connector.engine)
+        with connector.engine.connect() as conn:
+            assert len(search_ids(conn, 'duramax')) == 1
+            assert search_ids(conn, '"; DROP TABLE buses; --') == []
+    finally:
+        connector.close()
@@ -0,0 +1,100 @@
+import json
+import pytest
+from utils.snapshot import (
+    SnapshotWriter, iter_snapshot, load_index, read_snapshot_range, snapshot_filename, index_path
+)
+
+@pytest.fixture
+def listings():
+    return [
+        {
+            'title': f'2019 Blue Bird Vision {i}',
+            'vin': f'1BAKGCPA0KF3{i:05d}',
+            'source': 'Ross',
+            'images': [{'url': f'https://example.com/{i}.jpg', 'name': 'image_0'}]
+        }
+        for i in range(25)
+    ]
+
+@pytest.mark.parametrize('compression', [None, 'gzip', 'zstd'])
+def test_write_and_stream_snapshot(tmp_path, listings, compression):
+    if compression == 'zstd':
+        pytest.importorskip('zstandard')
+    path = tmp_path / snapshot_filename('rossscraper', '20250101_000000', 'jsonl', compression)
+
+    with SnapshotWriter(path, compression) as writer:
+        for listing in listings:
+            writer.write(listing)
+
+    assert writer.count == len(listings)
+    assert list(iter_snapshot(path)) == listings
+
+    index = load_index(path)
+    assert index['count'] == len(listings)
+    assert index['compression'] == compression
+    assert read_snapshot_range(path, 10, 13) == listings[10:13]
+    assert read_snapshot_range(path, 20, 100) == listings[20:]
+
+def test_iter_snapshot_reads_legacy_json_arrays(tmp_path, listings):
+    path = tmp_path / 'daimlerscraper_20250101_000000.json'
+    path.write_text(json.dumps(listings, indent=2), encoding='utf-8')
+
+    assert list(iter_snapshot(path)) == listings
+    assert load_index(path) is None
+
+def test_snapshot_filename():
+    assert snapshot_filename('daimlerscraper', '20250101_000000') == 'daimlerscraper_20250101_000000.json'
+    assert snapshot_filename('daimlerscraper', '20250101_000000', 'jsonl', 'gzip') == 'daimlerscraper_20250101_000000.jsonl.gz'
+    assert index_path('a.jsonl.zst') == 'a.jsonl.zst.idx.json'
+    with pytest.raises(ValueError):
+        snapshot_filename('daimlerscraper', '20250101_000000', 'json', 'gzip')
+
+@pytest.mark.parametrize('compression', [None, 'gzip'])
+def test_ranges_span_blocks(tmp_path, listings, compression):
+    path = tmp_path / snapshot_filename('rossscraper', '20250101_000000', 'jsonl', compression)
+    with SnapshotWriter(path, compression, block_size=4) as writer:
+        for listing in listings:
+            writer.write(listing)
+
+    index = load_index(path)
+    assert index['block_size'] == 4 and len(index['blocks']) == 7
+    assert list(iter_snapshot(path)) == listings
+    for start, stop in [(0, 4), (3, 9), (5, 6), (22, 25), (24, 30), (25, 30)]:
+        assert read_snapshot_range(path, start, stop, index) == listings[start:stop]
+
+@pytest.mark.parametrize('compression', ['gzip', 'zstd'])
+def test_blocks_compress_like_the_whole_file(tmp_path, compression):
+    if compression == 'zstd':
+        pytest.importorskip('zstandard')
+    # Dealer listings repeat most of their text from one listing to the next
+    listings = [
+        {'title': f'2019 Blue Bird Vision {i}', 'vin': f'1BAKGCPA0KF3{i:05d}', 'source': 'Ross',
+         'price': f'${40000 + i * 250:,}', 'location': 'Charleston, WV',
+         'description': 'Cummins ISB 6.7L, Allison automatic, 72 passengers, air brakes, '
+                        'rear emergency door, stop arm, LED lights, recently serviced.'}
+        for i in range(1000)
+    ]
+    plain = tmp_path / snapshot_filename('rossscraper', '20250101_000000', 'jsonl')
+    path = tmp_path / snapshot_filename('rossscraper', '20250101_000000', 'jsonl', compression)
+    for target, codec in ((plain, None), (path, compression)):
+        with SnapshotWriter(target, codec) as writer:
+            for listing in listings:
+                writer.write(listing)
+
+    assert path.stat().st_size < plain.stat().st_size / 8
+    assert read_snapshot_range(path, 150, 250) == listings[150:250]
+
+def test_reads_snapshots_indexed_per_listing(tmp_path, listings):
+    import gzip
+    path = tmp_path / 'rossscraper_20250101_000000.jsonl.gz'
+    offsets, position = [], 0
+    with open(path, 'wb') as f:
+        for listing in listings:
+            data = gzip.compress((json.dumps(listing) + '\n').encode())
+            f.write(data)
+            offsets.append((position, len(data)))
+            position += len(data)
+    with open(index_path(str(path)), 'w') as f:
+        json.dump({'format': 'jsonl', 'compression': 'gzip', 'count': len(listings), 'offsets': offsets}, f)
+
+    assert read_snapshot_range(path, 10, 13) == listings[10:13]
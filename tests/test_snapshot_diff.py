@@ -0,0 +1,92 @@
+import json
+import pytest
+from utils.snapshot import SnapshotWriter
+from utils.snapshot_diff import (
+    listing_key, diff_snapshots, write_change_set, iter_upserts, latest_snapshots
+)
+
+def write_json(path, listings):
+    path.write_text(json.dumps(listings), encoding='utf-8')
+    return path
+
+@pytest.fixture
+def old_listings():
+    return [
+        {'vin': 'WEBS404H3P3291620', 'title': 'Tourrider', 'price': '495,000.00', 'mileage': '70470'},
+        {'vin': 'WEBS404H3P3291621', 'title': 'Tourrider', 'price': '480,000.00'},
+        {'source_url': 'https://www.rossbus.com/vision', 'title': 'Vision', 'passengers': '72'}
+    ]
+
+def test_listing_key():
+    assert listing_key({'vin': 'ABC', 'source_url': 'https://x'}) == 'vin:ABC'
+    assert listing_key({'vin': None, 'source_url': 'https://x'}) == 'url:https://x'
+    assert listing_key({'url': 'https://y'}) == 'url:https://y'
+    assert listing_key({'title': 'No key'}) is None
+
+def test_diff_snapshots(tmp_path, old_listings):
+    new_listings = [
+        {'vin': 'WEBS404H3P3291620', 'title': 'Tourrider', 'price': '450,000.00'},
+        {'source_url': 'https://www.rossbus.com/vision', 'title': 'Vision', 'passengers': '72'},
+        {'source_url': 'https://www.rossbus.com/micro-bird', 'title': 'Micro Bird'}
+    ]
+    old_path = write_json(tmp_path / 'rossscraper_20250101_000000.json', old_listings)
+    new_path = tmp_path / 'rossscraper_20250102_000000.jsonl'
+    with SnapshotWriter(new_path) as writer:
+        for listing in new_listings:
+            writer.write(listing)
+
+    events = {event['key']: event for event in diff_snapshots(old_path, new_path)}
+
+    assert set(events) == {
+        'vin:WEBS404H3P3291620', 'vin:WEBS404H3P3291621', 'url:https://www.rossbus.com/micro-bird'
+    }
+    changed = events['vin:WEBS404H3P3291620']
+    assert changed['op'] == 'changed'
+    assert changed['fields'] == ['price']
+    assert changed['removed'] == ['mileage']
+    assert changed['listing'] == {'vin': 'WEBS404H3P3291620', 'title': 'Tourrider', 'price': '450,000.00'}
+    assert events['vin:WEBS404H3P3291621'] == {'op': 'removed', 'key': 'vin:WEBS404H3P3291621'}
+    assert events['url:https://www.rossbus.com/micro-bird']['listing'] == new_listings[2]
+
+    change_set = tmp_path / 'changes.jsonl.gz'
+    counts = write_change_set(diff_snapshots(old_path, new_path), change_set)
+    assert counts == {'added': 1, 'changed': 1, 'removed': 1}
+    assert [listing['title'] for listing in iter_upserts(change_set)] == ['Tourrider', 'Micro Bird']
+
+def test_latest_snapshots(tmp_path):
+    for name in ['daimlerscraper_20250101_000000.json', 'daimlerscraper_20250103_000000.jsonl.gz',
+                 'daimlerscraper_20250103_000000.jsonl.gz.idx.json', 'daimlerscraper_20250102_000000.json',
+                 'rossscraper_20250104_000000.json']:
+        (tmp_path / name).write_text('[]')
+
+    assert latest_snapshots(tmp_path, 'daimlerscraper') == [
+        str(tmp_path / 'daimlerscraper_20250102_000000.json'),
+        str(tmp_path / 'daimlerscraper_20250103_000000.jsonl.gz')
+    ]
+
+def test_loading_a_change_set_keeps_fields_missing_from_the_new_scrape(tmp_path, old_listings):
+    from database.db_connector import DatabaseConnector
+    from database.models import Base, Bus
+    from database.processor import DataProcessor
+
+    identity = {'year': '2023', 'make': 'Setra', 'model': 'S 417'}
+    old_path = write_json(tmp_path / 'daimlerscraper_20250101_000000.json',
+                          [{**listing, **identity} for listing in old_listings[:1]])
+    # The new scrape found a lower price but missed the mileage
+    new_path = write_json(tmp_path / 'daimlerscraper_20250102_000000.json',
+                          [{'vin': 'WEBS404H3P3291620', 'title': 'Tourrider', 'price': '450,000.00', **identity}])
+
+    connector = DatabaseConnector(f"sqlite:///{tmp_path / 'buses.db'}")
+    Base.metadata.create_all(connector.engine)
+    try:
+        processor = DataProcessor(connector)
+        assert processor.save_multiple_buses(json.loads(old_path.read_text()))
+        change_set = tmp_path / 'changes.jsonl'
+        write_change_set(diff_snapshots(old_path, new_path), change_set)
+        assert processor.save_multiple_buses(list(iter_upserts(change_set)))
+
+        with connector.get_session() as session:
+            bus = session.query(Bus).one()
+            assert (bus.price, bus.mileage) == ('450,000.00', '70470')
+    finally:
+        connector.close()
@@ -0,0 +1,55 @@
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, select, text
+from sqlalchemy.dialects import mysql
+from database.db_connector import DatabaseConnector, database_url
+from database.upsert import upsert, upsert_statement
+
+metadata = MetaData()
+counters = Table(
+    'counters', metadata,
+    Column('name', String(20), primary_key=True),
+    Column('value', Integer),
+    Column('label', String(20))
+)
+
+@pytest.fixture
+def connector(tmp_path):
+    connector = DatabaseConnector(f"sqlite:///{tmp_path / 'buses.db'}")
+    metadata.create_all(connector.engine)
+    yield connector
+    connector.close()
+
+def test_database_url_setting(monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'sqlite:///buses.db')
+    assert database_url() == 'sqlite:///buses.db'
+    assert database_url(asynchronous=True) == 'sqlite+aiosqlite:///buses.db'
+
+    monkeypatch.delenv('DATABASE_URL')
+    monkeypatch.setenv('DB_NAME', 'fleet')
+    assert database_url().startswith('mysql+pymysql://') and database_url().endswith('/fleet')
+    assert database_url(asynchronous=True).startswith('mysql+aiomysql://')
+
+def test_sqlite_connections_get_pragmas(connector):
+    with connector.engine.connect() as conn:
+        assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert conn.execute(text('PRAGMA foreign_keys')).scalar() == 1
+        assert conn.execute(text('PRAGMA busy_timeout')).scalar() == 30000
+
+def test_upsert_inserts_and_updates(connector):
+    with connector.engine.begin() as conn:
+        upsert(conn, counters, [{'name': 'a', 'value': 1, 'label': 'x'}, {'name': 'b', 'value': 2, 'label': 'y'}], ['name'])
+        upsert(conn, counters, [{'name': 'a', 'value': 10, 'label': 'z'}], ['name'], update_columns=['value'])
+        upsert(conn, counters, [{'name': 'b', 'value': 20, 'label': 'z'}], ['name'], update_columns=[])
+
+    with connector.get_session() as session:
+        upsert(session, counters, [{'name': 'c', 'value': 3, 'label': 'w'}], ['name'])
+
+    with connector.engine.connect() as conn:
+        rows = conn.execute(select(counters).order_by(counters.c.name)).all()
+    assert [tuple(row) for row in rows] == [('a', 10, 'x'), ('b', 2, 'y'), ('c', 3, 'w')]
+
+def test_mysql_upsert_statement():
+    update = str(upsert_statement('mysql', counters, ['name'], ['value']).compile(dialect=mysql.dialect()))
+    ignore = str(upsert_statement('mysql', counters, ['name'], []).compile(dialect=mysql.dialect()))
+    assert 'ON DUPLICATE KEY UPDATE value = VALUES(value)' in update
+    assert ignore.startswith('INSERT IGNORE INTO counters')
@@ -0,0 +1,28 @@
+import pytest
+from utils.import_bench import ENTRY_POINTS, measure_import, run_benchmark
+
+@pytest.mark.parametrize('module', ['scrapers', 'database'])
+def test_packages_import_without_heavy_dependencies(module):
+    """Importing a package should not drag in the scraping or PDF stack."""
+    result = measure_import(module, repeat=1)
+    assert result['heavy'] == []
+
+@pytest.mark.parametrize('module', ['scrapers.pdf_mixin', 'scrapers.micro_bird_scraper'])
+def test_pdf_stack_loads_only_when_parsing(module):
+    result = measure_import(module, repeat=1)
+    assert 'pdfplumber' not in result['heavy']
+    assert 'pdfminer' not in result['heavy']
+
+@pytest.mark.parametrize('module', list(ENTRY_POINTS))
+def test_entry_point_import_budget(module):
+    """Each entry point stays within its import time budget and heavy module list."""
+    result, = run_benchmark([module], repeat=1)
+    assert result['violations'] == [], f"{module}: {result['violations']} ({result['seconds']:.3f}s)"
+
+@pytest.mark.parametrize('module', ['scrapers.daimler_scraper', 'scrapers.micro_bird_scraper',
+                                    'scrapers.ross_scraper', 'scripts.run_scrapers', 'scripts.daemon'])
+def test_scraping_does_not_load_the_database_stack(module):
+    """Scrapers only use the database enums; the ORM and the session listeners load with a connector."""
+    result = measure_import(module, repeat=1)
+    assert 'sqlalchemy' not in result['heavy']
+    assert 'numpy' not in result['heavy']
@@ -0,0 +1,61 @@
+import pytest
+from sqlalchemy import select
+from database.db_connector import DatabaseConnector
+from database.models import Base, Bus, BusHistory, OutboxEvent
+from database.processor import DataProcessor
+from database.sweep import finish_run, sweep_stale
+
+def listing(number, source='Daimler'):
+    return {'title': f'Bus {number}', 'year': '2019', 'make': 'Blue Bird', 'model': 'Vision', 'source': source,
+            'source_url': f'https://{source.lower()}.example/{number}'}
+
+@pytest.fixture
+def connector(tmp_path):
+    connector = DatabaseConnector(f"sqlite:///{tmp_path / 'buses.db'}")
+    Base.metadata.create_all(connector.engine)
+    yield connector
+    connector.close()
+
+def ingest(connector, run_id, listings, sources=('Daimler',)):
+    DataProcessor(connector, run_id=run_id).save_multiple_buses(listings)
+    with connector.engine.begin() as connection:
+        finish_run(connection, run_id, sources)
+
+def buses(connector):
+    with connector.engine.connect() as connection:
+        return {title: (run, stale) for title, run, stale in
+                connection.execute(select(Bus.title, Bus.last_seen_run, Bus.stale))}
+
+def test_sweep_flags_buses_missing_from_recent_runs(connector):
+    ingest(connector, 'run-1', [listing(1), listing(2), listing(3, 'Ross')], sources=('Daimler', 'Ross'))
+    ingest(connector, 'run-2', [listing(1)])
+    assert buses(connector) == {'Bus 1': ('run-2', False), 'Bus 2': ('run-1', False), 'Bus 3': ('run-1', False)}
+
+    with connector.engine.begin() as connection:
+        # Missing from one run is not enough, and Ross has had a single run
+        assert sweep_stale(connection, after_runs=2) == {'Daimler': 0}
+    ingest(connector, 'run-3', [listing(1)])
+    with connector.engine.begin() as connection:
+        assert sweep_stale(connection, after_runs=2, dry_run=True) == {'Daimler': 1}
+        assert sweep_stale(connection, after_runs=2) == {'Daimler': 1}
+        assert sweep_stale(connection, after_runs=2) == {'Daimler': 0}
+    assert buses(connector)['Bus 2'] == ('run-1', True)
+    assert buses(connector)['Bus 3'] == ('run-1', False)
+
+    with connector.engine.connect() as connection:
+        events = connection.execute(select(OutboxEvent.row_id, OutboxEvent.fields)
+                                    .where(OutboxEvent.op == 'update')).all()
+        history = connection.execute(select(BusHistory.old_value, BusHistory.value, BusHistory.run_id)
+                                     .where(BusHistory.field == 'stale', BusHistory.old_value.isnot(None))).all()
+    assert events == [(2, '["stale"]')]
+    assert history == [('False', 'True', 'run-3')]
+
+def test_listed_again_clears_the_flag(connector):
+    ingest(connector, 'run-1', [listing(1), listing(2)])
+    ingest(connector, 'run-2', [listing(1)])
+    with connector.engine.begin() as connection:
+        sweep_stale(connection, after_runs=1)
+    assert buses(connector)['Bus 2'] == ('run-1', True)
+
+    ingest(connector, 'run-3', [listing(1), listing(2)])
+    assert buses(connector)['Bus 2'] == ('run-3', False)
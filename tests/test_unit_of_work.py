@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import event
+from database.db_connector import DatabaseConnector, engine_options
+from database.models import Base, Bus, BusOverview
+from database.processor import DataProcessor
+
+@pytest.fixture
+def connector():
+    connector = DatabaseConnector('sqlite://')
+    Base.metadata.create_all(connector.engine)
+    yield connector
+    connector.close()
+
+def listing(title, **extra):
+    return {'title': title, 'year': '2020', 'make': 'Blue Bird', 'model': 'Vision',
+            'source_url': f"https://example.com/{title}", 'mdesc': 'Description', **extra}
+
+def test_batch_uses_one_connection(connector):
+    checkouts = []
+    event.listen(connector.engine, 'checkout', lambda *args: checkouts.append(1))
+
+    saved = DataProcessor(connector).save_multiple_buses([listing(str(i)) for i in range(20)])
+
+    assert len(saved) == 20
+    assert len(checkouts) == 1
+    # Saved buses stay readable after the batch session is closed
+    assert sorted(bus.title for bus in saved) == sorted(str(i) for i in range(20))
+
+def test_bad_record_only_rolls_back_its_savepoint(connector):
+    processor = DataProcessor(connector)
+    process_overview = processor.process_overview_data
+
+    def fail_on_b(bus_id, data):
+        if data.title == 'B':
+            raise ValueError('broken overview')
+        return process_overview(bus_id, data)
+
+    processor.process_overview_data = fail_on_b
+    saved = processor.save_multiple_buses([listing('A'), listing('B'), listing('C')])
+
+    assert [bus.title for bus in saved] == ['A', 'C']
+    with connector.get_session() as session:
+        assert sorted(bus.title for bus in session.query(Bus)) == ['A', 'C']
+        assert session.query(BusOverview).count() == 2
+
+def test_pool_settings_come_from_environment(monkeypatch):
+    monkeypatch.setenv('DB_POOL_SIZE', '20')
+    monkeypatch.setenv('DB_POOL_PRE_PING', 'true')
+    monkeypatch.setenv('DB_ISOLATION_LEVEL', 'READ COMMITTED')
+
+    options = engine_options()
+
+    assert options['pool_size'] == 20
+    assert options['max_overflow'] == 10
+    assert options['pool_pre_ping'] is True
+    assert options['isolation_level'] == 'READ COMMITTED'
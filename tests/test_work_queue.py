@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import update
+from database.models import ScrapeTask
+from database.work_queue import WorkQueue, DEAD, DONE, LEASED, PENDING
+from scrapers.records import ScrapedListing
+from scripts.scrape_queue import process_task
+
+@pytest.fixture
+def queue(tmp_path):
+    return WorkQueue(f"sqlite:///{tmp_path / 'queue.db'}", lease_seconds=60, max_attempts=2, backoff_seconds=0)
+
+def expire_leases(queue):
+    with queue.engine.begin() as conn:
+        conn.execute(update(ScrapeTask.__table__)
+                     .where(ScrapeTask.__table__.c.status == LEASED)
+                     .values(lease_expires_at=datetime.utcnow() - timedelta(seconds=1)))
+
+class FakeScraper:
+    def __init__(self, failures=0):
+        self.failures = failures
+
+    def parse_listing(self, url):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError('timeout')
+        return ScrapedListing(source_url=url, title='Bus')
+
+def test_enqueue_is_idempotent(queue):
+    assert queue.enqueue('ross', ['a', 'b', 'a']) == 2
+    assert queue.enqueue('ross', ['a', 'c']) == 1
+    assert queue.stats() == {PENDING: 3, LEASED: 0, DONE: 0, DEAD: 0}
+
+def test_workers_never_claim_the_same_task(queue):
+    queue.enqueue('ross', ['a', 'b', 'c'])
+    first = queue.claim('w1', limit=2)
+    second = queue.claim('w2', limit=2)
+    assert len(first) == 2 and len(second) == 1
+    assert not {task['id'] for task in first} & {task['id'] for task in second}
+    assert queue.claim('w3') == []
+
+def test_expired_lease_is_claimed_again(queue):
+    queue.enqueue('microbird', ['a'])
+    task = queue.claim('w1')[0]
+    expire_leases(queue)
+
+    retried = queue.claim('w2')[0]
+    assert retried['id'] == task['id'] and retried['attempt'] == 2
+    # The first worker lost its lease, its late result is dropped
+    assert not queue.complete(task['id'], 'w1', {'title': 'late'})
+    assert queue.complete(task['id'], 'w2', {'title': 'Bus'})
+    assert list(queue.iter_results('microbird')) == [{'title': 'Bus'}]
+
+def test_failed_task_is_retried_then_dead_lettered(queue):
+    queue.enqueue('ross', ['a'])
+    scraper = FakeScraper(failures=5)
+
+    assert not process_task(queue, scraper, queue.claim('w1')[0], 'w1')
+    assert queue.stats()[PENDING] == 1
+    assert not process_task(queue, scraper, queue.claim('w1')[0], 'w1')
+    assert queue.stats()[DEAD] == 1
+    assert queue.dead_letters()[0]['last_error'] == 'timeout'
+
+    assert queue.retry_dead() == 1
+    assert process_task(queue, FakeScraper(), queue.claim('w1')[0], 'w1')
+    assert list(queue.iter_results('ross')) == [{'source_url': 'a', 'title': 'Bus'}]
+
+def test_backoff_delays_retry(tmp_path):
+    queue = WorkQueue(f"sqlite:///{tmp_path / 'queue.db'}", max_attempts=3, backoff_seconds=60)
+    queue.enqueue('ross', ['a'])
+    task = queue.claim('w1')[0]
+    queue.fail(task['id'], 'w1', 'timeout')
+    assert queue.claim('w1') == []
+    assert queue.stats()[PENDING] == 1
+
+def test_claim_filters_by_source(queue):
+    queue.enqueue('ross', ['a'])
+    queue.enqueue('daimler', ['a'])
+    tasks = queue.claim('w1', source='daimler', limit=5)
+    assert [task['source'] for task in tasks] == ['daimler']
+
+def test_results_come_from_the_latest_discovery_only(queue):
+    queue.enqueue('ross', ['a', 'b'])
+    for task in queue.claim('w1', limit=2):
+        assert process_task(queue, FakeScraper(), task, 'w1')
+    assert sorted(listing['source_url'] for listing in queue.iter_results('ross')) == ['a', 'b']
+
+    # 'a' sold: no longer discovered, so its old result is not collected again
+    queue.enqueue('ross', ['b', 'c'])
+    for task in queue.claim('w1', limit=5):
+        assert process_task(queue, FakeScraper(), task, 'w1')
+    assert sorted(listing['source_url'] for listing in queue.iter_results('ross')) == ['b', 'c']
+    assert [listing['source_url'] for listing in queue.iter_results('ross', generation=1)] == ['a']
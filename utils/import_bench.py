@@ -0,0 +1,102 @@
+from typing import List, Dict, Any
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Modules that are only needed for scraping or for one specific file format
+HEAVY_MODULES = ['pdfplumber', 'pdfminer', 'bs4', 'requests', 'pandas', 'pyarrow', 'zstandard']
+
+# Modules that are only needed to work with the database
+DATABASE_MODULES = ['sqlalchemy', 'numpy']
+
+# Scraping needs the database enums only
+SCRAPER_FORBIDDEN = ['pdfplumber', 'pdfminer', 'pyarrow', 'dotenv'] + DATABASE_MODULES
+
+# Entry point -> import time budget in seconds and heavy modules it must not load
+ENTRY_POINTS = {
+    'main': {'budget': 0.5, 'forbidden': HEAVY_MODULES + ['sqlalchemy', 'numpy']},
+    'scripts.run_scrapers': {'budget': 3.0, 'forbidden': ['bs4', 'requests'] + SCRAPER_FORBIDDEN},
+    'scrapers.daimler_scraper': {'budget': 3.0, 'forbidden': SCRAPER_FORBIDDEN},
+    'scrapers.micro_bird_scraper': {'budget': 3.0, 'forbidden': SCRAPER_FORBIDDEN},
+    'scrapers.ross_scraper': {'budget': 3.0, 'forbidden': SCRAPER_FORBIDDEN},
+    'scripts.daemon': {'budget': 1.0, 'forbidden': ['pdfplumber', 'pdfminer', 'bs4', 'requests', 'pandas', 'sqlalchemy']},
+    'scripts.scrape_queue': {'budget': 3.0, 'forbidden': ['pdfplumber', 'pdfminer', 'bs4', 'requests', 'pandas', 'pyarrow']},
+    'scripts.inventory_api': {'budget': 3.0, 'forbidden': ['pdfplumber', 'pdfminer', 'bs4', 'requests', 'pandas', 'pyarrow', 'scrapy']},
+    'database.populate_db': {'budget': 3.0, 'forbidden': ['pdfplumber', 'pdfminer', 'bs4', 'requests', 'pandas', 'pyarrow']},
+    'database.parquet_io': {'budget': 3.0, 'forbidden': ['pdfplumber', 'pdfminer', 'bs4', 'requests', 'pyarrow']},
+    'scripts.verify_data': {'budget': 3.0, 'forbidden': ['pdfplumber', 'pdfminer', 'bs4', 'requests', 'pyarrow']},
+    'utils.snapshot_diff': {'budget': 1.0, 'forbidden': ['pdfplumber', 'pdfminer', 'bs4', 'requests', 'sqlalchemy', 'zstandard']},
+}
+
+_MEASURE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module({module!r})
+elapsed = time.perf_counter() - start
+loaded = sorted({{name.split('.')[0] for name in sys.modules}})
+print(json.dumps({{'seconds': elapsed, 'modules': loaded}}))
+"""
+
+def measure_import(module: str, repeat: int = 3) -> Dict[str, Any]:
+    """Import a module in fresh interpreters and report its best import time.
+
+    Every run uses a new process (and a scratch working directory, since some
+    scripts open log files on import) so nothing is cached between runs.
+    """
+    env = dict(os.environ, PYTHONPATH=str(ROOT_DIR))
+    runs = []
+    with tempfile.TemporaryDirectory() as cwd:
+        for _ in range(repeat):
+            result = subprocess.run(
+                [sys.executable, '-c', _MEASURE.format(module=module)],
+                capture_output=True, text=True, check=True, cwd=cwd, env=env
+            )
+            runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    best = min(runs, key=lambda run: run['seconds'])
+    return {
+        'module': module,
+        'seconds': best['seconds'],
+        'heavy': [name for name in HEAVY_MODULES + DATABASE_MODULES if name in best['modules']]
+    }
+
+def run_benchmark(modules: List[str] = None, repeat: int = 3) -> List[Dict[str, Any]]:
+    """Measure every entry point and check it against its budget."""
+    results = []
+    for module in modules or ENTRY_POINTS:
+        result = measure_import(module, repeat)
+        limits = ENTRY_POINTS.get(module, {'budget': None, 'forbidden': []})
+        result['budget'] = limits['budget']
+        result['violations'] = [name for name in limits['forbidden'] if name in result['heavy']]
+        if limits['budget'] is not None and result['seconds'] > limits['budget']:
+            result['violations'].append(f"over budget ({limits['budget']:.1f}s)")
+        results.append(result)
+    return results
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Measure the import time of each entry point")
+    parser.add_argument('modules', nargs='*', help="Modules to measure (default: all entry points)")
+    parser.add_argument('--repeat', type=int, default=3, help="Fresh interpreter runs per module")
+    args = parser.parse_args()
+
+    failed = False
+    for result in run_benchmark(args.modules, args.repeat):
+        status = 'FAIL ' + ', '.join(result['violations']) if result['violations'] else 'ok'
+        logger.info(f"{result['module']:<24} {result['seconds'] * 1000:8.1f} ms  "
+                    f"heavy: {', '.join(result['heavy']) or '-'}  {status}")
+        failed = failed or bool(result['violations'])
+    sys.exit(1 if failed else 0)
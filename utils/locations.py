@@ -0,0 +1,145 @@
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from functools import lru_cache
+import re
+
+from database.enums import USRegion
+
+# State (and DC) abbreviation -> (name, region)
+STATES: Dict[str, Tuple[str, USRegion]] = {
+    'CT': ('connecticut', USRegion.NORTHEAST),
+    'DC': ('district of columbia', USRegion.NORTHEAST),
+    'DE': ('delaware', USRegion.NORTHEAST),
+    'MA': ('massachusetts', USRegion.NORTHEAST),
+    'MD': ('maryland', USRegion.NORTHEAST),
+    'ME': ('maine', USRegion.NORTHEAST),
+    'NH': ('new hampshire', USRegion.NORTHEAST),
+    'NJ': ('new jersey', USRegion.NORTHEAST),
+    'NY': ('new york', USRegion.NORTHEAST),
+    'PA': ('pennsylvania', USRegion.NORTHEAST),
+    'RI': ('rhode island', USRegion.NORTHEAST),
+    'VT': ('vermont', USRegion.NORTHEAST),
+    'AL': ('alabama', USRegion.SOUTHEAST),
+    'AR': ('arkansas', USRegion.SOUTHEAST),
+    'FL': ('florida', USRegion.SOUTHEAST),
+    'GA': ('georgia', USRegion.SOUTHEAST),
+    'KY': ('kentucky', USRegion.SOUTHEAST),
+    'LA': ('louisiana', USRegion.SOUTHEAST),
+    'MS': ('mississippi', USRegion.SOUTHEAST),
+    'NC': ('north carolina', USRegion.SOUTHEAST),
+    'SC': ('south carolina', USRegion.SOUTHEAST),
+    'TN': ('tennessee', USRegion.SOUTHEAST),
+    'VA': ('virginia', USRegion.SOUTHEAST),
+    'WV': ('west virginia', USRegion.SOUTHEAST),
+    'AZ': ('arizona', USRegion.SOUTHWEST),
+    'NM': ('new mexico', USRegion.SOUTHWEST),
+    'OK': ('oklahoma', USRegion.SOUTHWEST),
+    'TX': ('texas', USRegion.SOUTHWEST),
+    'IA': ('iowa', USRegion.MIDWEST),
+    'IL': ('illinois', USRegion.MIDWEST),
+    'IN': ('indiana', USRegion.MIDWEST),
+    'KS': ('kansas', USRegion.MIDWEST),
+    'MI': ('michigan', USRegion.MIDWEST),
+    'MN': ('minnesota', USRegion.MIDWEST),
+    'MO': ('missouri', USRegion.MIDWEST),
+    'ND': ('north dakota', USRegion.MIDWEST),
+    'NE': ('nebraska', USRegion.MIDWEST),
+    'OH': ('ohio', USRegion.MIDWEST),
+    'SD': ('south dakota', USRegion.MIDWEST),
+    'WI': ('wisconsin', USRegion.MIDWEST),
+    'AK': ('alaska', USRegion.WEST),
+    'CA': ('california', USRegion.WEST),
+    'CO': ('colorado', USRegion.WEST),
+    'HI': ('hawaii', USRegion.WEST),
+    'ID': ('idaho', USRegion.WEST),
+    'MT': ('montana', USRegion.WEST),
+    'NV': ('nevada', USRegion.WEST),
+    'OR': ('oregon', USRegion.WEST),
+    'UT': ('utah', USRegion.WEST),
+    'WA': ('washington', USRegion.WEST),
+    'WY': ('wyoming', USRegion.WEST)
+}
+
+# Major cities and dealer towns -> state, for locations given without one.
+# Ambiguous names go to the larger city; a state in the text always wins.
+CITIES: Dict[str, str] = {
+    'albuquerque': 'NM', 'anaheim': 'CA', 'anchorage': 'AK', 'atlanta': 'GA', 'austin': 'TX',
+    'baltimore': 'MD', 'baton rouge': 'LA', 'birmingham': 'AL', 'boise': 'ID', 'boston': 'MA',
+    'buffalo': 'NY', 'charleston': 'SC', 'charlotte': 'NC', 'chicago': 'IL', 'cincinnati': 'OH',
+    'cleveland': 'OH', 'colorado springs': 'CO', 'columbus': 'OH', 'dallas': 'TX', 'denver': 'CO',
+    'des moines': 'IA', 'detroit': 'MI', 'el paso': 'TX', 'fort lauderdale': 'FL', 'fort worth': 'TX',
+    'fresno': 'CA', 'grand rapids': 'MI', 'hartford': 'CT', 'honolulu': 'HI', 'houston': 'TX',
+    'indianapolis': 'IN', 'jackson': 'MS', 'jacksonville': 'FL', 'kansas city': 'MO', 'knoxville': 'TN',
+    'las vegas': 'NV', 'little rock': 'AR', 'los angeles': 'CA', 'louisville': 'KY', 'memphis': 'TN',
+    'miami': 'FL', 'milwaukee': 'WI', 'minneapolis': 'MN', 'nashville': 'TN', 'new orleans': 'LA',
+    'newark': 'NJ', 'new york city': 'NY', 'nyc': 'NY', 'oakland': 'CA', 'oklahoma city': 'OK',
+    'omaha': 'NE', 'orlando': 'FL', 'philadelphia': 'PA', 'phoenix': 'AZ', 'pittsburgh': 'PA',
+    'portland': 'OR', 'providence': 'RI', 'raleigh': 'NC', 'reno': 'NV', 'richmond': 'VA',
+    'sacramento': 'CA', 'salt lake city': 'UT', 'san antonio': 'TX', 'san diego': 'CA',
+    'san francisco': 'CA', 'san jose': 'CA', 'seattle': 'WA', 'spokane': 'WA', 'st louis': 'MO',
+    'saint louis': 'MO', 'st paul': 'MN', 'saint paul': 'MN', 'tampa': 'FL', 'tucson': 'AZ',
+    'tulsa': 'OK', 'virginia beach': 'VA', 'wichita': 'KS', 'wilmington': 'DE'
+}
+
+TOKEN_PATTERN = re.compile(r"[A-Za-z]+")
+
+class Location(NamedTuple):
+    state: Optional[str]
+    region: USRegion
+
+UNKNOWN = Location(None, USRegion.OTHER)
+
+def _phrases() -> Tuple[Dict[Tuple[str, ...], str], Dict[Tuple[str, ...], str], int]:
+    """Token tuple -> state lookups for state names and city names, and the longest phrase."""
+    states = {tuple(name.split()): abbreviation for abbreviation, (name, _) in STATES.items()}
+    states[('washington', 'dc')] = 'DC'
+    states[('washington', 'd', 'c')] = 'DC'
+    cities = {tuple(name.split()): state for name, state in CITIES.items()}
+    return states, cities, max(len(phrase) for phrase in [*states, *cities])
+
+STATE_NAMES, CITY_NAMES, MAX_PHRASE = _phrases()
+
+def _is_abbreviation(tokens: List[str], index: int) -> bool:
+    """Whether a two letter token is meant as a state code.
+
+    "IN", "OR" or "ME" are also words, so codes must be written in capitals
+    ("Dallas, TX") unless they are the last word ("dallas, tx").
+    """
+    token = tokens[index]
+    return len(token) == 2 and token.upper() in STATES and (token.isupper() or index == len(tokens) - 1)
+
+@lru_cache(maxsize=4096)
+def resolve_location(location: Optional[str]) -> Location:
+    """State and region of a free text location such as "Dallas, TX" or "Charleston, West Virginia".
+
+    The text is tokenized once and phrases of up to MAX_PHRASE words are
+    looked up longest first, so "west virginia" never reads as "virginia".
+    The last state mentioned wins; cities are only used when no state is.
+    """
+    if not location:
+        return UNKNOWN
+    tokens = TOKEN_PATTERN.findall(location)
+    lowered = [token.lower() for token in tokens]
+
+    state = city_state = None
+    index = 0
+    while index < len(tokens):
+        for length in range(min(MAX_PHRASE, len(tokens) - index), 0, -1):
+            phrase = tuple(lowered[index:index + length])
+            if phrase in STATE_NAMES:
+                state = STATE_NAMES[phrase]
+                break
+            if phrase in CITY_NAMES:
+                city_state = city_state or CITY_NAMES[phrase]
+                break
+        else:
+            length = 1
+            if _is_abbreviation(tokens, index):
+                state = tokens[index].upper()
+        index += length
+
+    state = state or city_state
+    return Location(state, STATES[state][1]) if state else UNKNOWN
+
+def resolve_region(location: Optional[str]) -> USRegion:
+    """US region of a free text location, USRegion.OTHER when no state can be found."""
+    return resolve_location(location).region
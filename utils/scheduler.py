@@ -0,0 +1,99 @@
+from typing import List, Dict, Callable, Optional
+import heapq
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class Job:
+    """A named callable that runs every ``interval`` seconds."""
+
+    def __init__(self, name: str, interval: float, func: Callable[[], object]):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.runs = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+class Scheduler:
+    """Run jobs on their own cadence from a single process.
+
+    Due times are kept in a heap, so each cycle only looks at the next job.
+    Every delay gets random jitter, and failed jobs are retried sooner than
+    their regular interval.
+    """
+
+    def __init__(self, jitter: float = 0.1, startup_spread: float = 30, retry_delay: float = 600,
+                 clock: Callable[[], float] = time.monotonic, rng: Optional[random.Random] = None):
+        self.jitter = jitter
+        self.startup_spread = startup_spread
+        self.retry_delay = retry_delay
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.jobs: Dict[str, Job] = {}
+        self._queue: List = []
+        self._stop = threading.Event()
+
+    def add(self, name: str, interval: float, func: Callable[[], object]) -> Job:
+        """Register a job; its first run is spread over the start-up window."""
+        job = Job(name, interval, func)
+        self.jobs[name] = job
+        self._push(job, self.rng.uniform(0, self.startup_spread))
+        return job
+
+    def jittered(self, delay: float) -> float:
+        """Delay stretched or shrunk by up to ``jitter`` of itself."""
+        return delay * (1 + self.rng.uniform(-self.jitter, self.jitter))
+
+    def _push(self, job: Job, delay: float) -> None:
+        heapq.heappush(self._queue, (self.clock() + delay, job.name))
+
+    def next_due(self) -> Optional[float]:
+        """Seconds until the next job is due (0 if overdue), None without jobs."""
+        if not self._queue:
+            return None
+        return max(0.0, self._queue[0][0] - self.clock())
+
+    def run_pending(self) -> List[str]:
+        """Run every job that was due when called and reschedule it."""
+        now = self.clock()
+        due = []
+        while self._queue and self._queue[0][0] <= now:
+            due.append(heapq.heappop(self._queue)[1])
+
+        for name in due:
+            job = self.jobs[name]
+            start = self.clock()
+            try:
+                job.func()
+                job.runs += 1
+                job.last_error = None
+                delay = self.jittered(job.interval)
+                logger.info(f"{name} finished in {self.clock() - start:.1f}s, next run in {delay:.0f}s")
+            except Exception as e:
+                job.failures += 1
+                job.last_error = str(e)
+                delay = self.jittered(min(self.retry_delay, job.interval))
+                logger.error(f"{name} failed: {str(e)}, retrying in {delay:.0f}s")
+            self._push(job, delay)
+        return due
+
+    def run(self, max_cycles: Optional[int] = None) -> None:
+        """Run jobs until stop() is called (or ``max_cycles`` wake-ups have run jobs)."""
+        cycles = 0
+        while not self._stop.is_set():
+            if self.run_pending():
+                cycles += 1
+                if max_cycles is not None and cycles >= max_cycles:
+                    break
+            delay = self.next_due()
+            if delay is None:
+                break
+            self._stop.wait(delay)
+
+    def stop(self) -> None:
+        """Ask run() to return; safe to call from a signal handler."""
+        self._stop.set()
@@ -0,0 +1,207 @@
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+import gzip
+import io
+import json
+
+COMPRESSION_SUFFIXES = {
+    None: '',
+    'gzip': '.gz',
+    'zstd': '.zst'
+}
+
+INDEX_SUFFIX = '.idx.json'
+
+# Listings per compressed block (gzip member or zstd frame); a divisor of the
+# loader's default chunk size, so its chunks start at a block
+BLOCK_SIZE = 100
+
+def _zstandard():
+    """Import zstandard on demand, it is only needed for .zst snapshots."""
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("zstd snapshots require the 'zstandard' package") from e
+    return zstandard
+
+def compression_for(path: str) -> Optional[str]:
+    """Guess the compression of a snapshot file from its name."""
+    for compression, suffix in COMPRESSION_SUFFIXES.items():
+        if suffix and str(path).endswith(suffix):
+            return compression
+    return None
+
+def snapshot_filename(name: str, timestamp: str, output_format: str = 'json',
+                      compression: Optional[str] = None) -> str:
+    """Build the file name used for a scraper snapshot."""
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unsupported compression: {compression}")
+    if output_format == 'json':
+        if compression:
+            raise ValueError("Compression is only supported for the jsonl format")
+        return f"{name}_{timestamp}.json"
+    if output_format == 'jsonl':
+        return f"{name}_{timestamp}.jsonl{COMPRESSION_SUFFIXES[compression]}"
+    raise ValueError(f"Unsupported output format: {output_format}")
+
+def index_path(path: str) -> str:
+    """Path of the sidecar index for a JSON Lines snapshot."""
+    return f"{path}{INDEX_SUFFIX}"
+
+def encode_listing(listing: Dict[str, Any]) -> bytes:
+    """Serialize one listing (a dict or a ScrapedListing) as a single JSON line."""
+    if hasattr(listing, 'to_dict'):
+        listing = listing.to_dict()
+    line = json.dumps(listing, ensure_ascii=False, separators=(',', ':'), default=str)
+    return (line + '\n').encode('utf-8')
+
+class SnapshotWriter:
+    """Append listings one at a time to a JSON Lines snapshot.
+
+    Listings are stored in blocks of ``block_size`` lines, and a compressed
+    snapshot compresses every block as its own gzip member or zstd frame. The
+    sidecar index keeps the byte range of every block, so any listing (or
+    range of listings) is read by decompressing only the blocks it lies in,
+    while the records of a block still share one compression context.
+    """
+
+    def __init__(self, path: str, compression: Optional[str] = None, block_size: int = BLOCK_SIZE):
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unsupported compression: {compression}")
+        self.path = str(path)
+        self.compression = compression
+        self.block_size = block_size
+        self.blocks: List[Tuple[int, int]] = []
+        self._count = 0
+        self._lines: List[bytes] = []
+        self._position = 0
+        self._compressor = _zstandard().ZstdCompressor() if compression == 'zstd' else None
+        self._file = open(self.path, 'wb')
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.compression == 'gzip':
+            return gzip.compress(data, mtime=0)
+        if self.compression == 'zstd':
+            return self._compressor.compress(data)
+        return data
+
+    def _flush_block(self) -> None:
+        data = self._compress(b''.join(self._lines))
+        self._file.write(data)
+        self.blocks.append((self._position, len(data)))
+        self._position += len(data)
+        self._lines = []
+
+    def write(self, listing: Dict[str, Any]) -> None:
+        """Append a single listing, writing out its block once that is full."""
+        self._lines.append(encode_listing(listing))
+        self._count += 1
+        if len(self._lines) >= self.block_size:
+            self._flush_block()
+
+    def close(self) -> None:
+        """Write the last block, close the snapshot and write its sidecar index."""
+        if self._file.closed:
+            return
+        if self._lines:
+            self._flush_block()
+        self._file.close()
+        with open(index_path(self.path), 'w', encoding='utf-8') as f:
+            json.dump({
+                'format': 'jsonl',
+                'compression': self.compression,
+                'count': self.count,
+                'block_size': self.block_size,
+                'blocks': self.blocks
+            }, f, separators=(',', ':'))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def load_index(path: str) -> Optional[Dict[str, Any]]:
+    """Load the sidecar index of a snapshot, if there is one."""
+    try:
+        with open(index_path(path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _decode_lines(stream) -> Iterator[Dict[str, Any]]:
+    for line in io.TextIOWrapper(stream, encoding='utf-8'):
+        if line.strip():
+            yield json.loads(line)
+
+def iter_snapshot(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream the listings stored in a snapshot.
+
+    Handles JSON Lines snapshots (plain, gzip or zstd) as well as the
+    pretty-printed JSON arrays written by earlier runs.
+    """
+    path = str(path)
+    compression = compression_for(path)
+    if compression == 'gzip':
+        with gzip.open(path, 'rb') as f:
+            yield from _decode_lines(f)
+    elif compression == 'zstd':
+        with open(path, 'rb') as raw:
+            reader = _zstandard().ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+            yield from _decode_lines(reader)
+    elif path.endswith('.jsonl'):
+        with open(path, 'rb') as f:
+            yield from _decode_lines(f)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from json.load(f)
+
+def _decompress(data: bytes, compression: Optional[str]) -> bytes:
+    if compression == 'gzip':
+        return gzip.decompress(data)
+    if compression == 'zstd':
+        return _zstandard().ZstdDecompressor().decompress(data)
+    return data
+
+def _read_bytes(path: str, ranges: List[List[int]]) -> Tuple[int, bytes]:
+    """(offset, bytes) of the file from the first to the end of the last (offset, length) range."""
+    first_offset = ranges[0][0]
+    last_offset, last_length = ranges[-1]
+    with open(path, 'rb') as f:
+        f.seek(first_offset)
+        return first_offset, f.read(last_offset + last_length - first_offset)
+
+def read_snapshot_range(path: str, start: int, stop: int,
+                        index: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Read listings [start, stop) of an indexed snapshot, decompressing only the blocks they lie in."""
+    index = index or load_index(path)
+    if index is None:
+        raise FileNotFoundError(f"No index found for snapshot {path}")
+    compression = index.get('compression')
+
+    if 'blocks' not in index:
+        # Snapshots written before blocks: one member or frame per listing
+        offsets = index['offsets'][start:stop]
+        if not offsets:
+            return []
+        first_offset, chunk = _read_bytes(path, offsets)
+        return [json.loads(_decompress(chunk[offset - first_offset:offset - first_offset + length], compression))
+                for offset, length in offsets]
+
+    stop = min(stop, index['count'])
+    if start >= stop:
+        return []
+    block_size = index['block_size']
+    first_block = start // block_size
+    blocks = index['blocks'][first_block:(stop - 1) // block_size + 1]
+    first_offset, chunk = _read_bytes(path, blocks)
+
+    lines = []
+    for offset, length in blocks:
+        lines.extend(_decompress(chunk[offset - first_offset:offset - first_offset + length], compression).splitlines())
+    # Position of the listings within the blocks read
+    skip = start - first_block * block_size
+    return [json.loads(line) for line in lines[skip:skip + stop - start]]
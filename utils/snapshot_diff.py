@@ -0,0 +1,140 @@
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+import argparse
+import hashlib
+import json
+import logging
+import re
+from pathlib import Path
+
+from utils.snapshot import SnapshotWriter, iter_snapshot, compression_for
+
+logger = logging.getLogger(__name__)
+
+# Fields the ingest path uses to find an existing bus, always kept in change events
+IDENTITY_FIELDS = ['vin', 'source_url', 'url', 'title', 'year', 'make', 'model', 'source']
+
+SNAPSHOT_NAME_PATTERN = re.compile(r'^(?P<source>[a-z_]+)_(?P<timestamp>\d{8}_\d{6})\.json')
+
+def listing_key(listing: Dict[str, Any]) -> Optional[str]:
+    """Key a listing by VIN, falling back to its source URL."""
+    if listing.get('vin'):
+        return f"vin:{listing['vin']}"
+    url = listing.get('source_url') or listing.get('url')
+    if url:
+        return f"url:{url}"
+    return None
+
+def _digest(value: Any) -> bytes:
+    data = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+    return hashlib.blake2b(data, digest_size=8).digest()
+
+def field_digests(listing: Dict[str, Any]) -> Dict[str, bytes]:
+    """Short per-field hashes, enough to tell which fields changed."""
+    return {field: _digest(value) for field, value in listing.items()}
+
+def build_digest_table(path: str) -> Dict[str, Dict[str, bytes]]:
+    """Hash-join build side: listing key -> per-field digests of a snapshot."""
+    table = {}
+    skipped = 0
+    for listing in iter_snapshot(path):
+        key = listing_key(listing)
+        if key is None:
+            skipped += 1
+            continue
+        if key in table:
+            logger.warning(f"Duplicate listing key {key} in {path}, keeping the last one")
+        table[key] = field_digests(listing)
+    if skipped:
+        logger.warning(f"Skipped {skipped} listings without VIN or URL in {path}")
+    return table
+
+def diff_snapshots(old_path: str, new_path: str) -> Iterator[Dict[str, Any]]:
+    """Stream the change set between two snapshots of the same source.
+
+    The older snapshot is reduced to per-field digests keyed by listing key,
+    then the newer one is streamed against it. Events are:
+
+    * ``added``: ``listing`` holds the full new listing.
+    * ``changed``: ``listing`` holds the identity fields plus the changed
+      fields only, ``fields`` lists them. Fields the new listing no longer
+      has are listed in ``removed`` but left out of ``listing``: a field
+      the scraper did not find this time is no reason to erase it on load.
+    * ``removed``: only the key.
+    """
+    old = build_digest_table(old_path)
+    seen = set()
+
+    for listing in iter_snapshot(new_path):
+        key = listing_key(listing)
+        if key is None or key in seen:
+            continue
+        seen.add(key)
+
+        previous = old.get(key)
+        if previous is None:
+            yield {'op': 'added', 'key': key, 'listing': listing}
+            continue
+
+        current = field_digests(listing)
+        changed = sorted(
+            field for field in set(previous) | set(current)
+            if previous.get(field) != current.get(field)
+        )
+        if changed:
+            compact = {field: listing[field] for field in IDENTITY_FIELDS if field in listing}
+            compact.update({field: listing[field] for field in changed if field in listing})
+            event = {'op': 'changed', 'key': key, 'fields': [field for field in changed if field in listing],
+                     'listing': compact}
+            removed = [field for field in changed if field not in listing]
+            if removed:
+                event['removed'] = removed
+            yield event
+
+    for key in old.keys() - seen:
+        yield {'op': 'removed', 'key': key}
+
+def write_change_set(events: Iterator[Dict[str, Any]], path: str) -> Dict[str, int]:
+    """Write change events as a JSON Lines file and return counts per operation."""
+    counts = {'added': 0, 'changed': 0, 'removed': 0}
+    with SnapshotWriter(path, compression_for(path)) as writer:
+        for event in events:
+            writer.write(event)
+            counts[event['op']] += 1
+    return counts
+
+def iter_upserts(change_set_path: str) -> Iterator[Dict[str, Any]]:
+    """Listings from a change set that need to be written to the database."""
+    for event in iter_snapshot(change_set_path):
+        if event['op'] in ('added', 'changed'):
+            yield event['listing']
+
+def latest_snapshots(directory: str, source: str, count: int = 2) -> List[str]:
+    """Most recent snapshots of a source, oldest first, based on their timestamps."""
+    snapshots: List[Tuple[str, str]] = []
+    for path in Path(directory).iterdir():
+        match = SNAPSHOT_NAME_PATTERN.match(path.name)
+        if match and match.group('source') == source and not path.name.endswith('.idx.json'):
+            snapshots.append((match.group('timestamp'), str(path)))
+    return [path for _, path in sorted(snapshots)[-count:]]
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Compute the change set between two scrape snapshots")
+    parser.add_argument('snapshots', nargs='*', help="Old and new snapshot files")
+    parser.add_argument('--dir', default='scraped_data', help="Snapshot directory used with --source")
+    parser.add_argument('--source', help="Diff the two latest snapshots of this source, e.g. daimlerscraper")
+    parser.add_argument('-o', '--output', default='changes.jsonl', help="Change set file (.jsonl, .jsonl.gz or .jsonl.zst)")
+    args = parser.parse_args()
+
+    snapshots = latest_snapshots(args.dir, args.source) if args.source else args.snapshots
+    if len(snapshots) != 2:
+        parser.error("Pass two snapshot files, or --source with at least two snapshots in --dir")
+    old_path, new_path = snapshots
+
+    counts = write_change_set(diff_snapshots(old_path, new_path), args.output)
+    logger.info(f"{old_path} -> {new_path}: {counts['added']} added, "
+                f"{counts['changed']} changed, {counts['removed']} removed ({args.output})")